@@ -34,19 +34,10 @@ def copy_templates(adapter_root: Path, target_root: Path) -> List[str]:
     return copied
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description="Select framework adapter and emit manifest")
-    parser.add_argument("--framework", required=True)
-    parser.add_argument("--repo-root", required=True)
-    parser.add_argument("--out-dir", required=True)
-    parser.add_argument("--manifest", required=True)
-    parser.add_argument("--emit-templates", action="store_true")
-    args = parser.parse_args()
-
-    framework = args.framework.strip().lower()
-    repo_root = Path(args.repo_root).resolve()
-    out_dir = Path(args.out_dir).resolve()
-    manifest_path = Path(args.manifest).resolve()
+def build_adapter_manifest(framework: str, repo_root: Path, out_dir: Path, emit_templates: bool = False) -> Dict[str, object]:
+    framework = framework.strip().lower()
+    repo_root = repo_root.resolve()
+    out_dir = out_dir.resolve()
 
     adapters_root = repo_root / "skills" / "framework-adapters"
     adapter_name = FRAMEWORK_MAP.get(framework, "react-adapter")
@@ -59,7 +50,7 @@ def main() -> None:
     stores = collect_files(adapter_root / "stores")
 
     emitted = []
-    if args.emit_templates:
+    if emit_templates:
         emit_root = out_dir / "framework-adapter"
         emitted = copy_templates(adapter_root, emit_root)
 
@@ -76,6 +67,20 @@ def main() -> None:
         },
         "emitted": emitted,
     }
+    return manifest
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Select framework adapter and emit manifest")
+    parser.add_argument("--framework", required=True)
+    parser.add_argument("--repo-root", required=True)
+    parser.add_argument("--out-dir", required=True)
+    parser.add_argument("--manifest", required=True)
+    parser.add_argument("--emit-templates", action="store_true")
+    args = parser.parse_args()
+
+    manifest_path = Path(args.manifest).resolve()
+    manifest = build_adapter_manifest(args.framework, Path(args.repo_root), Path(args.out_dir), args.emit_templates)
 
     manifest_path.parent.mkdir(parents=True, exist_ok=True)
     manifest_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
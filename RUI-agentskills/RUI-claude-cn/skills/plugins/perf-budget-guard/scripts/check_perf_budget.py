@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""perf-budget-guard: compare flow.metrics.json resource usage against fixed budgets.
+
+In-process entry point (`python: scripts.check_perf_budget:run` in plugin.yaml).
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict
+
+BUDGET_DISK_IO_MB = 10.0
+BUDGET_PEAK_MEMORY_MB = 512.0
+
+
+def run(out_dir: Path, **_: Any) -> Dict[str, Any]:
+    metrics_path = out_dir / "flow.metrics.json"
+    report_path = out_dir / "perf-budget.report.json"
+
+    disk_io = None
+    peak_mem = None
+    if metrics_path.exists():
+        try:
+            obj = json.loads(metrics_path.read_text(encoding="utf-8"))
+            ru = (obj.get("metrics") or {}).get("resource_usage") or {}
+            disk_io = ru.get("disk_io_mb")
+            peak_mem = ru.get("peak_memory_mb")
+        except Exception:
+            pass
+
+    passed = True
+    if isinstance(disk_io, (int, float)) and disk_io > BUDGET_DISK_IO_MB:
+        passed = False
+    if isinstance(peak_mem, (int, float)) and peak_mem > BUDGET_PEAK_MEMORY_MB:
+        passed = False
+
+    report = {
+        "plugin": "perf-budget-guard",
+        "status": "pass" if passed else "warn",
+        "budgets": {"disk_io_mb_max": BUDGET_DISK_IO_MB, "peak_memory_mb_max": BUDGET_PEAK_MEMORY_MB},
+        "actual": {"disk_io_mb": disk_io, "peak_memory_mb": peak_mem},
+    }
+    report_path.write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    return {"status": report["status"]}
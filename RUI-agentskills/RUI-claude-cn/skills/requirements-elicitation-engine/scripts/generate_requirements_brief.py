@@ -184,35 +184,21 @@ def build_style_profile_yaml(project_name: str, framework: str, style: str) -> s
     return f"""project: {project_name}\nframework: {framework}\nstyle:\n  preferred: {style}\n  density: comfortable\ncode:\n  typescript_strict: true\n  no_any: true\n  component_split_threshold: 200\n  render_logic_threshold: 30\nquality:\n  accessibility: wcag-aa\n  browser_support:\n    - chrome\n    - firefox\n    - safari\n    - edge\n"""
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description="Generate requirement elicitation artifacts")
-    parser.add_argument("--brief", help="Requirement brief text")
-    parser.add_argument("--brief-file", help="Path to brief text file")
-    parser.add_argument("--out-dir", required=True, help="Output directory")
-    parser.add_argument("--project-name", help="Optional project name override")
-    parser.add_argument("--max-questions", type=int, default=5, help="Max follow-up questions")
-    parser.add_argument("--json", action="store_true", help="Print result as JSON")
-    args = parser.parse_args()
-
-    brief = ""
-    if args.brief_file:
-        brief = Path(args.brief_file).read_text(encoding="utf-8").strip()
-    elif args.brief:
-        brief = args.brief.strip()
-
-    if not brief:
-        raise SystemExit("brief is required: use --brief or --brief-file")
-
+def build_requirements(
+    brief: str,
+    out_dir: Path,
+    project_name: str | None = None,
+    max_questions: int = 5,
+) -> Dict[str, object]:
     norm = normalize_text(brief)
-    project_name = args.project_name or extract_project_name(brief)
+    project_name = project_name or extract_project_name(brief)
     framework = detect_framework(norm)
     style = detect_style(norm)
 
     hits = dimension_hits(norm)
-    questions = build_followup_questions(hits, args.max_questions)
+    questions = build_followup_questions(hits, max_questions)
     coverage = summarize_coverage(hits)
 
-    out_dir = Path(args.out_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
 
     prd_path = out_dir / "requirements.prd.md"
@@ -223,7 +209,7 @@ def main() -> None:
     questions_path.write_text("\n".join(f"- {q}" for q in questions) + "\n", encoding="utf-8")
     profile_path.write_text(build_style_profile_yaml(project_name, framework, style), encoding="utf-8")
 
-    result = {
+    return {
         "project_name": project_name,
         "framework": framework,
         "style": style,
@@ -241,13 +227,36 @@ def main() -> None:
         },
     }
 
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate requirement elicitation artifacts")
+    parser.add_argument("--brief", help="Requirement brief text")
+    parser.add_argument("--brief-file", help="Path to brief text file")
+    parser.add_argument("--out-dir", required=True, help="Output directory")
+    parser.add_argument("--project-name", help="Optional project name override")
+    parser.add_argument("--max-questions", type=int, default=5, help="Max follow-up questions")
+    parser.add_argument("--json", action="store_true", help="Print result as JSON")
+    args = parser.parse_args()
+
+    brief = ""
+    if args.brief_file:
+        brief = Path(args.brief_file).read_text(encoding="utf-8").strip()
+    elif args.brief:
+        brief = args.brief.strip()
+
+    if not brief:
+        raise SystemExit("brief is required: use --brief or --brief-file")
+
+    out_dir = Path(args.out_dir)
+    result = build_requirements(brief, out_dir, args.project_name, args.max_questions)
+
     if args.json:
         print(json.dumps(result, ensure_ascii=False, indent=2))
     else:
-        print(f"project: {project_name}")
-        print(f"framework: {framework}")
-        print(f"style: {style}")
-        print(f"questions: {len(questions)}")
+        print(f"project: {result['project_name']}")
+        print(f"framework: {result['framework']}")
+        print(f"style: {result['style']}")
+        print(f"questions: {result['question_count']}")
         print(f"out: {out_dir}")
 
 
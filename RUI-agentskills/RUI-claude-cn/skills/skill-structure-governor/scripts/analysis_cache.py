@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""Persistent per-file analysis cache (<cache-dir>/analysis.sqlite) for workspace analyzers.
+
+workspace_metrics.py stores each file's threshold-independent metrics (line
+and render-line counts, top repeated pattern and forwarded prop, custom tag
+counts, complexity points, typed/total declaration points) for Phase 4 and
+validate_gates.py as one JSON row per (analyzer, path). A row is reused when
+the file's size and mtime match; when only the mtime moved, the sha256 of the
+decoded contents decides. Reports are then rebuilt from the cached rows, so a
+repeat run re-reads and re-scans only the files that changed.
+
+The analyzer id (name@digest) embeds a digest of the analyzer's source files,
+so editing an analyzer invalidates its rows. Writes are batched into one
+transaction on close; WAL mode lets concurrent runs read while one of them
+writes.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from workspace_index import FileEntry, WorkspaceIndex
+
+CACHE_FILE = "analysis.sqlite"
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS file_metrics (
+    analyzer TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    result TEXT NOT NULL,
+    PRIMARY KEY (analyzer, path)
+)
+"""
+
+
+def content_digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    """sqlite-backed rows; AnalysisCache(None) is a disabled cache with the same API."""
+
+    def __init__(self, path: Optional[Path]):
+        self.path = Path(path) if path else None
+        self.conn: Optional[sqlite3.Connection] = None
+        self.lock = threading.Lock()
+        self.pending: List[Tuple[str, str, int, int, str, str]] = []
+        self.retained: Dict[str, set] = {}
+        self.stats = {"hits": 0, "hash_hits": 0, "misses": 0}
+        if self.path is not None:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self.conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+                self.conn.execute("PRAGMA journal_mode=WAL")
+                self.conn.execute(SCHEMA)
+                self.conn.commit()
+            except sqlite3.Error:
+                # 缓存不可用（只读目录、损坏文件）时退化为不缓存
+                self.conn = None
+
+    def __enter__(self) -> "AnalysisCache":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    @property
+    def enabled(self) -> bool:
+        return self.conn is not None
+
+    def rows(self, analyzer: str) -> Dict[str, Tuple[int, int, str, Any]]:
+        if self.conn is None:
+            return {}
+        with self.lock:
+            cur = self.conn.execute("SELECT path, size, mtime_ns, sha256, result FROM file_metrics WHERE analyzer = ?", (analyzer,))
+            return {path: (size, mtime, sha, result) for path, size, mtime, sha, result in cur.fetchall()}
+
+    def results(
+        self,
+        analyzer: str,
+        index: WorkspaceIndex,
+        entries: Iterable[FileEntry],
+        analyze: Callable[[FileEntry], Any],
+        analyze_batch: Optional[Callable[[List[FileEntry]], Dict[str, Any]]] = None,
+    ) -> Dict[str, Any]:
+        """Per-file results for entries (path order), analysing only files whose cached row is stale.
+
+        analyze may raise OSError for unreadable files; those are left out of the result.
+        analyze_batch, when given, receives all stale entries at once (e.g. to fan them
+        out to worker processes) and returns rel -> result, omitting unreadable files.
+        """
+        entries = list(entries)
+        cached = self.rows(analyzer)
+        out: Dict[str, Any] = {}
+        stale: List[FileEntry] = []
+        digests: Dict[str, str] = {}
+        for entry in entries:
+            row = cached.get(entry.rel)
+            if row is not None and row[0] == entry.size and row[1] == entry.mtime_ns:
+                out[entry.rel] = json.loads(row[3])
+                self.stats["hits"] += 1
+                continue
+            try:
+                digest = content_digest(index.text(entry)) if self.enabled else ""
+            except OSError:
+                continue
+            if row is not None and row[0] == entry.size and row[2] == digest:
+                out[entry.rel] = json.loads(row[3])
+                self.stats["hash_hits"] += 1
+                self.pending.append((analyzer, entry.rel, entry.size, entry.mtime_ns, digest, row[3]))
+                continue
+            stale.append(entry)
+            digests[entry.rel] = digest
+
+        if analyze_batch is not None and stale:
+            fresh = analyze_batch(stale)
+        else:
+            fresh = {}
+            for entry in stale:
+                try:
+                    fresh[entry.rel] = analyze(entry)
+                except OSError:
+                    continue
+        for entry in stale:
+            if entry.rel not in fresh:
+                continue
+            result = fresh[entry.rel]
+            out[entry.rel] = result
+            self.stats["misses"] += 1
+            if self.enabled:
+                self.pending.append(
+                    (analyzer, entry.rel, entry.size, entry.mtime_ns, digests[entry.rel], json.dumps(result, ensure_ascii=False))
+                )
+        return {entry.rel: out[entry.rel] for entry in entries if entry.rel in out}
+
+    def retain(self, analyzer: str, paths: Iterable[str]) -> None:
+        """After a full-workspace pass: drop this analyzer's rows for paths that no longer exist on close."""
+        self.retained.setdefault(analyzer, set()).update(paths)
+
+    def close(self) -> None:
+        if self.conn is None:
+            return
+        with self.lock:
+            try:
+                with self.conn:
+                    if self.pending:
+                        self.conn.executemany(
+                            "INSERT OR REPLACE INTO file_metrics (analyzer, path, size, mtime_ns, sha256, result) VALUES (?, ?, ?, ?, ?, ?)",
+                            self.pending,
+                        )
+                    for analyzer, keep in self.retained.items():
+                        name = analyzer.split("@", 1)[0]
+                        # 同名分析器的旧版本行一并清理
+                        self.conn.execute("DELETE FROM file_metrics WHERE analyzer LIKE ? AND analyzer != ?", (f"{name}@%", analyzer))
+                        stale = [p for p in self.rows_paths(analyzer) if p not in keep]
+                        self.conn.executemany("DELETE FROM file_metrics WHERE analyzer = ? AND path = ?", [(analyzer, p) for p in stale])
+            except sqlite3.Error:
+                pass
+            finally:
+                self.pending = []
+                self.retained = {}
+                self.conn.close()
+                self.conn = None
+
+    def rows_paths(self, analyzer: str) -> List[str]:
+        assert self.conn is not None
+        return [row[0] for row in self.conn.execute("SELECT path FROM file_metrics WHERE analyzer = ?", (analyzer,))]
+
+
+def cache_path(cache_dir: str | Path, workspace_root: str | Path) -> Path:
+    """<cache-dir>/analysis.sqlite, with a relative cache dir resolved against the workspace (like the step cache)."""
+    cache_dir = Path(cache_dir)
+    if not cache_dir.is_absolute():
+        cache_dir = Path(workspace_root) / cache_dir
+    return cache_dir / CACHE_FILE
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Inspect or clear the per-file analysis cache")
+    parser.add_argument("action", choices=["stats", "clear"])
+    parser.add_argument("--cache", required=True, help="analysis.sqlite 路径")
+    args = parser.parse_args()
+
+    path = Path(args.cache)
+    if not path.exists():
+        print(json.dumps({"cache": str(path), "rows": 0}, ensure_ascii=False))
+        return
+    conn = sqlite3.connect(str(path), timeout=30)
+    try:
+        if args.action == "clear":
+            with conn:
+                conn.execute("DELETE FROM file_metrics")
+        per_analyzer = dict(conn.execute("SELECT analyzer, COUNT(*) FROM file_metrics GROUP BY analyzer ORDER BY analyzer").fetchall())
+    finally:
+        conn.close()
+    print(
+        json.dumps(
+            {"cache": str(path), "rows": sum(per_analyzer.values()), "analyzers": per_analyzer, "size_bytes": path.stat().st_size},
+            ensure_ascii=False,
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
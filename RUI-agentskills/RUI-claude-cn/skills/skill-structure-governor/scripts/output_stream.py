@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""Stream child-process output to log files instead of holding it in memory.
+
+Tool checks (tool_checks.py) and plugin hooks (run_plugin_hooks.py) used to
+run with capture_output=True: a verbose jest or lighthouse run was held in
+memory in full only to keep its last (or first) 500 characters. An
+OutputSink instead pumps each pipe in fixed-size chunks into
+
+  <out-dir>/logs/<group>/<label>.stdout.log
+  <out-dir>/logs/<group>/<label>.stderr.log
+
+and keeps a bounded ring buffer of the last TAIL_BYTES per stream for the
+report rows. While the child runs it appends progress events (started,
+periodic output byte/line counts, finished) as JSON lines to
+<out-dir>/logs/progress.jsonl, so `tail -f` shows what a long check is doing.
+
+A sink without a log dir keeps only the tails (and emits no events).
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import os
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, BinaryIO, Deque, Dict, List, Optional, Sequence
+
+LOGS_DIR = "logs"
+PROGRESS_FILE = "progress.jsonl"
+TAIL_BYTES = 2048
+TAIL_CHARS = 500
+CHUNK_BYTES = 64 * 1024
+PROGRESS_INTERVAL_S = 2.0
+STREAMS = ("stdout", "stderr")
+READER_JOIN_S = 5.0
+
+
+class TailBuffer:
+    """Ring buffer of the last `limit` bytes written to it."""
+
+    def __init__(self, limit: int = TAIL_BYTES):
+        self.limit = limit
+        self.chunks: Deque[bytes] = deque()
+        self.size = 0
+
+    def write(self, chunk: bytes) -> None:
+        if len(chunk) >= self.limit:
+            self.chunks.clear()
+            self.chunks.append(chunk[-self.limit:])
+            self.size = self.limit
+            return
+        self.chunks.append(chunk)
+        self.size += len(chunk)
+        while self.size - len(self.chunks[0]) >= self.limit:
+            self.size -= len(self.chunks.popleft())
+
+    def text(self, chars: int = TAIL_CHARS) -> str:
+        data = b"".join(self.chunks)[-self.limit:]
+        return data.decode("utf-8", errors="replace")[-chars:]
+
+
+def append_event(path: Path, event: Dict[str, Any]) -> None:
+    """One O_APPEND write per event, so concurrent checks do not interleave lines."""
+    line = (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+    fd = os.open(str(path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+class OutputSink:
+    """Per-command log files + tails + progress events; pump() runs on one reader thread per stream."""
+
+    def __init__(self, out_dir: Optional[Path], group: str, label: str, interval: float = PROGRESS_INTERVAL_S):
+        self.out_dir = Path(out_dir) if out_dir else None
+        self.group = group
+        self.label = label
+        self.interval = interval
+        self.tails = {name: TailBuffer() for name in STREAMS}
+        self.bytes = {name: 0 for name in STREAMS}
+        self.lines = {name: 0 for name in STREAMS}
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.last_event = self.started
+        self.logs: Dict[str, Path] = {}
+        self.progress: Optional[Path] = None
+        if self.out_dir is not None:
+            log_dir = self.out_dir / LOGS_DIR / group
+            log_dir.mkdir(parents=True, exist_ok=True)
+            self.logs = {name: log_dir / f"{label}.{name}.log" for name in STREAMS}
+            self.progress = self.out_dir / LOGS_DIR / PROGRESS_FILE
+
+    def log_paths(self) -> Dict[str, str]:
+        """{stream}_log -> path relative to the out-dir (empty without a log dir)."""
+        if self.out_dir is None:
+            return {}
+        return {f"{name}_log": path.relative_to(self.out_dir).as_posix() for name, path in self.logs.items()}
+
+    def event(self, kind: str, **fields: Any) -> None:
+        if self.progress is None:
+            return
+        event = {
+            "ts": datetime.now(timezone.utc).isoformat(),
+            "group": self.group,
+            "label": self.label,
+            "event": kind,
+            "elapsed_ms": round((time.monotonic() - self.started) * 1000.0, 1),
+            **fields,
+        }
+        append_event(self.progress, event)
+
+    def counters(self) -> Dict[str, int]:
+        return {**{f"{n}_bytes": self.bytes[n] for n in STREAMS}, **{f"{n}_lines": self.lines[n] for n in STREAMS}}
+
+    def pump(self, name: str, stream: BinaryIO) -> None:
+        log = self.logs[name].open("wb") if name in self.logs else None
+        try:
+            read = getattr(stream, "read1", stream.read)
+            while True:
+                chunk = read(CHUNK_BYTES)
+                if not chunk:
+                    break
+                if log is not None:
+                    log.write(chunk)
+                with self.lock:
+                    self.tails[name].write(chunk)
+                    self.bytes[name] += len(chunk)
+                    self.lines[name] += chunk.count(b"\n")
+                    now = time.monotonic()
+                    due = self.progress is not None and now - self.last_event >= self.interval
+                    if due:
+                        self.last_event = now
+                        counters = self.counters()
+                if due:
+                    if log is not None:
+                        log.flush()
+                    self.event("output", **counters)
+        finally:
+            if log is not None:
+                log.close()
+
+    def tail(self, name: str, chars: int = TAIL_CHARS) -> str:
+        return self.tails[name].text(chars)
+
+
+def kill_group(proc: subprocess.Popen) -> None:
+    with contextlib.suppress(OSError):
+        os.killpg(proc.pid, signal.SIGKILL)
+
+
+def run_streamed(cmd: Sequence[str], sink: OutputSink, timeout: Optional[float] = None, **kwargs: Any) -> int:
+    """Run cmd with both pipes pumped into sink; return the exit code.
+
+    The child runs in its own session, so on timeout the whole process group is killed
+    (`npm run test` -> sh -> jest: the grandchildren hold the pipes too); then raises
+    subprocess.TimeoutExpired. Reader threads are joined for at most READER_JOIN_S, so a
+    descendant that escaped the group cannot block the caller either.
+    """
+    kwargs.setdefault("start_new_session", True)
+    proc = subprocess.Popen(list(cmd), stdout=subprocess.PIPE, stderr=subprocess.PIPE, **kwargs)
+    sink.event("started", pid=proc.pid, cmd=list(cmd))
+    readers = [threading.Thread(target=sink.pump, args=(name, getattr(proc, name)), daemon=True) for name in STREAMS]
+    for reader in readers:
+        reader.start()
+    try:
+        code = proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        kill_group(proc)
+        proc.wait()
+        code = None
+    deadline = time.monotonic() + READER_JOIN_S
+    for reader in readers:
+        reader.join(max(0.0, deadline - time.monotonic()))
+    if any(reader.is_alive() for reader in readers) and kwargs["start_new_session"]:
+        # 子进程已退出但后台子孙仍占着管道：结束整个进程组后再等一次
+        kill_group(proc)
+        deadline = time.monotonic() + READER_JOIN_S
+        for reader in readers:
+            reader.join(max(0.0, deadline - time.monotonic()))
+    if not any(reader.is_alive() for reader in readers):
+        for name in STREAMS:
+            getattr(proc, name).close()
+    if code is None:
+        sink.event("timeout", **sink.counters())
+        raise subprocess.TimeoutExpired(list(cmd), timeout)
+    sink.event("finished", exit_code=code, **sink.counters())
+    return code
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Show progress events of tool checks and plugin hooks")
+    parser.add_argument("out_dir", help="流水线 out-dir")
+    parser.add_argument("--label", default="", help="只显示该检查/hook")
+    args = parser.parse_args()
+
+    path = Path(args.out_dir) / LOGS_DIR / PROGRESS_FILE
+    try:
+        lines = path.read_text(encoding="utf-8").splitlines()
+    except OSError:
+        lines = []
+    events: List[Dict[str, Any]] = []
+    for line in lines:
+        try:
+            event = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(event, dict) and (not args.label or event.get("label") == args.label):
+            events.append(event)
+    latest: Dict[str, Dict[str, Any]] = {}
+    for event in events:
+        latest[f"{event.get('group')}/{event.get('label')}"] = event
+    print(json.dumps({"events": len(events), "latest": latest}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""Workspace walker: os.scandir traversal that prunes ignored directories before entering them.
+
+Directories named in skip_dirs (node_modules, .git, dist, ...) and absolute
+exclude paths are dropped by name while listing their parent, so nothing
+beneath them is listed or stat'ed. .gitignore / .ruiignore files (and the
+root's .git/info/exclude) are honoured with git semantics: rules are scoped to
+the directory holding the file, deeper files override shallower ones, the last
+matching rule wins, `!` re-includes, a trailing `/` matches directories only,
+and a pattern with a leading or inner `/` is anchored to its directory.
+
+Each ignore file is compiled once into a single regular expression (rules in
+reverse order as named alternatives, so the first alternative that matches is
+the last rule in the file); compiled files are memoized by (path, size, mtime)
+for long-lived processes. Symlinked directories are not followed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+SKIP_DIRS = frozenset({".git", "node_modules", "dist", "build", ".next", "coverage", "Ruiagents", ".rui-cache", "__pycache__"})
+IGNORE_FILES = (".gitignore", ".ruiignore")
+TRAILING_SPACE_RE = re.compile(r"(?<!\\) +$")
+
+
+def glob_segment(seg: str) -> str:
+    """Translate one path segment of a gitignore glob (*, ?, [...], \\x) to a regex."""
+    out: List[str] = []
+    i = 0
+    while i < len(seg):
+        c = seg[i]
+        if c == "\\" and i + 1 < len(seg):
+            out.append(re.escape(seg[i + 1]))
+            i += 2
+            continue
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            end = seg.find("]", i + 2 if seg[i + 1 : i + 2] in {"!", "^"} else i + 1)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = seg[i + 1 : end]
+                if body[:1] in {"!", "^"}:
+                    body = "^" + body[1:]
+                out.append("[" + body.replace("\\", "\\\\") + "]")
+                i = end
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+def translate(line: str) -> Optional[Tuple[str, bool, bool]]:
+    """(regex, negate, dir_only) for one ignore-file line; None for blanks and comments."""
+    line = TRAILING_SPACE_RE.sub("", line.rstrip("\r\n"))
+    if not line or line.startswith("#"):
+        return None
+    negate = line.startswith("!")
+    if negate or line.startswith("\\!") or line.startswith("\\#"):
+        line = line[1:]
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+    anchored = "/" in line
+    segs = line.lstrip("/").split("/")
+    parts: List[str] = []
+    for idx, seg in enumerate(segs):
+        last = idx == len(segs) - 1
+        if seg == "**":
+            parts.append(".*" if last else "(?:.*/)?")
+        else:
+            parts.append(glob_segment(seg) + ("" if last else "/"))
+    body = "".join(parts)
+    return ("" if anchored else "(?:.*/)?") + body, negate, dir_only
+
+
+class IgnoreFile:
+    """The rules of one ignore file, compiled to one regex for files and one for directories."""
+
+    def __init__(self, base: str, lines: Iterable[str]):
+        self.base = base
+        rules = [r for r in (translate(line) for line in lines) if r is not None]
+        self.rule_count = len(rules)
+        self.file_re = self._compile([r for r in rules if not r[2]])
+        self.dir_re = self._compile(rules)
+
+    @staticmethod
+    def _compile(rules: List[Tuple[str, bool, bool]]) -> Optional["re.Pattern[str]"]:
+        if not rules:
+            return None
+        # 逆序排列：第一个匹配的分支即文件中最后一条命中的规则；组名前缀 i=忽略 / n=取反
+        alts = [f"(?P<{'n' if neg else 'i'}{idx}>{regex})" for idx, (regex, neg, _d) in reversed(list(enumerate(rules)))]
+        return re.compile("(?:" + "|".join(alts) + r")\Z", re.DOTALL)
+
+    def verdict(self, rel: str, is_dir: bool) -> Optional[bool]:
+        """True = ignored, False = re-included by `!`, None = no rule matches."""
+        regex = self.dir_re if is_dir else self.file_re
+        if regex is None:
+            return None
+        m = regex.match(rel)
+        if m is None:
+            return None
+        return (m.lastgroup or "i")[0] == "i"
+
+
+_COMPILED: Dict[Tuple[str, str, int, int], IgnoreFile] = {}
+_COMPILED_LOCK = threading.Lock()
+
+
+def load_ignore_file(path: str, base: str) -> Optional[IgnoreFile]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = (path, base, st.st_size, st.st_mtime_ns)
+    with _COMPILED_LOCK:
+        cached = _COMPILED.get(key)
+    if cached is not None:
+        return cached
+    try:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            compiled = IgnoreFile(base, f.read().splitlines())
+    except OSError:
+        return None
+    with _COMPILED_LOCK:
+        return _COMPILED.setdefault(key, compiled)
+
+
+def is_ignored(layers: Tuple[IgnoreFile, ...], rel: str, is_dir: bool) -> bool:
+    # 深层规则文件优先；每个文件只覆盖其所在目录下的路径
+    for layer in reversed(layers):
+        sub = rel[len(layer.base) + 1 :] if layer.base else rel
+        verdict = layer.verdict(sub, is_dir)
+        if verdict is not None:
+            return verdict
+    return False
+
+
+class Walker:
+    def __init__(
+        self,
+        root: Path,
+        skip_dirs: Iterable[str] = SKIP_DIRS,
+        exclude: Iterable[Path] = (),
+        ignore_files: Iterable[str] = IGNORE_FILES,
+    ):
+        self.root = Path(root).resolve()
+        self.skip_dirs = frozenset(skip_dirs)
+        self.exclude = {str(Path(p).resolve()) for p in exclude}
+        self.ignore_names = tuple(ignore_files)
+        # 实际生效的规则文件（相对 root），随遍历累积
+        self.ignore_sources: List[str] = []
+        self.pruned_dirs = 0
+
+    def _layers(self, dirpath: str, rel: str, parent: Tuple[IgnoreFile, ...]) -> Tuple[IgnoreFile, ...]:
+        layers = parent
+        candidates = [(os.path.join(dirpath, name), name) for name in self.ignore_names]
+        if not rel and self.ignore_names:
+            candidates.insert(0, (os.path.join(dirpath, ".git", "info", "exclude"), ".git/info/exclude"))
+        for path, label in candidates:
+            compiled = load_ignore_file(path, rel)
+            if compiled is not None and compiled.rule_count:
+                layers = layers + (compiled,)
+                self.ignore_sources.append(f"{rel}/{label}" if rel else label)
+        return layers
+
+    def files(self) -> Iterator[Tuple[str, os.DirEntry]]:
+        """Yield (posix path relative to root, DirEntry) for every file that is not pruned or ignored."""
+        if not self.root.is_dir():
+            return
+        stack: List[Tuple[str, str, Tuple[IgnoreFile, ...]]] = [(str(self.root), "", ())]
+        while stack:
+            dirpath, rel, parent_layers = stack.pop()
+            layers = self._layers(dirpath, rel, parent_layers)
+            try:
+                with os.scandir(dirpath) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            subdirs = []
+            for entry in entries:
+                child = f"{rel}/{entry.name}" if rel else entry.name
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                if is_dir:
+                    if entry.name in self.skip_dirs or entry.path in self.exclude or is_ignored(layers, child, True):
+                        self.pruned_dirs += 1
+                        continue
+                    subdirs.append((entry.path, child, layers))
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                except OSError:
+                    continue
+                if layers and is_ignored(layers, child, False):
+                    continue
+                yield child, entry
+            # 逆序入栈，使同级目录按 scandir 顺序出栈
+            stack.extend(reversed(subdirs))
+
+
+def walk_files(root: Path, skip_dirs: Iterable[str] = SKIP_DIRS, exclude: Iterable[Path] = ()) -> List[str]:
+    return sorted(rel for rel, _entry in Walker(root, skip_dirs, exclude).files())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="List workspace files after skip_dirs / .gitignore / .ruiignore pruning")
+    parser.add_argument("--workspace-root", required=True)
+    parser.add_argument("--exclude", action="append", default=[], help="额外排除的绝对目录，可重复")
+    parser.add_argument("--summary", action="store_true", help="只输出文件数、剪枝目录数与生效的规则文件")
+    args = parser.parse_args()
+
+    walker = Walker(Path(args.workspace_root), exclude=[Path(p) for p in args.exclude])
+    files = sorted(rel for rel, _entry in walker.files())
+    if args.summary:
+        print(
+            json.dumps(
+                {"files": len(files), "pruned_dirs": walker.pruned_dirs, "ignore_files": walker.ignore_sources},
+                ensure_ascii=False,
+                indent=2,
+            )
+        )
+        return
+    for rel in files:
+        print(rel)
+
+
+if __name__ == "__main__":
+    main()
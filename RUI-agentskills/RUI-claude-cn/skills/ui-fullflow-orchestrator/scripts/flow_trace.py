@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""Span tracing for the fullflow pipeline, exported as Chrome trace-event JSON and JSONL.
+
+A Tracer collects spans (phase, step, subprocess, hook) with parent/child
+links and free-form attributes. The active span lives in a ContextVar, so
+nesting follows the call stack; flow_scheduler copies the context into its
+worker threads, which keeps parallel steps parented to the phase that
+scheduled them. Without an active tracer span() is a no-op, so modules can
+instrument unconditionally.
+
+  flow.trace.json   Chrome trace-event format (chrome://tracing, ui.perfetto.dev)
+  flow.trace.jsonl  one span per line: ids, parent, timing, thread, attributes
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import os
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+TRACE_JSON = "flow.trace.json"
+TRACE_JSONL = "flow.trace.jsonl"
+
+
+def now_us() -> int:
+    return time.time_ns() // 1000
+
+
+class Span:
+    def __init__(self, span_id: int, parent_id: Optional[int], name: str, cat: str, start_us: int, tid: int, attrs: Dict[str, Any]):
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.cat = cat
+        self.start_us = start_us
+        self.end_us = start_us
+        self.tid = tid
+        self.attrs = attrs
+        self.status = "ok"
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "cat": self.cat,
+            "start_us": self.start_us,
+            "end_us": self.end_us,
+            "duration_ms": round((self.end_us - self.start_us) / 1000, 3),
+            "thread": self.tid,
+            "status": self.status,
+            "attrs": self.attrs,
+        }
+
+
+class NullSpan:
+    """Returned by span() when tracing is inactive."""
+
+    span_id = None
+
+    def set(self, **attrs: Any) -> None:
+        return None
+
+
+NULL_SPAN = NullSpan()
+_CURRENT: ContextVar[Optional[Tuple["Tracer", Optional[Span]]]] = ContextVar("rui_trace_current", default=None)
+
+
+class Tracer:
+    def __init__(self) -> None:
+        self.pid = os.getpid()
+        self.spans: List[Span] = []
+        self.lock = threading.Lock()
+        self.threads: Dict[int, int] = {}
+        self.next_id = 1
+
+    def thread_id(self) -> int:
+        ident = threading.get_ident()
+        with self.lock:
+            if ident not in self.threads:
+                self.threads[ident] = len(self.threads) + 1
+            return self.threads[ident]
+
+    def start(self, name: str, cat: str, parent_id: Optional[int], attrs: Dict[str, Any], start_us: Optional[int] = None) -> Span:
+        tid = self.thread_id()
+        with self.lock:
+            span = Span(self.next_id, parent_id, name, cat, now_us() if start_us is None else start_us, tid, dict(attrs))
+            self.next_id += 1
+            self.spans.append(span)
+        return span
+
+    def add(self, name: str, cat: str, start_us: int, end_us: int, parent_id: Optional[int] = None, **attrs: Any) -> Span:
+        """Record an already-finished span (e.g. rebuilt from timer variables)."""
+        span = self.start(name, cat, parent_id, attrs, start_us)
+        span.end_us = max(end_us, start_us)
+        return span
+
+    def records(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            return [s.to_dict() for s in sorted(self.spans, key=lambda s: (s.start_us, s.span_id))]
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        records = self.records()
+        by_id = {r["span_id"]: r for r in records}
+        events: List[Dict[str, Any]] = [
+            {"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": "main" if tid == 1 else f"worker-{tid - 1}"}}
+            for tid in sorted({r["thread"] for r in records})
+        ]
+        for r in records:
+            events.append(
+                {
+                    "name": r["name"],
+                    "cat": r["cat"],
+                    "ph": "X",
+                    "ts": r["start_us"],
+                    "dur": r["end_us"] - r["start_us"],
+                    "pid": self.pid,
+                    "tid": r["thread"],
+                    "args": {"span_id": r["span_id"], "parent_id": r["parent_id"], "status": r["status"], **r["attrs"]},
+                }
+            )
+            parent = by_id.get(r["parent_id"])
+            if parent and parent["thread"] != r["thread"]:
+                # 跨线程的父子关系用 flow 箭头连接
+                events.append({"name": "child", "cat": "link", "ph": "s", "id": r["span_id"], "ts": r["start_us"], "pid": self.pid, "tid": parent["thread"]})
+                events.append({"name": "child", "cat": "link", "ph": "f", "bp": "e", "id": r["span_id"], "ts": r["start_us"], "pid": self.pid, "tid": r["thread"]})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, out_dir: str | Path) -> Tuple[Path, Path]:
+        out_dir = Path(out_dir)
+        json_path, jsonl_path = out_dir / TRACE_JSON, out_dir / TRACE_JSONL
+        json_path.write_text(json.dumps(self.chrome_trace(), ensure_ascii=False) + "\n", encoding="utf-8")
+        with open(jsonl_path, "w", encoding="utf-8") as f:
+            for record in self.records():
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return json_path, jsonl_path
+
+
+def activate(tracer: Tracer) -> Any:
+    """Make tracer current for this context; pass the token to deactivate()."""
+    return _CURRENT.set((tracer, None))
+
+
+def deactivate(token: Any) -> None:
+    _CURRENT.reset(token)
+
+
+def current_span() -> Span | NullSpan:
+    current = _CURRENT.get()
+    return current[1] if current and current[1] is not None else NULL_SPAN
+
+
+@contextlib.contextmanager
+def span(name: str, cat: str = "step", **attrs: Any) -> Iterator[Span | NullSpan]:
+    current = _CURRENT.get()
+    if current is None:
+        yield NULL_SPAN
+        return
+    tracer, parent = current
+    s = tracer.start(name, cat, parent.span_id if parent else None, attrs)
+    token = _CURRENT.set((tracer, s))
+    try:
+        yield s
+    except BaseException as exc:
+        s.status = "error"
+        s.set(error=type(exc).__name__)
+        raise
+    finally:
+        _CURRENT.reset(token)
+        s.end_us = now_us()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Summarize a fullflow trace (flow.trace.jsonl)")
+    parser.add_argument("trace", help="flow.trace.jsonl 路径或其所在 out-dir")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    path = Path(args.trace)
+    if path.is_dir():
+        path = path / TRACE_JSONL
+    records = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines() if line.strip()]
+    per_cat: Dict[str, float] = {}
+    for r in records:
+        per_cat[r["cat"]] = per_cat.get(r["cat"], 0.0) + r["duration_ms"]
+    slowest = sorted(records, key=lambda r: r["duration_ms"], reverse=True)[: args.top]
+    print(
+        json.dumps(
+            {
+                "spans": len(records),
+                "duration_ms_by_cat": {k: round(v, 3) for k, v in sorted(per_cat.items())},
+                "slowest": [{"name": r["name"], "cat": r["cat"], "duration_ms": r["duration_ms"]} for r in slowest],
+            },
+            ensure_ascii=False,
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Thin client for fullflow_daemon.py: run a skill script through the daemon when it is up.
+
+Usage (drop-in for `python3 <script> ...`):
+  python3 skills/ui-fullflow-orchestrator/scripts/fullflow_client.py \\
+    skills/requirements-elicitation-engine/scripts/generate_requirements_brief.py --brief "..." --out ...
+
+run_fullflow_pipeline.sh / fullflow_driver.py run the whole pipeline in the
+daemon; ui_library_engine.mjs is answered from the daemon's engine cache.
+When no daemon answers (or RUI_DAEMON=off) the script is exec'd directly.
+Only json/os/socket/sys are imported (a hand-rolled HTTP/1.0 exchange instead
+of http.client) so the client starts about as fast as a bare interpreter.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import sys
+from typing import Any, Dict, List, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))))
+# 随请求转发给 daemon 的环境变量（影响 workspace 解析与配置）
+FORWARD_ENV_PREFIXES = ("RUI_",)
+FORWARD_ENV_KEYS = ("OLDPWD", "HOME")
+INTERPRETERS = {".py": [sys.executable], ".sh": ["bash"], ".mjs": ["node"]}
+
+
+def default_socket_path() -> str:
+    tmp = os.environ.get("TMPDIR") or "/tmp"
+    return os.environ.get("RUI_DAEMON_SOCKET") or os.path.join(tmp, f"rui-fullflow-{os.getuid()}.sock")
+
+
+def endpoint() -> Tuple[str, Any]:
+    """("http", (host, port)) when RUI_DAEMON_URL is set, else ("unix", socket_path)."""
+    url = os.environ.get("RUI_DAEMON_URL", "")
+    if url:
+        hostport = url.split("://", 1)[-1].rstrip("/")
+        host, _, port = hostport.rpartition(":")
+        return "http", (host or "127.0.0.1", int(port))
+    return "unix", default_socket_path()
+
+
+def request(method: str, path: str, payload: Dict[str, Any] | None = None, timeout: float | None = None) -> Dict[str, Any]:
+    """Send one JSON request; raises OSError when the daemon is not reachable."""
+    kind, address = endpoint()
+    sock = socket.socket(socket.AF_UNIX if kind == "unix" else socket.AF_INET, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(address)
+        body = json.dumps(payload or {}, ensure_ascii=False).encode("utf-8") if method == "POST" else b""
+        head = f"{method} {path} HTTP/1.0\r\nHost: localhost\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+        sock.sendall(head.encode("ascii") + body)
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    finally:
+        sock.close()
+    _, sep, raw = b"".join(chunks).partition(b"\r\n\r\n")
+    try:
+        if not sep:
+            raise ValueError("missing header terminator")
+        return json.loads(raw.decode("utf-8") or "{}")
+    except ValueError as exc:
+        raise OSError(f"daemon 响应无效: {exc}") from exc
+
+
+def resolve_script(arg: str) -> str:
+    path = arg
+    if not os.path.isabs(path) and not os.path.exists(path) and os.path.exists(os.path.join(REPO_ROOT, arg)):
+        path = os.path.join(REPO_ROOT, arg)
+    return os.path.realpath(path)
+
+
+def forwarded_env() -> Dict[str, str]:
+    return {k: v for k, v in os.environ.items() if k.startswith(FORWARD_ENV_PREFIXES) or k in FORWARD_ENV_KEYS}
+
+
+def run_direct(script: str, argv: List[str]) -> None:
+    suffix = os.path.splitext(script)[1]
+    cmd = [*INTERPRETERS.get(suffix, [sys.executable]), script, *argv]
+    if suffix == ".mjs":
+        os.chdir(REPO_ROOT)
+    os.execvp(cmd[0], cmd)
+
+
+def main(argv: List[str] | None = None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] in {"-h", "--help"}:
+        print(__doc__.strip())
+        return 0 if argv else 2
+    script, script_args = resolve_script(argv[0]), argv[1:]
+    if os.environ.get("RUI_DAEMON", "").lower() in {"0", "off", "false"}:
+        run_direct(script, script_args)
+    try:
+        result = request(
+            "POST",
+            "/run",
+            {"script": script, "argv": script_args, "cwd": os.getcwd(), "env": forwarded_env()},
+        )
+    except OSError:
+        run_direct(script, script_args)
+        return 127  # not reached
+    if result.get("unsupported"):
+        run_direct(script, script_args)
+    if "exit_code" not in result:
+        sys.stderr.write(f"fullflow daemon error: {result.get('error', result)}\n")
+        return 1
+    sys.stdout.write(result.get("stdout", ""))
+    sys.stderr.write(result.get("stderr", ""))
+    return int(result["exit_code"])
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -92,23 +92,13 @@ def validate_constraints(
     return issues
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description="Validate flow state with state machine rules")
-    parser.add_argument("--state-file", required=True)
-    parser.add_argument("--rules-file", required=True)
-    parser.add_argument("--stage-status", default="")
-    parser.add_argument("--report", required=True)
-    args = parser.parse_args()
-
-    state_file = Path(args.state_file)
-    rules_file = Path(args.rules_file)
-    report_file = Path(args.report)
-    stage_status_file = Path(args.stage_status) if args.stage_status else None
-
-    state = load_json(state_file, {})
-    rules = load_json(rules_file, {})
-    stage_status = load_json(stage_status_file, []) if stage_status_file else []
-
+def validate_flow_state(
+    state: Dict[str, Any],
+    rules: Dict[str, Any],
+    stage_status: List[Dict[str, Any]],
+    state_file: Path,
+    rules_file: Path,
+) -> Dict[str, Any]:
     rule_states = list(rules.get("states") or ["pending", "in_progress", "completed", "failed", "skipped"])
     phase_sequence = list(
         rules.get("phase_sequence")
@@ -143,10 +133,31 @@ def main() -> None:
         "checks": checks,
         "issues": issues,
     }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Validate flow state with state machine rules")
+    parser.add_argument("--state-file", required=True)
+    parser.add_argument("--rules-file", required=True)
+    parser.add_argument("--stage-status", default="")
+    parser.add_argument("--report", required=True)
+    args = parser.parse_args()
+
+    state_file = Path(args.state_file)
+    rules_file = Path(args.rules_file)
+    report_file = Path(args.report)
+    stage_status_file = Path(args.stage_status) if args.stage_status else None
+
+    state = load_json(state_file, {})
+    rules = load_json(rules_file, {})
+    stage_status = load_json(stage_status_file, []) if stage_status_file else []
+
+    report = validate_flow_state(state, rules, stage_status, state_file, rules_file)
     report_file.write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
     print(json.dumps(report, ensure_ascii=False, indent=2))
 
-    if issues:
+    if report["issues"]:
         raise SystemExit(2)
 
 
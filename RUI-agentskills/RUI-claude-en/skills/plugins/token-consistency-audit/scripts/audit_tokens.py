@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""token-consistency-audit: check that tokens.json and tokens.css were both produced.
+
+In-process entry point (`python: scripts.audit_tokens:run` in plugin.yaml).
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict
+
+
+def run(out_dir: Path, **_: Any) -> Dict[str, Any]:
+    json_path = out_dir / "tokens.json"
+    css_path = out_dir / "tokens.css"
+    report_path = out_dir / "token-consistency.report.json"
+
+    json_exists = json_path.exists()
+    css_exists = css_path.exists()
+    json_size = json_path.stat().st_size if json_exists else 0
+    css_size = css_path.stat().st_size if css_exists else 0
+
+    report = {
+        "plugin": "token-consistency-audit",
+        "status": "pass" if (json_exists and css_exists) else "warn",
+        "checks": {
+            "tokens_json_exists": json_exists,
+            "tokens_css_exists": css_exists,
+            "tokens_json_size": json_size,
+            "tokens_css_size": css_size,
+        },
+    }
+    report_path.write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    return {"status": report["status"]}
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Changed-file scope for the workspace analyzers (--changed-since / --changed-files).
+
+In pre-merge CI only the files a branch touched matter. The changed set is
+either listed explicitly (--changed-files, comma separated, repeatable) or
+resolved with `git diff --name-only --relative <ref>`, i.e. every tracked
+file whose working-tree contents differ from <ref> (committed, staged or
+not), relative to the workspace root. Both sources may be combined.
+
+Phase 4 then analyses and reports only the changed set. validate_gates.py
+restricts per-file checks (cyclomatic complexity) to it, while workspace-wide
+ratios (component reuse, TS coverage) are still aggregated over every file,
+taking unchanged files' metrics from the analysis cache.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+
+def git_changed_files(workspace_root: Path, since: str) -> List[str]:
+    """Paths (relative to workspace_root) that differ from `since` in git; exits with a message on git errors."""
+    try:
+        proc = subprocess.run(
+            ["git", "-C", str(workspace_root), "diff", "--name-only", "--relative", since, "--"],
+            capture_output=True,
+            text=True,
+        )
+    except OSError as exc:
+        raise SystemExit(f"无法执行 git diff: {exc}")
+    if proc.returncode != 0:
+        raise SystemExit(f"git diff --name-only {since} 失败: {proc.stderr.strip()}")
+    return [line for line in proc.stdout.splitlines() if line.strip()]
+
+
+def normalize(path: str, workspace_root: Path) -> Optional[str]:
+    """Posix path relative to workspace_root; None for paths outside it."""
+    p = Path(path.strip())
+    if p.is_absolute():
+        try:
+            p = p.resolve().relative_to(workspace_root)
+        except ValueError:
+            return None
+    rel = p.as_posix()
+    while rel.startswith("./"):
+        rel = rel[2:]
+    return rel or None
+
+
+def resolve_changed(workspace_root: Path, since: str = "", files: Iterable[str] = ()) -> Optional[List[str]]:
+    """Sorted changed set for the given options, or None when neither is set (whole-workspace mode)."""
+    items = [p for value in files for p in value.split(",") if p.strip()]
+    if not since and not items:
+        return None
+    workspace_root = Path(workspace_root).resolve()
+    if since:
+        items.extend(git_changed_files(workspace_root, since))
+    return sorted({rel for rel in (normalize(p, workspace_root) for p in items) if rel})
+
+
+def scope_summary(changed: List[str], since: str = "", analyzed: int = 0) -> Dict[str, Any]:
+    """The `changed_scope` block that scoped reports carry."""
+    return {"since": since or None, "changed_files": changed, "changed_count": len(changed), "analyzed_files": analyzed}
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--changed-since", default="", help="仅分析相对该 git ref 变更的文件（git diff --name-only）")
+    parser.add_argument("--changed-files", action="append", default=[], help="仅分析这些文件（逗号分隔，可重复）")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Print the changed-file set used by --changed-since / --changed-files")
+    parser.add_argument("--workspace-root", default=".")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    changed = resolve_changed(Path(args.workspace_root), args.changed_since, args.changed_files)
+    print(json.dumps({"scoped": changed is not None, "changed_files": changed or []}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
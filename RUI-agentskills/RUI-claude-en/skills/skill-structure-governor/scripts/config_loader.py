@@ -40,12 +40,28 @@ DEFAULT_CONFIG: Dict[str, Any] = {
         "output_dir": "Ruiagents",
         "keep_history": True,
         "max_history_count": 10,
+        "archive_keep_loose": 5,
+        "archive_after_days": 30,
+        "archive_compression": "gz",
     },
     "logging": {
         "level": "info",
         "save_intermediate": True,
         "profiling": False,
     },
+    "cache": {
+        "enabled": True,
+        "dir": ".rui-cache",
+        "max_size_mb": 256,
+    },
+    "tool_checks": {
+        "parallelism": 2,
+        "timeout_s": 300,
+    },
+    "plugins": {
+        "parallelism": 4,
+        "timeout_s": 120,
+    },
 }
 
 
@@ -106,6 +122,18 @@ class RuiConfig:
         lines.append(f"RUI_CFG_GATE_REUSE={int(cfg['quality_gates'].get('component_reuse_rate_min', 40))}")
         lines.append(f"RUI_CFG_GATE_COMPLEXITY={int(cfg['quality_gates'].get('cyclomatic_complexity_max', 10))}")
         lines.append(f"RUI_CFG_GATE_TS={int(cfg['quality_gates'].get('ts_type_coverage_min', 90))}")
+        lines.append(f"RUI_CFG_KEEP_HISTORY={'1' if cfg['artifacts'].get('keep_history', True) else '0'}")
+        lines.append(f"RUI_CFG_MAX_HISTORY={int(cfg['artifacts'].get('max_history_count', 10))}")
+        lines.append(f"RUI_CFG_ARCHIVE_KEEP_LOOSE={int(cfg['artifacts'].get('archive_keep_loose', 5))}")
+        lines.append(f"RUI_CFG_ARCHIVE_AFTER_DAYS={float(cfg['artifacts'].get('archive_after_days', 30))}")
+        lines.append(f"RUI_CFG_ARCHIVE_COMPRESSION={cfg['artifacts'].get('archive_compression', 'gz')}")
+        lines.append(f"RUI_CFG_CACHE_ENABLED={'1' if cfg['cache'].get('enabled', True) else '0'}")
+        lines.append(f"RUI_CFG_CACHE_DIR={cfg['cache'].get('dir', '.rui-cache')}")
+        lines.append(f"RUI_CFG_CACHE_MAX_MB={int(cfg['cache'].get('max_size_mb', 256))}")
+        lines.append(f"RUI_CFG_TOOL_PARALLELISM={int(cfg['tool_checks'].get('parallelism', 2))}")
+        lines.append(f"RUI_CFG_TOOL_TIMEOUT_S={int(cfg['tool_checks'].get('timeout_s', 300))}")
+        lines.append(f"RUI_CFG_PLUGIN_PARALLELISM={int(cfg['plugins'].get('parallelism', 4))}")
+        lines.append(f"RUI_CFG_PLUGIN_TIMEOUT_S={int(cfg['plugins'].get('timeout_s', 120))}")
         return "\n".join(lines)
 
 
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""Persistent tool-check outcome cache (<cache-dir>/tool-checks.sqlite).
+
+`npm run test` / `npm run typecheck` take minutes and their outcome only
+depends on the workspace contents and the command. Each check is keyed by
+
+  sha256(Merkle root of the workspace files, package.json digest,
+         lockfile name + digest, runner, check name, script command)
+
+The Merkle root hashes every indexed file (workspace_index walk: skip_dirs,
+.gitignore and .ruiignore pruned, out-dir and cache dir excluded) into
+per-directory nodes, so any edit, addition, removal or rename anywhere in the
+tracked tree changes it. Leaf digests are sha256 of the raw bytes, memoized
+per absolute path with size + mtime like the analysis cache, so an unchanged
+tree is re-stat'ed but not re-read.
+
+Passed and failed outcomes are both stored (a failing test run stays failed
+until something changes); rows that never produced an exit code (timeouts,
+missing runner) are not. tool_checks.run_checks() serves stored rows with
+`cached: true`; their log paths belong to the run that produced them and are
+not stored. The newest MAX_RESULTS outcomes are kept.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from workspace_index import WorkspaceIndex
+
+CACHE_FILE = "tool-checks.sqlite"
+MAX_RESULTS = 500
+UNSTORED_KEYS = {"cached", "stdout_log", "stderr_log"}
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS file_digests (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tool_results (
+    key TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    row TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+"""
+
+
+def file_digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def merkle_root(leaves: Dict[str, str]) -> str:
+    """Root hash of the directory tree whose leaves are {posix rel path: content digest}."""
+    tree: Dict[str, Any] = {}
+    for rel, digest in leaves.items():
+        *dirs, name = rel.split("/")
+        node = tree
+        for d in dirs:
+            node = node.setdefault(d + "/", {})
+        node[name] = digest
+
+    def node_hash(node: Dict[str, Any]) -> str:
+        h = hashlib.sha256()
+        for name in sorted(node):
+            child = node[name]
+            h.update(f"{name}\0{node_hash(child) if isinstance(child, dict) else child}\n".encode("utf-8"))
+        return h.hexdigest()
+
+    return node_hash(tree)
+
+
+def check_key(inputs: Dict[str, Any], name: str, command: str) -> str:
+    payload = {**inputs, "check": name, "command": command}
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def cacheable(row: Dict[str, Any]) -> bool:
+    return row.get("status") in {"passed", "failed"} and "exit_code" in row
+
+
+class ToolCheckCache:
+    """sqlite-backed outcomes; ToolCheckCache(None) is a disabled cache with the same API."""
+
+    def __init__(self, path: Optional[Path]):
+        self.path = Path(path) if path else None
+        self.conn: Optional[sqlite3.Connection] = None
+        self.lock = threading.Lock()
+        self.pending: List[Tuple[str, str, str, str, str]] = []
+        self.stats = {"hits": 0, "misses": 0, "files_hashed": 0}
+        if self.path is not None:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self.conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+                self.conn.execute("PRAGMA journal_mode=WAL")
+                self.conn.executescript(SCHEMA)
+                self.conn.commit()
+            except sqlite3.Error:
+                # 缓存不可用（只读目录、损坏文件）时退化为不缓存
+                self.conn = None
+
+    def __enter__(self) -> "ToolCheckCache":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    @property
+    def enabled(self) -> bool:
+        return self.conn is not None
+
+    def tree_digest(self, workspace_root: Path, exclude: Iterable[Path] = ()) -> str:
+        """Merkle root of the indexed workspace files; unchanged files reuse their memoized digest."""
+        assert self.conn is not None
+        exclude = [Path(p) for p in exclude]
+        if self.path is not None:
+            exclude.append(self.path.parent)
+        index = WorkspaceIndex.build(workspace_root, exclude=exclude)
+        prefix = f"{str(index.root).rstrip('/')}/"
+        with self.lock:
+            memo = {
+                path: (size, mtime, sha)
+                for path, size, mtime, sha in self.conn.execute(
+                    "SELECT path, size, mtime_ns, sha256 FROM file_digests WHERE substr(path, 1, ?) = ?", (len(prefix), prefix)
+                )
+            }
+        leaves: Dict[str, str] = {}
+        fresh: List[Tuple[str, int, int, str]] = []
+        for entry in index.files():
+            key = str(entry.path)
+            row = memo.pop(key, None)
+            if row is not None and row[0] == entry.size and row[1] == entry.mtime_ns:
+                leaves[entry.rel] = row[2]
+                continue
+            try:
+                digest = file_digest(entry.path)
+            except OSError:
+                continue
+            leaves[entry.rel] = digest
+            fresh.append((key, entry.size, entry.mtime_ns, digest))
+        self.stats["files_hashed"] += len(fresh)
+        with self.lock:
+            try:
+                with self.conn:
+                    self.conn.executemany("INSERT OR REPLACE INTO file_digests VALUES (?, ?, ?, ?)", fresh)
+                    # 已删除/已忽略文件的摘要不再保留
+                    self.conn.executemany("DELETE FROM file_digests WHERE path = ?", [(p,) for p in memo])
+            except sqlite3.Error:
+                pass
+        return merkle_root(leaves)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.conn is None:
+            return None
+        with self.lock:
+            found = self.conn.execute("SELECT row FROM tool_results WHERE key = ?", (key,)).fetchone()
+        if found is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return json.loads(found[0])
+
+    def put(self, key: str, row: Dict[str, Any]) -> None:
+        if self.conn is None or not cacheable(row):
+            return
+        stored = {k: v for k, v in row.items() if k not in UNSTORED_KEYS}
+        with self.lock:
+            self.pending.append(
+                (key, str(row.get("name")), str(row.get("status")), json.dumps(stored, ensure_ascii=False), datetime.now(timezone.utc).isoformat())
+            )
+
+    def close(self) -> None:
+        if self.conn is None:
+            return
+        with self.lock:
+            try:
+                with self.conn:
+                    if self.pending:
+                        self.conn.executemany("INSERT OR REPLACE INTO tool_results VALUES (?, ?, ?, ?, ?)", self.pending)
+                    self.conn.execute(
+                        "DELETE FROM tool_results WHERE key NOT IN (SELECT key FROM tool_results ORDER BY created_at DESC LIMIT ?)",
+                        (MAX_RESULTS,),
+                    )
+            except sqlite3.Error:
+                pass
+            finally:
+                self.pending = []
+                self.conn.close()
+                self.conn = None
+
+
+def cache_path(cache_dir: str | Path, workspace_root: str | Path) -> Path:
+    """<cache-dir>/tool-checks.sqlite, with a relative cache dir resolved against the workspace."""
+    cache_dir = Path(cache_dir)
+    if not cache_dir.is_absolute():
+        cache_dir = Path(workspace_root) / cache_dir
+    return cache_dir / CACHE_FILE
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Inspect or clear the tool-check outcome cache")
+    parser.add_argument("action", choices=["stats", "clear"])
+    parser.add_argument("--cache", required=True, help="tool-checks.sqlite 路径")
+    args = parser.parse_args()
+
+    path = Path(args.cache)
+    if not path.exists():
+        print(json.dumps({"cache": str(path), "results": 0}, ensure_ascii=False))
+        return
+    conn = sqlite3.connect(str(path), timeout=30)
+    try:
+        conn.executescript(SCHEMA)
+        if args.action == "clear":
+            with conn:
+                conn.execute("DELETE FROM tool_results")
+                conn.execute("DELETE FROM file_digests")
+        per_status = dict(conn.execute("SELECT status, COUNT(*) FROM tool_results GROUP BY status ORDER BY status").fetchall())
+        digests = conn.execute("SELECT COUNT(*) FROM file_digests").fetchone()[0]
+    finally:
+        conn.close()
+    print(
+        json.dumps(
+            {"cache": str(path), "results": sum(per_status.values()), "by_status": per_status, "file_digests": digests, "size_bytes": path.stat().st_size},
+            ensure_ascii=False,
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
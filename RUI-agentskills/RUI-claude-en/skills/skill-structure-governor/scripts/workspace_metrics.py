@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""Single-pass multi-metric file analysis shared by Phase 4 and validate_gates.py.
+
+Each per-file metric is a Visitor registered on the module-level ANALYZER.
+A file is decoded once (through the workspace index), split into lines once,
+and fed to every visitor that accepts its suffix: line visitors see each line
+in one shared loop, text visitors see the whole decoded text. The result is
+one dict per file, {metric name: value}, holding only threshold-independent
+values; Phase 4 turns them into findings and the gate validator aggregates
+them into workspace-wide ratios.
+
+Both consumers ask for the same analyzer id, so a file analysed for Phase 4
+is served to the gate validator from the in-run memo on the index
+(WorkspaceIndex.metrics) or from the analysis cache instead of being scanned
+again. The id changes whenever a visitor's source file does.
+
+Registered metrics:
+  file_lines          all source files      line count
+  render_logic_lines  logic files           JSX/template lines
+  repeated_pattern    logic files           [most repeated markup line, count]
+  forwarded_prop      logic files           [most forwarded prop, count]
+  component_tags      component files       {custom tag: usage count}
+  complexity          logic files           1 + keyword/operator matches
+  type_points         .ts/.tsx (not .d.ts)  [typed, total] declaration points
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import inspect
+import json
+import re
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple, Type
+
+from analysis_cache import AnalysisCache
+from workspace_index import FileEntry, WorkspaceIndex
+
+LOGIC_EXT = frozenset({".ts", ".tsx", ".js", ".jsx", ".vue", ".svelte"})
+COMPONENT_EXT = frozenset({".tsx", ".jsx", ".vue", ".svelte"})
+
+
+class FileContext:
+    """One decoded file; lines are split once and shared by all visitors."""
+
+    __slots__ = ("rel", "suffix", "text", "lines")
+
+    def __init__(self, rel: str, suffix: str, text: str, lines: Optional[List[str]] = None):
+        self.rel = rel
+        self.suffix = suffix
+        self.text = text
+        self.lines = text.splitlines() if lines is None else lines
+
+
+class Visitor:
+    """One metric. A fresh instance is created per file; override line() and/or finish()."""
+
+    name = ""
+    suffixes: FrozenSet[str] = frozenset()
+    # True: line() is called for every line of the file in the shared loop
+    per_line = False
+    # True: comment/blank/import/export lines are filtered once by the loop instead of by each visitor
+    skip_noise = False
+
+    @classmethod
+    def accepts(cls, rel: str, suffix: str) -> bool:
+        return not cls.suffixes or suffix in cls.suffixes
+
+    def __init__(self, ctx: FileContext):
+        self.ctx = ctx
+
+    def line(self, text: str) -> None:
+        pass
+
+    def finish(self) -> Any:
+        raise NotImplementedError
+
+
+class MultiMetricAnalyzer:
+    def __init__(self, name: str):
+        self.name = name
+        self.visitors: List[Type[Visitor]] = []
+        self._id = ""
+
+    def register(self, visitor: Type[Visitor]) -> Type[Visitor]:
+        """Class decorator; metric names must be unique."""
+        if any(v.name == visitor.name for v in self.visitors):
+            raise ValueError(f"重复注册的指标: {visitor.name}")
+        self.visitors.append(visitor)
+        self._id = ""
+        return visitor
+
+    @property
+    def id(self) -> str:
+        """name@<digest of every visitor's source file>; cache rows of other digests are stale."""
+        if not self._id:
+            digest = hashlib.sha256()
+            for source in sorted({inspect.getsourcefile(v) or "" for v in self.visitors}):
+                digest.update(Path(source).read_bytes())
+            self._id = f"{self.name}@{digest.hexdigest()[:12]}"
+        return self._id
+
+    def analyze(self, ctx: FileContext) -> Dict[str, Any]:
+        visitors = [v(ctx) for v in self.visitors if v.accepts(ctx.rel, ctx.suffix)]
+        every_line = [v for v in visitors if v.per_line and not v.skip_noise]
+        code_lines = [v for v in visitors if v.per_line and v.skip_noise]
+        if every_line or code_lines:
+            for text in ctx.lines:
+                for v in every_line:
+                    v.line(text)
+                if code_lines and not is_noise_line(text):
+                    for v in code_lines:
+                        v.line(text)
+        return {v.name: v.finish() for v in visitors}
+
+    def analyze_text(self, rel: str, suffix: str, text: str) -> Dict[str, Any]:
+        return self.analyze(FileContext(rel, suffix.lower(), text))
+
+
+ANALYZER = MultiMetricAnalyzer("metrics")
+
+
+def is_noise_line(text: str) -> bool:
+    s = text.strip()
+    return (
+        not s
+        or s.startswith("//")
+        or s.startswith("/*")
+        or s.startswith("*")
+        or s.startswith("<!--")
+        or s.startswith("import ")
+        or s.startswith("export ")
+    )
+
+
+# ---- Phase 4 指标（逐行） ----
+
+JSX_LIKE_PATTERN = re.compile(r"<[A-Za-z][A-Za-z0-9_.:-]*([\s>/]|$)")
+FORWARD_PROP_PATTERN = re.compile(r"\b([A-Za-z_][A-Za-z0-9_]*)\s*=\s*\{\1\}")
+SPREAD_PROP_PATTERN = re.compile(r"\{\s*\.\.\.([A-Za-z_][A-Za-z0-9_]*)\s*\}")
+# 透传写法 name={name} 必含 "=\s*{"，先用它筛行（比带反向引用的完整匹配便宜得多）
+FORWARD_PROP_HINT = re.compile(r"=\s*\{")
+
+
+@ANALYZER.register
+class FileLines(Visitor):
+    name = "file_lines"
+
+    def finish(self) -> int:
+        return len(self.ctx.lines)
+
+
+@ANALYZER.register
+class RenderLogicLines(Visitor):
+    """渲染逻辑行数（启发式：JSX/模板行）。"""
+
+    name = "render_logic_lines"
+    suffixes = LOGIC_EXT
+    per_line = True
+    skip_noise = True
+
+    def __init__(self, ctx: FileContext):
+        super().__init__(ctx)
+        self.count = 0
+
+    def line(self, text: str) -> None:
+        if "<" in text and JSX_LIKE_PATTERN.search(text):
+            self.count += 1
+
+    def finish(self) -> int:
+        return self.count
+
+
+@ANALYZER.register
+class RepeatedPattern(Visitor):
+    """相同模式重复次数（启发式）。"""
+
+    name = "repeated_pattern"
+    suffixes = LOGIC_EXT
+    per_line = True
+    skip_noise = True
+
+    def __init__(self, ctx: FileContext):
+        super().__init__(ctx)
+        self.counter: Counter = Counter()
+
+    def line(self, text: str) -> None:
+        stripped = text.strip()
+        # 归一化只会缩短行、不会产生新的 "<" / "class="，先用廉价条件排除
+        if len(stripped) < 24 or ("<" not in stripped and "class" not in stripped):
+            return
+        # 等价于 re.sub(r"\s+", " ", stripped)（str.split 与 \s 使用同一空白字符集）
+        normalized = " ".join(stripped.split())
+        if len(normalized) >= 24 and ("<" in normalized or "className=" in normalized or "class=" in normalized):
+            self.counter[normalized] += 1
+
+    def finish(self) -> List[Any]:
+        return list(max(self.counter.items(), key=lambda x: x[1])) if self.counter else ["", 0]
+
+
+@ANALYZER.register
+class ForwardedProp(Visitor):
+    """Props 穿透层级（启发式：同名 props 原样透传次数）。"""
+
+    name = "forwarded_prop"
+    suffixes = LOGIC_EXT
+    per_line = True
+    skip_noise = True
+
+    def __init__(self, ctx: FileContext):
+        super().__init__(ctx)
+        self.counter: Counter = Counter()
+
+    def line(self, text: str) -> None:
+        # 两种写法都以 "{" 开始取值，无 "{" 的行不可能命中
+        if "{" not in text:
+            return
+        if FORWARD_PROP_HINT.search(text):
+            for m in FORWARD_PROP_PATTERN.finditer(text):
+                self.counter[m.group(1)] += 1
+        if "..." in text:
+            for m in SPREAD_PROP_PATTERN.finditer(text):
+                self.counter[m.group(1)] += 1
+
+    def finish(self) -> List[Any]:
+        return list(max(self.counter.items(), key=lambda x: x[1])) if self.counter else ["", 0]
+
+
+# ---- 门禁指标（整文本） ----
+
+HTML_TAGS = {
+    "div", "span", "p", "a", "ul", "ol", "li", "button", "input", "textarea", "label", "select", "option",
+    "form", "section", "header", "footer", "main", "aside", "nav", "article", "img", "svg", "path", "g", "canvas",
+    "table", "thead", "tbody", "tr", "td", "th", "h1", "h2", "h3", "h4", "h5", "h6",
+}
+TAG_PATTERN = re.compile(r"<([A-Za-z][A-Za-z0-9_-]*)\\b")
+KEYWORD_PATTERNS = [
+    re.compile(r"\\bif\\b"),
+    re.compile(r"\\bfor\\b"),
+    re.compile(r"\\bwhile\\b"),
+    re.compile(r"\\bcase\\b"),
+    re.compile(r"\\bcatch\\b"),
+    re.compile(r"&&"),
+]
+VAR_DECL = re.compile(r"\\b(?:const|let|var)\\s+[A-Za-z_$][\\w$]*")
+TYPED_VAR_DECL = re.compile(r"\\b(?:const|let|var)\\s+[A-Za-z_$][\\w$]*\\s*:\\s*[^=;]+")
+FN_PARAMS = re.compile(r"(?:function\\s+[A-Za-z_$][\\w$]*|function|=>)\\s*\\(([^)]*)\\)")
+
+
+@ANALYZER.register
+class ComponentTags(Visitor):
+    name = "component_tags"
+    suffixes = COMPONENT_EXT
+
+    def finish(self) -> Dict[str, int]:
+        tags: Dict[str, int] = {}
+        for match in TAG_PATTERN.findall(self.ctx.text):
+            tag = match.strip()
+            lower = tag.lower()
+            is_custom = tag[:1].isupper() or ("-" in tag and lower not in HTML_TAGS)
+            if not is_custom:
+                continue
+            tags[tag] = tags.get(tag, 0) + 1
+        return tags
+
+
+@ANALYZER.register
+class Complexity(Visitor):
+    name = "complexity"
+    suffixes = LOGIC_EXT
+
+    def finish(self) -> int:
+        text = self.ctx.text
+        # 三元表达式计分原为 findall(r"\\?.*:")：每次匹配贪婪吃到行内最后一个 ":"，
+        # 即每个含 ":" 的（按 "\n" 切分的）行计 1 分；直接计数，避免逐位置回溯
+        ternary = sum(1 for segment in text.split("\n") if ":" in segment)
+        # "||" 计分原为 findall(r"\\|\\|")：该正则是 反斜杠|反斜杠|空串 三选一，每个位置恰好匹配一次，
+        # 结果恒为 len(text) + 1；保持原计分，直接给出该值
+        logical_or = len(text) + 1
+        return 1 + ternary + logical_or + sum(len(pattern.findall(text)) for pattern in KEYWORD_PATTERNS)
+
+
+@ANALYZER.register
+class TypePoints(Visitor):
+    name = "type_points"
+    suffixes = frozenset({".ts", ".tsx"})
+
+    @classmethod
+    def accepts(cls, rel: str, suffix: str) -> bool:
+        return suffix in cls.suffixes and not rel.endswith(".d.ts")
+
+    def finish(self) -> List[int]:
+        content = self.ctx.text
+        total_points = len(VAR_DECL.findall(content))
+        typed_points = len(TYPED_VAR_DECL.findall(content))
+        for raw in FN_PARAMS.findall(content):
+            params = [p.strip() for p in raw.split(",") if p.strip() and p.strip() not in {"...args", "args"}]
+            if not params:
+                continue
+            total_points += len(params)
+            typed_points += len([p for p in params if ":" in p])
+        return [typed_points, total_points]
+
+
+# ---- 工作区分析：进程内备忘 → 分析缓存 → （可并行）单遍分析 ----
+
+
+def analyze_chunk(items: List[Tuple[str, str, str]]) -> Tuple[List[Tuple[str, Dict[str, Any]]], float]:
+    """Worker-process entry: (rel, suffix, path) -> metrics, plus the chunk's CPU ms."""
+    start = time.process_time()
+    out: List[Tuple[str, Dict[str, Any]]] = []
+    for rel, suffix, path in items:
+        try:
+            text = Path(path).read_text(encoding="utf-8", errors="ignore")
+        except OSError:
+            continue
+        out.append((rel, ANALYZER.analyze(FileContext(rel, suffix, text))))
+    return out, (time.process_time() - start) * 1000.0
+
+
+def analyze_parallel(entries: List[FileEntry], workers: int, stats: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Metrics for entries on a process pool; chunks are merged in submission order, so the result matches a serial pass."""
+    chunk_size = max(1, -(-len(entries) // (workers * 4)))
+    chunks = [[(e.rel, e.suffix, str(e.path)) for e in entries[i : i + chunk_size]] for i in range(0, len(entries), chunk_size)]
+    start = time.perf_counter()
+    out: Dict[str, Dict[str, Any]] = {}
+    busy_ms = 0.0
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+        for rows, cpu_ms in pool.map(analyze_chunk, chunks):
+            out.update(rows)
+            busy_ms += cpu_ms
+    wall_ms = (time.perf_counter() - start) * 1000.0
+    # 加速比：各分块 CPU 耗时之和（≈ 串行耗时）/ 并行墙钟耗时（含进程池启动开销）
+    stats.update(
+        {
+            "workers": workers,
+            "chunks": len(chunks),
+            "analyzed_files": len(entries),
+            "serial_ms": round(busy_ms, 1),
+            "wall_ms": round(wall_ms, 1),
+            "speedup": round(busy_ms / wall_ms, 2) if wall_ms > 0 else None,
+        }
+    )
+    return out
+
+
+def analyze_files(
+    index: WorkspaceIndex,
+    entries: Iterable[FileEntry],
+    cache: Optional[AnalysisCache] = None,
+    workers: int = 1,
+    parallel_stats: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """rel -> metrics for entries (path order; unreadable files are left out).
+
+    Files already analysed in this run come from index.metrics, unchanged files
+    from the analysis cache; the rest are analysed in one pass each, on a
+    process pool when workers > 1 (parallel_stats then receives the timings).
+    """
+    cache = cache or AnalysisCache(None)
+    entries = list(entries)
+    memo = index.metrics.setdefault(ANALYZER.id, {})
+    todo = [e for e in entries if e.rel not in memo]
+    if todo:
+        memo.update(
+            cache.results(
+                ANALYZER.id,
+                index,
+                todo,
+                lambda e: ANALYZER.analyze(FileContext(e.rel, e.suffix, index.text(e))),
+                (lambda stale: analyze_parallel(stale, workers, parallel_stats if parallel_stats is not None else {}))
+                if workers > 1
+                else None,
+            )
+        )
+    # 行清理以整个索引为准：只删除已不在工作区中的文件的行
+    cache.retain(ANALYZER.id, index.entries.keys())
+    return {e.rel: memo[e.rel] for e in entries if e.rel in memo}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Print the single-pass per-file metrics of one or more files")
+    parser.add_argument("files", nargs="+")
+    args = parser.parse_args()
+
+    out = {}
+    for f in args.files:
+        p = Path(f)
+        out[f] = ANALYZER.analyze_text(p.as_posix(), p.suffix, p.read_text(encoding="utf-8", errors="ignore"))
+    print(json.dumps({"analyzer": ANALYZER.id, "metrics": [v.name for v in ANALYZER.visitors], "files": out}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -145,36 +145,22 @@ def build_spec(engine: str, style: str, categories: List[str], icon_count: int)
 """
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description="Generate icon system artifacts")
-    parser.add_argument("--brief", help="Brief text")
-    parser.add_argument("--brief-file", help="Brief file path")
-    parser.add_argument("--framework", default="unknown", help="Framework id")
-    parser.add_argument("--out-dir", required=True, help="Output directory")
-    parser.add_argument("--mode", default="auto", choices=["auto", "svg", "canvas"], help="Preferred render engine")
-    parser.add_argument("--style", default="outline", choices=["outline", "filled", "two-tone"], help="Icon style")
-    parser.add_argument("--category", action="append", default=[], help="Target category (repeatable)")
-    parser.add_argument("--json", action="store_true", help="Print JSON summary")
-    args = parser.parse_args()
-
-    brief = ""
-    if args.brief_file:
-        brief = Path(args.brief_file).read_text(encoding="utf-8").strip()
-    elif args.brief:
-        brief = args.brief.strip()
-
-    if not brief:
-        raise SystemExit("brief is required: use --brief or --brief-file")
-
+def generate_icon_assets(
+    brief: str,
+    out_dir: Path,
+    framework: str = "unknown",
+    mode: str = "auto",
+    style: str = "outline",
+    category_args: List[str] | None = None,
+) -> Dict[str, object]:
     icon_requested = needs_icons(brief)
-    engine = choose_engine(brief, args.mode)
-    categories = choose_categories(brief, args.category)
+    engine = choose_engine(brief, mode)
+    categories = choose_categories(brief, category_args or [])
 
     icons: List[Dict[str, str]] = []
     for category in categories:
         icons.extend([{**item, "category": category} for item in ICON_CATALOG.get(category, [])[:3]])
 
-    out_dir = Path(args.out_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
 
     manifest_path = out_dir / "icon.manifest.json"
@@ -184,9 +170,9 @@ def main() -> None:
 
     manifest = {
         "icon_requested": icon_requested,
-        "framework": args.framework,
+        "framework": framework,
         "engine": engine,
-        "style": args.style,
+        "style": style,
         "categories": categories,
         "icon_count": len(icons),
         "icons": [{"id": icon["id"], "label": icon["label"], "category": icon["category"]} for icon in icons],
@@ -199,17 +185,43 @@ def main() -> None:
     }
 
     manifest_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
-    spec_path.write_text(build_spec(engine, args.style, categories, len(icons)), encoding="utf-8")
+    spec_path.write_text(build_spec(engine, style, categories, len(icons)), encoding="utf-8")
     sprite_path.write_text(build_sprite(icons), encoding="utf-8")
     canvas_demo_path.write_text(build_canvas_demo(), encoding="utf-8")
+    return manifest
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate icon system artifacts")
+    parser.add_argument("--brief", help="Brief text")
+    parser.add_argument("--brief-file", help="Brief file path")
+    parser.add_argument("--framework", default="unknown", help="Framework id")
+    parser.add_argument("--out-dir", required=True, help="Output directory")
+    parser.add_argument("--mode", default="auto", choices=["auto", "svg", "canvas"], help="Preferred render engine")
+    parser.add_argument("--style", default="outline", choices=["outline", "filled", "two-tone"], help="Icon style")
+    parser.add_argument("--category", action="append", default=[], help="Target category (repeatable)")
+    parser.add_argument("--json", action="store_true", help="Print JSON summary")
+    args = parser.parse_args()
+
+    brief = ""
+    if args.brief_file:
+        brief = Path(args.brief_file).read_text(encoding="utf-8").strip()
+    elif args.brief:
+        brief = args.brief.strip()
+
+    if not brief:
+        raise SystemExit("brief is required: use --brief or --brief-file")
+
+    out_dir = Path(args.out_dir)
+    manifest = generate_icon_assets(brief, out_dir, args.framework, args.mode, args.style, args.category)
 
     if args.json:
         print(json.dumps(manifest, ensure_ascii=False, indent=2))
     else:
-        print(f"icon_requested: {icon_requested}")
-        print(f"engine: {engine}")
-        print(f"categories: {', '.join(categories)}")
-        print(f"icon_count: {len(icons)}")
+        print(f"icon_requested: {manifest['icon_requested']}")
+        print(f"engine: {manifest['engine']}")
+        print(f"categories: {', '.join(manifest['categories'])}")
+        print(f"icon_count: {manifest['icon_count']}")
         print(f"out: {out_dir}")
 
 
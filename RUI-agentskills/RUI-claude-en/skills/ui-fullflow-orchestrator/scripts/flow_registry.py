@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""SQLite registry of fullflow runs (<workspace>/Ruiagents/registry.sqlite).
+
+Every pipeline run (run_fullflow_pipeline.sh, fullflow_driver.py and the
+batch / daemon front ends built on it) registers its out-dir when it starts
+(status in_progress, before flow.state.json exists) and again when it exits,
+from the shell EXIT trap / the driver's finally, so failed runs show up as
+failed. A row holds workflow_id, state file, started/updated timestamps,
+current phase, status, the gate-validation summary and the total duration,
+read from flow.state.json, gate-validation-report.json and flow.metrics.json.
+One row per out-dir; a resumed run updates its row in place.
+
+flow_status.sh resolves --workflow-id and "latest run" with indexed lookups
+instead of finding and parsing every flow.state.json, and `list` filters and
+sorts runs across the whole history. `reindex` rebuilds the table from disk:
+every flow.state.json under the root (dot-directories such as .versions are
+skipped) plus registered out-dirs elsewhere that still exist. A registry that
+was never reindexed (runs from before it existed) is rebuilt on first query,
+and a lookup miss reindexes once before giving up. WAL mode lets status
+queries read while a run registers.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+REGISTRY_FILE = "registry.sqlite"
+DEFAULT_ROOT = "Ruiagents"
+STATE_FILE = "flow.state.json"
+STATUSES = ("completed", "blocked", "in_progress", "failed")
+# PRAGMA user_version：登记表至少从磁盘重建过一次
+REINDEXED = 1
+COLUMNS = (
+    "out_dir",
+    "workflow_id",
+    "state_file",
+    "started_at",
+    "updated_at",
+    "current_phase",
+    "status",
+    "gates_passed",
+    "gates_failed",
+    "gates_total",
+    "overall_passed",
+    "duration_ms",
+    "registered_at",
+)
+SORT_KEYS = {"updated": "updated_at", "started": "started_at", "duration": "duration_ms", "workflow": "workflow_id"}
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS workflows (
+        out_dir TEXT PRIMARY KEY,
+        workflow_id TEXT NOT NULL,
+        state_file TEXT NOT NULL,
+        started_at TEXT,
+        updated_at TEXT,
+        current_phase TEXT,
+        status TEXT,
+        gates_passed INTEGER,
+        gates_failed INTEGER,
+        gates_total INTEGER,
+        overall_passed INTEGER,
+        duration_ms INTEGER,
+        registered_at TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS workflows_by_id ON workflows (workflow_id, updated_at)",
+    "CREATE INDEX IF NOT EXISTS workflows_by_updated ON workflows (updated_at)",
+    "CREATE INDEX IF NOT EXISTS workflows_by_phase ON workflows (current_phase, updated_at)",
+    "CREATE INDEX IF NOT EXISTS workflows_by_status ON workflows (status, updated_at)",
+)
+
+
+def registry_path(workspace_root: str | Path) -> Path:
+    return Path(workspace_root) / DEFAULT_ROOT / REGISTRY_FILE
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    for statement in SCHEMA:
+        conn.execute(statement)
+    return conn
+
+
+def load_json(path: Path) -> Any:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def run_status(state: Dict[str, Any]) -> str:
+    if state.get("current_phase") == "completed":
+        return "completed"
+    return "blocked" if state.get("blockers") else "in_progress"
+
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def read_run(out_dir: str | Path) -> Optional[Dict[str, Any]]:
+    """Registry row for one out-dir, or None when it has no readable flow.state.json."""
+    out_dir = Path(out_dir).resolve()
+    state = load_json(out_dir / STATE_FILE)
+    if not isinstance(state, dict):
+        return None
+    gates = (load_json(out_dir / "gate-validation-report.json") or {}).get("summary") or {}
+    metrics = (load_json(out_dir / "flow.metrics.json") or {}).get("metrics") or {}
+    duration = (metrics.get("pipeline_execution") or {}).get("total_duration_ms")
+    overall = gates.get("overall_passed")
+    return {
+        "out_dir": str(out_dir),
+        "workflow_id": str(state.get("workflow_id") or ""),
+        "state_file": str(out_dir / STATE_FILE),
+        "started_at": state.get("started_at"),
+        "updated_at": state.get("updated_at"),
+        "current_phase": state.get("current_phase"),
+        "status": run_status(state),
+        "gates_passed": gates.get("passed"),
+        "gates_failed": gates.get("failed"),
+        "gates_total": gates.get("total_gates"),
+        "overall_passed": None if overall is None else int(bool(overall)),
+        "duration_ms": duration if isinstance(duration, int) else None,
+        "registered_at": now_iso(),
+    }
+
+
+def pending_run(out_dir: str | Path, workflow_id: str, started_at: str = "") -> Dict[str, Any]:
+    """Row for a run that has not written flow.state.json yet."""
+    out_dir = Path(out_dir).resolve()
+    now = now_iso()
+    row: Dict[str, Any] = dict.fromkeys(COLUMNS)
+    row.update(
+        out_dir=str(out_dir),
+        workflow_id=workflow_id,
+        state_file=str(out_dir / STATE_FILE),
+        started_at=started_at or now,
+        updated_at=now,
+        status="in_progress",
+        registered_at=now,
+    )
+    return row
+
+
+def upsert(conn: sqlite3.Connection, row: Dict[str, Any]) -> None:
+    conn.execute(
+        f"INSERT OR REPLACE INTO workflows ({', '.join(COLUMNS)}) VALUES ({', '.join('?' for _ in COLUMNS)})",
+        [row[c] for c in COLUMNS],
+    )
+
+
+def register(registry: Path, out_dir: str | Path, workflow_id: str = "", started_at: str = "", status: str = "") -> bool:
+    """Record a run; a registry that cannot be written never fails the run.
+
+    Without flow.state.json a row is only written when workflow_id is given (run start, or a
+    run that failed early); status overrides the state-derived one (in_progress / failed).
+    """
+    row = read_run(out_dir)
+    if row is None:
+        if not workflow_id:
+            return False
+        row = pending_run(out_dir, workflow_id, started_at)
+    if status:
+        row["status"] = status
+    try:
+        conn = connect(registry)
+        try:
+            with conn:
+                upsert(conn, row)
+        finally:
+            conn.close()
+    except (OSError, sqlite3.Error) as exc:
+        print(f"warning: workflow registry not updated ({registry}): {exc}", file=sys.stderr)
+        return False
+    return True
+
+
+def find_state_files(root: Path) -> Iterator[Path]:
+    for dirpath, dirnames, filenames in os.walk(root):
+        # .versions / .resume 等隐藏目录里不会有独立的运行
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        if STATE_FILE in filenames:
+            yield Path(dirpath) / STATE_FILE
+
+
+def reindex(registry: Path, root: Path) -> Dict[str, int]:
+    """Rebuild the table from the state files on disk."""
+    conn = connect(registry)
+    try:
+        previous = {r["out_dir"]: dict(r) for r in conn.execute("SELECT * FROM workflows")}
+        out_dirs = {str(p.parent.resolve()) for p in find_state_files(root)} if root.is_dir() else set()
+        out_dirs.update(previous)
+        rows = []
+        for out_dir in sorted(out_dirs):
+            row, old = read_run(out_dir), previous.get(out_dir)
+            if row is None:
+                # 尚未写出 flow.state.json 的运行（进行中或早早失败）保留原登记
+                if old is not None and Path(out_dir).is_dir():
+                    rows.append(old)
+                continue
+            # 进程失败只记录在登记表里，flow.state.json 无从得知
+            if old is not None and old["status"] == "failed" and row["status"] != "completed":
+                row["status"] = "failed"
+            rows.append(row)
+        with conn:
+            conn.execute("DELETE FROM workflows")
+            for row in rows:
+                upsert(conn, row)
+        conn.execute(f"PRAGMA user_version = {REINDEXED}")
+    finally:
+        conn.close()
+    return {"registered": len(rows), "dropped": len(out_dirs) - len(rows)}
+
+
+def ensure_registry(registry: Path, root: Path) -> None:
+    """Build the registry from disk the first time it is queried.
+
+    A registry created by run registrations alone has never seen the runs that predate it.
+    """
+    if not root.is_dir():
+        return
+    if registry.exists():
+        conn = connect(registry)
+        try:
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= REINDEXED:
+                return
+        finally:
+            conn.close()
+    reindex(registry, root)
+
+
+def lookup(registry: Path, workflow_id: str = "") -> Optional[str]:
+    """State file of the newest run with workflow_id, or of the newest run overall.
+
+    Runs that have not written flow.state.json yet are skipped.
+    """
+    if not registry.exists():
+        return None
+    conn = connect(registry)
+    try:
+        if workflow_id:
+            rows = conn.execute("SELECT state_file FROM workflows WHERE workflow_id = ? ORDER BY updated_at DESC", (workflow_id,))
+        else:
+            rows = conn.execute("SELECT state_file FROM workflows ORDER BY updated_at DESC")
+        return next((r["state_file"] for r in rows if Path(r["state_file"]).is_file()), None)
+    finally:
+        conn.close()
+
+
+def list_runs(
+    registry: Path,
+    phase: str = "",
+    status: str = "",
+    since: str = "",
+    sort: str = "updated",
+    ascending: bool = False,
+    limit: int = 20,
+) -> List[Dict[str, Any]]:
+    if not registry.exists():
+        return []
+    where, params = [], []
+    for column, value in (("current_phase", phase), ("status", status)):
+        if value:
+            where.append(f"{column} = ?")
+            params.append(value)
+    if since:
+        where.append("updated_at >= ?")
+        params.append(since)
+    sql = "SELECT * FROM workflows"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {SORT_KEYS[sort]} {'ASC' if ascending else 'DESC'}, out_dir"
+    if limit > 0:
+        sql += f" LIMIT {int(limit)}"
+    conn = connect(registry)
+    try:
+        return [dict(r) for r in conn.execute(sql, params)]
+    finally:
+        conn.close()
+
+
+def format_duration(value: Any) -> str:
+    if not isinstance(value, int) or value < 0:
+        return "-"
+    return f"{value}ms" if value < 1000 else f"{value / 1000:.2f}s"
+
+
+def format_gates(row: Dict[str, Any]) -> str:
+    if row["gates_total"] is None:
+        return "-"
+    return f"{row['gates_passed']}/{row['gates_total']}"
+
+
+def print_runs(rows: List[Dict[str, Any]], fmt: str) -> None:
+    if fmt == "json":
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+        return
+    cells = [
+        (r["workflow_id"], r["current_phase"] or "-", r["status"] or "-", format_gates(r), format_duration(r["duration_ms"]), r["updated_at"] or "-", r["out_dir"])
+        for r in rows
+    ]
+    headers = ("Workflow", "Phase", "Status", "Gates", "Duration", "Updated At", "Out Dir")
+    if fmt == "markdown":
+        print("| " + " | ".join(headers) + " |")
+        print("|" + "---|" * len(headers))
+        for c in cells:
+            print("| " + " | ".join(c) + " |")
+        return
+    widths = [max([len(h)] + [len(c[i]) for c in cells]) for i, h in enumerate(headers)]
+    print("  ".join(h.ljust(w) for h, w in zip(headers, widths)).rstrip())
+    print("  ".join("-" * w for w in widths))
+    for c in cells:
+        print("  ".join(v.ljust(w) for v, w in zip(c, widths)).rstrip())
+
+
+def main() -> None:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--root", default=DEFAULT_ROOT, help="运行输出根目录（默认 Ruiagents）")
+    common.add_argument("--registry", default="", help="registry.sqlite 路径（默认 <root>/registry.sqlite）")
+    parser = argparse.ArgumentParser(description="Register, look up and list fullflow runs")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("register", parents=[common], help="登记一次运行")
+    p.add_argument("--out-dir", required=True)
+    p.add_argument("--workflow-id", default="", help="尚无 flow.state.json 时用于登记的 workflow_id")
+    p.add_argument("--started-at", default="", help="尚无 flow.state.json 时登记的开始时间")
+    p.add_argument("--status", default="", choices=["", *STATUSES], help="覆盖由 flow.state.json 推导的状态")
+    sub.add_parser("reindex", parents=[common], help="从磁盘上的 flow.state.json 重建登记表")
+    p = sub.add_parser("lookup", parents=[common], help="输出某个 workflow_id（缺省为最新运行）的 flow.state.json 路径")
+    p.add_argument("--workflow-id", default="")
+    p = sub.add_parser("list", parents=[common], help="按条件筛选、排序列出运行")
+    p.add_argument("--phase", default="", help="current_phase 过滤")
+    p.add_argument("--status", default="", choices=["", *STATUSES])
+    p.add_argument("--since", default="", help="只列出 updated_at 不早于该 ISO 时间的运行")
+    p.add_argument("--sort", default="updated", choices=sorted(SORT_KEYS))
+    p.add_argument("--asc", action="store_true", help="升序（默认降序）")
+    p.add_argument("--limit", type=int, default=20, help="最多列出条数（0 不限）")
+    p.add_argument("--format", default="table", choices=["table", "json", "markdown"])
+    args = parser.parse_args()
+
+    root = Path(args.root)
+    registry = Path(args.registry) if args.registry else root / REGISTRY_FILE
+    if args.command == "register":
+        raise SystemExit(0 if register(registry, args.out_dir, args.workflow_id, args.started_at, args.status) else 1)
+    if args.command == "reindex":
+        print(json.dumps({"registry": str(registry), **reindex(registry, root)}, ensure_ascii=False))
+        return
+    ensure_registry(registry, root)
+    if args.command == "lookup":
+        state_file = lookup(registry, args.workflow_id)
+        if not state_file and root.is_dir():
+            # 登记表里没有（登记失败、手工拷入的运行等）：从磁盘重建后再查一次
+            reindex(registry, root)
+            state_file = lookup(registry, args.workflow_id)
+        if not state_file:
+            raise SystemExit(1)
+        print(state_file)
+        return
+    print_runs(list_runs(registry, args.phase, args.status, args.since, args.sort, args.asc, args.limit), args.format)
+
+
+if __name__ == "__main__":
+    main()
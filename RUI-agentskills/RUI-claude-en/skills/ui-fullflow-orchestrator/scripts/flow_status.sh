@@ -7,18 +7,40 @@ flow_status.sh
 
 Usage:
   bash skills/ui-fullflow-orchestrator/scripts/flow_status.sh [options]
+  bash skills/ui-fullflow-orchestrator/scripts/flow_status.sh list [list options]
+  bash skills/ui-fullflow-orchestrator/scripts/flow_status.sh reindex [--registry <path>]
 
 Options:
   --state-file <path>     指定 flow.state.json 文件
   --workflow-dir <path>   指定某次输出目录（包含 flow.state.json）
-  --workflow-id <id>      在 Ruiagents 目录中按 workflow_id 搜索
+  --workflow-id <id>      按 workflow_id 在运行登记表中查找
+  --registry <path>       运行登记表（默认 Ruiagents/registry.sqlite，首次查询时从磁盘建立）
   --format <fmt>          输出格式: table|json|markdown (默认 table)
+
+List options:
+  --phase <phase>         按 current_phase 过滤
+  --status <status>       completed|blocked|in_progress|failed
+  --since <iso-time>      只列出 updated_at 不早于该时间的运行
+  --sort <key>            updated|started|duration|workflow (默认 updated，降序)
+  --asc                   升序
+  --limit <n>             最多列出条数（默认 20，0 不限）
+  --format <fmt>          table|json|markdown
+
+reindex 从 Ruiagents 下的 flow.state.json 重建登记表。
 USAGE
 }
 
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+REGISTRY_PY="$SCRIPT_DIR/flow_registry.py"
+
+if [[ $# -gt 0 && ( "$1" == "list" || "$1" == "reindex" ) ]]; then
+  exec python3 "$REGISTRY_PY" "$@"
+fi
+
 STATE_FILE=""
 WORKFLOW_DIR=""
 WORKFLOW_ID=""
+REGISTRY=""
 FORMAT="table"
 
 while [[ $# -gt 0 ]]; do
@@ -26,6 +48,7 @@ while [[ $# -gt 0 ]]; do
     --state-file) STATE_FILE="$2"; shift 2 ;;
     --workflow-dir) WORKFLOW_DIR="$2"; shift 2 ;;
     --workflow-id) WORKFLOW_ID="$2"; shift 2 ;;
+    --registry) REGISTRY="$2"; shift 2 ;;
     --format) FORMAT="$2"; shift 2 ;;
     -h|--help) usage; exit 0 ;;
     *) echo "Error: unknown arg $1" >&2; usage; exit 1 ;;
@@ -36,33 +59,18 @@ if [[ -n "$WORKFLOW_DIR" && -z "$STATE_FILE" ]]; then
   STATE_FILE="$WORKFLOW_DIR/flow.state.json"
 fi
 
-if [[ -z "$STATE_FILE" ]]; then
-  if [[ -n "$WORKFLOW_ID" ]]; then
-    if [[ ! -d "Ruiagents" ]]; then
-      echo "Error: Ruiagents 目录不存在，无法按 workflow_id 搜索" >&2
-      exit 1
-    fi
-    while IFS= read -r f; do
-      id="$(python3 - <<'PY' "$f"
-import json, sys
-path = sys.argv[1]
-with open(path, "r", encoding="utf-8") as fp:
-    data = json.load(fp)
-print(data.get("workflow_id", ""))
-PY
-)"
-      if [[ "$id" == "$WORKFLOW_ID" ]]; then
-        STATE_FILE="$f"
-        break
-      fi
-    done < <(find Ruiagents -type f -name "flow.state.json" | sort)
-  fi
+REGISTRY_ARGS=()
+if [[ -n "$REGISTRY" ]]; then
+  REGISTRY_ARGS=(--registry "$REGISTRY")
 fi
 
 if [[ -z "$STATE_FILE" ]]; then
-  if [[ -d "Ruiagents" ]]; then
-    STATE_FILE="$(find Ruiagents -type f -name "flow.state.json" -print0 | xargs -0 ls -1t 2>/dev/null | head -n 1 || true)"
+  if [[ -n "$WORKFLOW_ID" && -z "$REGISTRY" && ! -d "Ruiagents" ]]; then
+    echo "Error: Ruiagents 目录不存在，无法按 workflow_id 搜索" >&2
+    exit 1
   fi
+  # 登记表按 workflow_id / updated_at 索引查找；未指定 id 时取最近更新的运行
+  STATE_FILE="$(python3 "$REGISTRY_PY" lookup ${REGISTRY_ARGS[@]+"${REGISTRY_ARGS[@]}"} --workflow-id "$WORKFLOW_ID" || true)"
 fi
 
 if [[ -z "${STATE_FILE:-}" || ! -f "$STATE_FILE" ]]; then
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""Batch fullflow runner: one pipeline per JSONL record on a process pool.
+
+Each line of the input is a flow.input.json-style object (brief, framework,
+project_type, priorities, ...; driver option names such as brand_color are
+passed through) with an optional "id". Every record gets its own out-dir under
+the batch directory. Workers import the skill modules and parse the shared
+static data once, then run records in-process via fullflow_driver.
+
+Outputs in the batch directory:
+  batch.results.jsonl  one result row per record, in input order
+  batch.summary.json   completeness, gate pass rates, latency percentiles
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import fullflow_driver as driver
+
+RUN_ID_RE = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+def now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def load_records(path: Path) -> List[Dict[str, Any]]:
+    records: List[Dict[str, Any]] = []
+    for lineno, line in enumerate(path.read_text(encoding="utf-8").splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            raise SystemExit(f"Error: {path}:{lineno} 不是合法 JSON: {exc}")
+        if not isinstance(record, dict):
+            raise SystemExit(f"Error: {path}:{lineno} 必须是 JSON 对象")
+        records.append(record)
+    return records
+
+
+def assign_run_ids(records: List[Dict[str, Any]]) -> List[str]:
+    ids: List[str] = []
+    seen: Dict[str, int] = {}
+    for index, record in enumerate(records):
+        base = RUN_ID_RE.sub("-", str(record.get("id") or f"run-{index + 1:04d}")).strip("-") or f"run-{index + 1:04d}"
+        seen[base] = seen.get(base, 0) + 1
+        ids.append(base if seen[base] == 1 else f"{base}-{seen[base]}")
+    return ids
+
+
+def init_worker() -> None:
+    driver.preload_static_data()
+
+
+def read_json(path: Path, default: Any) -> Any:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return default
+
+
+def collect_result(run_id: str, out_dir: Path, duration_ms: int) -> Dict[str, Any]:
+    req = read_json(out_dir / "requirements.summary.json", {})
+    gate_report = read_json(out_dir / "gate-validation-report.json", {})
+    metrics = read_json(out_dir / "flow.metrics.json", {}).get("metrics", {})
+    schedule = metrics.get("pipeline_execution", {}).get("schedule", {})
+    gates = {
+        str(row.get("gate")): "PASS" in str(row.get("status", ""))
+        for row in gate_report.get("details", [])
+        if isinstance(row, dict)
+    }
+    return {
+        "id": run_id,
+        "status": "completed",
+        "out_dir": str(out_dir),
+        "duration_ms": duration_ms,
+        "requirement_completeness": int(req.get("completeness_score", 0) or 0),
+        "gates_passed": bool(gate_report.get("summary", {}).get("overall_passed")),
+        "gates": gates,
+        "step_duration_ms": {name: int(span.get("duration_ms", 0)) for name, span in schedule.get("steps", {}).items()},
+    }
+
+
+def run_record(task: Tuple[str, Dict[str, Any], str, Dict[str, Any]]) -> Dict[str, Any]:
+    run_id, record, out_dir, options = task
+    start = now_ms()
+    try:
+        args = driver.namespace_from_saved(driver.args_from_record(record, options["workspace_root"]))
+        args.out_dir = out_dir
+        args.jobs = options["jobs"]
+        args.cache_dir = options["cache_dir"]
+        args.no_cache = options["no_cache"]
+        ctx = driver.prepare_context(args)
+        driver.save_resume_args(args, ctx)
+        driver.run_pipeline(ctx)
+    except (Exception, SystemExit) as exc:
+        return {
+            "id": run_id,
+            "status": "failed",
+            "out_dir": out_dir,
+            "duration_ms": now_ms() - start,
+            "error": str(exc) or type(exc).__name__,
+        }
+    return collect_result(run_id, Path(out_dir), now_ms() - start)
+
+
+def percentiles(values: List[int]) -> Dict[str, float]:
+    """Nearest-rank p50/p90/p99 plus min/max/mean."""
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def rank(p: float) -> int:
+        return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+    return {
+        "count": len(ordered),
+        "min": ordered[0],
+        "p50": rank(50),
+        "p90": rank(90),
+        "p99": rank(99),
+        "max": ordered[-1],
+        "mean": round(sum(ordered) / len(ordered), 1),
+    }
+
+
+def build_summary(results: List[Dict[str, Any]], meta: Dict[str, Any]) -> Dict[str, Any]:
+    done = [r for r in results if r["status"] == "completed"]
+    per_gate: Dict[str, List[bool]] = {}
+    per_step: Dict[str, List[int]] = {}
+    for row in done:
+        for gate, passed in row["gates"].items():
+            per_gate.setdefault(gate, []).append(passed)
+        for step, ms in row["step_duration_ms"].items():
+            per_step.setdefault(step, []).append(ms)
+    completeness = [row["requirement_completeness"] for row in done]
+    return {
+        **meta,
+        "total": len(results),
+        "completed": len(done),
+        "failed": len(results) - len(done),
+        "requirement_completeness": {
+            **percentiles(completeness),
+            "below_70": len([x for x in completeness if x < 70]),
+        },
+        "gates": {
+            "all_passed_runs": len([row for row in done if row["gates_passed"]]),
+            "all_passed_rate": round(100 * len([row for row in done if row["gates_passed"]]) / len(done), 1) if done else 0.0,
+            "pass_rate": {gate: round(100 * sum(v) / len(v), 1) for gate, v in sorted(per_gate.items())},
+        },
+        "latency_ms": {
+            "pipeline": percentiles([row["duration_ms"] for row in done]),
+            "steps": {step: percentiles(v) for step, v in per_step.items()},
+        },
+        "failures": [{"id": r["id"], "error": r["error"]} for r in results if r["status"] != "completed"],
+    }
+
+
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the RUI fullflow pipeline for every record of a JSONL file")
+    parser.add_argument("--input", required=True, help="JSONL 文件，每行一个 flow.input.json 风格的记录（可带 id）")
+    parser.add_argument("--out-dir", default="", help="批次目录（默认 <workspace>/Ruiagents/batch-<时间戳>），每条记录写入 <out-dir>/<id>")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker 进程数")
+    parser.add_argument("--jobs", type=int, default=1, help="每条记录的 Phase 1/2 并发步骤数（并行主要来自 worker）")
+    parser.add_argument("--workspace-root", default="")
+    parser.add_argument("--cache-dir", default="", help="步骤缓存目录（所有 worker 共享）")
+    parser.add_argument("--no-cache", action="store_true", help="禁用步骤缓存")
+    args = parser.parse_args(argv)
+    if args.workers < 1 or args.jobs < 1:
+        parser.error("--workers/--jobs 必须 >= 1")
+    return args
+
+
+def main(argv: List[str] | None = None) -> int:
+    args = parse_args(argv)
+    records = load_records(Path(args.input))
+    if not records:
+        raise SystemExit(f"Error: {args.input} 中没有记录")
+    workspace_root = driver.resolve_workspace_root(args.workspace_root, os.getcwd())
+    batch_id = f"batch-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    batch_dir = Path(args.out_dir or f"{workspace_root}/Ruiagents/{batch_id}")
+    if not batch_dir.is_absolute():
+        batch_dir = Path(workspace_root) / batch_dir
+    batch_dir.mkdir(parents=True, exist_ok=True)
+    options = {
+        "workspace_root": workspace_root,
+        "jobs": args.jobs,
+        "cache_dir": args.cache_dir,
+        "no_cache": args.no_cache,
+    }
+    run_ids = assign_run_ids(records)
+    tasks = [(run_id, record, str(batch_dir / run_id), options) for run_id, record in zip(run_ids, records)]
+
+    started_at = datetime.now(timezone.utc).isoformat()
+    start = now_ms()
+    results: Dict[str, Dict[str, Any]] = {}
+    workers = min(args.workers, len(tasks))
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+        futures = {pool.submit(run_record, task): task[0] for task in tasks}
+        for future in as_completed(futures):
+            row = future.result()
+            results[row["id"]] = row
+            print(f"[{len(results)}/{len(tasks)}] {row['id']}: {row['status']} ({row['duration_ms']}ms)", file=sys.stderr)
+    ordered = [results[run_id] for run_id in run_ids]
+
+    with open(batch_dir / "batch.results.jsonl", "w", encoding="utf-8") as f:
+        for row in ordered:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    summary = build_summary(
+        ordered,
+        {
+            "batch_id": batch_id,
+            "input": str(Path(args.input).resolve()),
+            "out_dir": str(batch_dir),
+            "started_at": started_at,
+            "workers": workers,
+            "jobs_per_run": args.jobs,
+            "wall_duration_ms": now_ms() - start,
+        },
+    )
+    (batch_dir / "batch.summary.json").write_text(json.dumps(summary, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    print(
+        f"batch complete: {summary['completed']}/{summary['total']} completed, "
+        f"gates all-passed {summary['gates']['all_passed_rate']}%, "
+        f"wall {summary['wall_duration_ms']}ms\nsummary: {batch_dir / 'batch.summary.json'}"
+    )
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
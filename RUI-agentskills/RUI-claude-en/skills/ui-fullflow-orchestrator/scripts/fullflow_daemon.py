@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""Long-lived fullflow daemon: serve pipeline and single-script runs from a warm process.
+
+The daemon imports the orchestrator and every skill module once, keeps the
+parsed config, state-machine rules and selector-engine answers in memory, and
+accepts JSON requests over HTTP on a Unix domain socket (default) or on
+127.0.0.1:<port>:
+
+  GET  /health    pid, uptime, request counters
+  POST /run       {"script", "argv", "cwd", "env"} -> {"exit_code", "stdout", "stderr", "duration_ms"}
+  POST /shutdown
+
+Pipeline requests (run_fullflow_pipeline.sh / fullflow_driver.py) run
+concurrently, each with its own out-dir. Other skill scripts run in-process one
+at a time, because they rely on the process-wide argv, cwd and stdout.
+ui_library_engine.mjs requests go through the driver's engine cache.
+Use fullflow_client.py as the drop-in replacement for `python3 <script>`.
+
+Skill scripts are re-imported when their mtime changes (load_script here,
+fullflow_driver.skill() for pipelines). Modules imported by name — the driver
+itself and shared helpers such as flow_trace, workspace_index, tool_checks —
+cannot be swapped in place: when one of them changes after start-up, /health
+lists it under `stale_modules` and every response carries a restart warning
+on stderr.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Dict, List, Mapping, Tuple
+
+import fullflow_client as client
+import fullflow_driver as driver
+
+PIPELINE_ENTRYPOINTS = {"run_fullflow_pipeline.sh", "fullflow_driver.py"}
+SELECTOR_ENGINE = driver.REPO_ROOT / "skills" / "ui-selector-pro" / "scripts" / "ui_library_engine.mjs"
+
+
+class DaemonState:
+    def __init__(self, max_pipelines: int):
+        self.started = time.time()
+        self.pipelines = threading.BoundedSemaphore(max_pipelines)
+        # 单脚本请求依赖进程级 argv/cwd/stdout/环境变量，串行执行
+        self.script_lock = threading.Lock()
+        self.counter_lock = threading.Lock()
+        self.counters = {"requests": 0, "pipelines": 0, "scripts": 0, "engine": 0, "failed": 0}
+        self.scripts: Dict[str, Tuple[int, ModuleType]] = {}
+
+    def count(self, key: str) -> int:
+        with self.counter_lock:
+            self.counters[key] += 1
+            return self.counters[key]
+
+
+def load_script(state: DaemonState, path: Path) -> ModuleType:
+    """Import a skill script once; re-import only when the file changes."""
+    mtime = path.stat().st_mtime_ns
+    cached = state.scripts.get(str(path))
+    if cached and cached[0] == mtime:
+        return cached[1]
+    name = "rui_daemon_" + hashlib.sha1(str(path).encode("utf-8")).hexdigest()[:12]
+    spec = importlib.util.spec_from_file_location(name, path)
+    if spec is None or spec.loader is None:
+        raise RuntimeError(f"无法加载脚本: {path}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    sys.path.insert(0, str(path.parent))
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        sys.path.remove(str(path.parent))
+    state.scripts[str(path)] = (mtime, module)
+    return module
+
+
+@contextlib.contextmanager
+def request_environment(env: Mapping[str, str]):
+    """Temporarily replace the forwarded env vars with the client's."""
+    keys = {k for k in os.environ if k.startswith(client.FORWARD_ENV_PREFIXES) or k in client.FORWARD_ENV_KEYS}
+    saved = {k: os.environ[k] for k in keys}
+    for k in keys:
+        os.environ.pop(k, None)
+    os.environ.update(env)
+    try:
+        yield
+    finally:
+        for k in set(env) | keys:
+            os.environ.pop(k, None)
+        os.environ.update(saved)
+
+
+def exit_code(exc: SystemExit, err: io.StringIO) -> int:
+    if exc.code is None:
+        return 0
+    if isinstance(exc.code, int):
+        return exc.code
+    err.write(f"{exc.code}\n")
+    return 1
+
+
+def run_script(state: DaemonState, path: Path, argv: List[str], cwd: str, env: Mapping[str, str]) -> Tuple[int, str, str]:
+    out, err = io.StringIO(), io.StringIO()
+    with state.script_lock:
+        module = load_script(state, path)
+        old_argv, old_cwd = sys.argv, os.getcwd()
+        try:
+            os.chdir(cwd)
+            sys.argv = [str(path), *argv]
+            with request_environment(env), contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+                try:
+                    rc = module.main()
+                    code = rc if isinstance(rc, int) else 0
+                except SystemExit as exc:
+                    code = exit_code(exc, err)
+                except Exception:
+                    traceback.print_exc(file=err)
+                    code = 1
+        finally:
+            sys.argv = old_argv
+            os.chdir(old_cwd)
+    return code, out.getvalue(), err.getvalue()
+
+
+def run_engine(state: DaemonState, argv: List[str]) -> Tuple[int, str, str]:
+    err = io.StringIO()
+    # 引擎失败时 run_node 把 node 的 stderr 写到 sys.stderr，借脚本锁捕获
+    with state.script_lock, contextlib.redirect_stderr(err):
+        try:
+            return 0, driver.run_node(argv), ""
+        except SystemExit as exc:
+            return exit_code(exc, err), "", err.getvalue()
+
+
+def stale_modules(state: DaemonState) -> List[str]:
+    """Skill-tree modules imported by name whose file changed after the daemon started."""
+    skills_root = driver.REPO_ROOT / "skills"
+    stale = []
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, "__file__", None)
+        # rui_skill_* / rui_daemon_* 按 mtime 自动重新导入，不会过期
+        if not path or name.startswith(("rui_skill_", "rui_daemon_")):
+            continue
+        path = Path(path).resolve()
+        try:
+            if skills_root in path.parents and path.stat().st_mtime > state.started:
+                stale.append(str(path.relative_to(skills_root)))
+        except OSError:
+            continue
+    return sorted(set(stale))
+
+
+def run_pipeline(state: DaemonState, argv: List[str], cwd: str, env: Mapping[str, str]) -> Tuple[int, str, str]:
+    err = io.StringIO()
+    seq = state.count("pipelines")
+    with state.pipelines:
+        try:
+            with state.script_lock, contextlib.redirect_stderr(err):
+                # argparse 出错时写 stderr，借脚本锁避免与单脚本请求的重定向交错
+                args = driver.parse_args(argv)
+            if args.resume:
+                args.resume = os.path.join(cwd, args.resume)
+                args = driver.resume_args(args)
+            elif not args.out_dir:
+                # 同一秒内的并发请求不能共用默认的 Ruiagents/<时间戳> 目录
+                args.out_dir = f"Ruiagents/{datetime.now().strftime('%Y%m%d-%H%M%S')}-{seq:04d}"
+            ctx = driver.prepare_context(args, cwd, env)
+            if not args.resume:
+                driver.save_resume_args(args, ctx)
+            driver.run_pipeline(ctx)
+        except SystemExit as exc:
+            return exit_code(exc, err), "", err.getvalue()
+        except Exception:
+            return 1, "", err.getvalue() + traceback.format_exc()
+    return 0, driver.format_summary(ctx) + "\n", err.getvalue()
+
+
+def handle_run(state: DaemonState, payload: Mapping[str, Any]) -> Dict[str, Any]:
+    script = Path(str(payload.get("script", ""))).resolve()
+    argv = [str(x) for x in payload.get("argv") or []]
+    cwd = str(payload.get("cwd") or os.getcwd())
+    env = {str(k): str(v) for k, v in (payload.get("env") or {}).items()}
+    skills_root = driver.REPO_ROOT / "skills"
+    start = driver.now_ms()
+    if script.name in PIPELINE_ENTRYPOINTS and script.parent == driver.SCRIPT_DIR:
+        code, out, err = run_pipeline(state, argv, cwd, env)
+    elif script == SELECTOR_ENGINE:
+        state.count("engine")
+        code, out, err = run_engine(state, argv)
+    elif script.suffix == ".py" and skills_root in script.parents and script.is_file():
+        state.count("scripts")
+        code, out, err = run_script(state, script, argv, cwd, env)
+    else:
+        return {"unsupported": True, "error": f"daemon 不处理该脚本: {script}"}
+    if code:
+        state.count("failed")
+    stale = stale_modules(state)
+    if stale:
+        err += f"warning: 守护进程启动后以下模块已修改，需重启 daemon 才会生效: {', '.join(stale)}\n"
+    return {"exit_code": code, "stdout": out, "stderr": err, "duration_ms": driver.now_ms() - start}
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "rui-fullflow-daemon"
+    protocol_version = "HTTP/1.1"
+
+    def reply(self, status: int, body: Dict[str, Any]) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def read_payload(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b"{}"
+        payload = json.loads(raw.decode("utf-8") or "{}")
+        if not isinstance(payload, dict):
+            raise ValueError("请求体必须是 JSON 对象")
+        return payload
+
+    def do_GET(self) -> None:
+        state: DaemonState = self.server.state  # type: ignore[attr-defined]
+        if self.path != "/health":
+            self.reply(404, {"error": f"unknown path {self.path}"})
+            return
+        self.reply(
+            200,
+            {
+                "pid": os.getpid(),
+                "uptime_s": round(time.time() - state.started, 1),
+                "listen": self.server.listen_label,  # type: ignore[attr-defined]
+                "stale_modules": stale_modules(state),
+                **state.counters,
+            },
+        )
+
+    def do_POST(self) -> None:
+        state: DaemonState = self.server.state  # type: ignore[attr-defined]
+        try:
+            payload = self.read_payload()
+        except ValueError as exc:
+            self.reply(400, {"error": str(exc)})
+            return
+        if self.path == "/shutdown":
+            self.reply(200, {"stopping": True})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return
+        if self.path != "/run":
+            self.reply(404, {"error": f"unknown path {self.path}"})
+            return
+        state.count("requests")
+        self.reply(200, handle_run(state, payload))
+
+    def log_message(self, format: str, *args: Any) -> None:
+        return
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def socket_alive(path: str) -> bool:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+def serve(args: argparse.Namespace) -> int:
+    driver.preload_static_data()
+    state = DaemonState(args.max_pipelines)
+    if args.port:
+        server: socketserver.BaseServer = ThreadingHTTPServer(("127.0.0.1", args.port), Handler)
+        label = f"http://127.0.0.1:{server.server_address[1]}"
+    else:
+        path = args.socket or client.default_socket_path()
+        if os.path.exists(path):
+            if socket_alive(path):
+                raise SystemExit(f"Error: daemon 已在运行: {path}")
+            os.unlink(path)
+        old_umask = os.umask(0o077)
+        try:
+            server = UnixHTTPServer(path, Handler)
+        finally:
+            os.umask(old_umask)
+        label = f"unix:{path}"
+    server.state = state  # type: ignore[attr-defined]
+    server.listen_label = label  # type: ignore[attr-defined]
+    print(f"fullflow daemon listening on {label} (pid {os.getpid()})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if not args.port and os.path.exists(label[5:]):
+            os.unlink(label[5:])
+    return 0
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Long-lived fullflow daemon (Unix socket or localhost HTTP)")
+    parser.add_argument("action", choices=["serve", "status", "stop"])
+    parser.add_argument("--socket", default="", help="Unix socket 路径（默认 $RUI_DAEMON_SOCKET 或临时目录下 rui-fullflow-<uid>.sock）")
+    parser.add_argument("--port", type=int, default=0, help="改为监听 127.0.0.1:<port>（客户端设置 RUI_DAEMON_URL）")
+    parser.add_argument("--max-pipelines", type=int, default=4, help="并发执行的流水线请求上限")
+    args = parser.parse_args(argv)
+    if args.max_pipelines < 1:
+        parser.error("--max-pipelines 必须 >= 1")
+    if args.socket:
+        os.environ["RUI_DAEMON_SOCKET"] = args.socket
+    if args.port and args.action != "serve":
+        os.environ["RUI_DAEMON_URL"] = f"http://127.0.0.1:{args.port}"
+
+    if args.action == "serve":
+        return serve(args)
+    try:
+        result = client.request("GET", "/health") if args.action == "status" else client.request("POST", "/shutdown")
+    except OSError:
+        print(json.dumps({"running": False}, ensure_ascii=False))
+        return 1
+    print(json.dumps({"running": True, **result}, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
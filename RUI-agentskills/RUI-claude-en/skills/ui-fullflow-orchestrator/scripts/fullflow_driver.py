@@ -0,0 +1,1191 @@
+#!/usr/bin/env python3
+"""In-process fullflow pipeline driver.
+
+Runs the same steps as run_fullflow_pipeline.sh, but imports the skill scripts
+once and calls their core functions directly instead of spawning a python3
+process per step. Only the Node selector engine and git stay as subprocesses.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import hashlib
+import importlib.util
+import json
+import os
+import re
+import resource
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Tuple
+
+# 与 run_plugin_hooks.py 共用同一模块实例（同一个当前 span / 资源统计上下文），因此按模块名导入而非 skill()
+import flow_trace
+import resource_usage
+
+SCRIPT_DIR = Path(os.path.abspath(__file__)).parent
+REPO_ROOT = SCRIPT_DIR.parents[2]
+SKILLS_ROOT = REPO_ROOT / "skills"
+
+# 工作区索引同理：phase4 / gates / scope 校验按模块名导入它，索引对象在它们之间共享
+if str(SKILLS_ROOT / "skill-structure-governor" / "scripts") not in sys.path:
+    sys.path.insert(0, str(SKILLS_ROOT / "skill-structure-governor" / "scripts"))
+import analysis_cache  # noqa: E402
+import tool_cache  # noqa: E402
+import tool_checks  # noqa: E402
+import workspace_index  # noqa: E402
+
+SKILL_SCRIPTS = {
+    "config": "skill-structure-governor/scripts/config_loader.py",
+    "requirements": "requirements-elicitation-engine/scripts/generate_requirements_brief.py",
+    "scope_lock": "style-scope-guard/scripts/build_style_scope_lock.py",
+    "scope_validate": "style-scope-guard/scripts/validate_scope_change.py",
+    "icon_detect": "svg-canvas-icon-engine/scripts/detect_icon_need.py",
+    "icon_generate": "svg-canvas-icon-engine/scripts/generate_icon_assets.py",
+    "score": "ui-aesthetic-coach/scripts/score_ui_brief.py",
+    "tokens": "ui-aesthetic-coach/scripts/generate_design_tokens.py",
+    "adapter": "framework-adapters/scripts/select_adapter.py",
+    "gates": "quality-gate-validator/scripts/validate_gates.py",
+    "hooks": "ui-fullflow-orchestrator/scripts/run_plugin_hooks.py",
+    "phase4": "ui-fullflow-orchestrator/scripts/phase4_refactor.py",
+    "phase5": "ui-fullflow-orchestrator/scripts/phase5_acceptance.py",
+    "artifacts": "ui-fullflow-orchestrator/scripts/fullflow_artifacts.py",
+    "state_machine": "ui-fullflow-orchestrator/scripts/validate_state_machine.py",
+    "snapshot": "ui-fullflow-orchestrator/scripts/snapshot_artifacts.py",
+    "scheduler": "ui-fullflow-orchestrator/scripts/flow_scheduler.py",
+    "step_cache": "ui-fullflow-orchestrator/scripts/step_cache.py",
+    "registry": "ui-fullflow-orchestrator/scripts/flow_registry.py",
+}
+ICON_STYLES = ("outline", "filled", "two-tone")
+
+# 带键步骤：名称 -> (决定步骤行为的脚本/数据源（相对 REPO_ROOT）, 除 *_PATH 输出外的额外产物（相对 out-dir）)
+# 键 = 输入值 + 源版本 + 解析后配置；用于步骤缓存与 --resume 的新鲜度判断
+# 选型引擎的 REPO_ROOT 同为技能包根目录：优先读 DATA_FILE（app 数据，通常不存在，缺失按 <missing> 计入），
+# 否则读 SEED_FILE；两者与引擎中的常量保持一致
+SELECTOR_SOURCES = (
+    "skills/ui-selector-pro/scripts/ui_library_engine.mjs",
+    "app/src/data/uiLibraries.ts",
+    "skills/ui-selector-pro/data/uiLibraries.seed.json",
+)
+STEP_SOURCES: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {
+    "requirements_elicitation": (("skills/requirements-elicitation-engine/scripts/generate_requirements_brief.py",), ()),
+    "style_scope_lock_build": (("skills/style-scope-guard/scripts/build_style_scope_lock.py",), ()),
+    "icon_need_detection": (("skills/svg-canvas-icon-engine/scripts/detect_icon_need.py",), ()),
+    "icon_generation": (("skills/svg-canvas-icon-engine/scripts/generate_icon_assets.py",), ()),
+    "selector_recommend": (SELECTOR_SOURCES, ()),
+    "selector_evaluate": (SELECTOR_SOURCES, ()),
+    "aesthetic_score": (("skills/ui-aesthetic-coach/scripts/score_ui_brief.py",), ()),
+    "token_generation": (("skills/ui-aesthetic-coach/scripts/generate_design_tokens.py",), ()),
+    "framework_adapter_select": (("skills/framework-adapters",), ("framework-adapter",)),
+    "phase4_refactor": (("skills/ui-fullflow-orchestrator/scripts/phase4_refactor.py",), ("phase4.refactor.report.md",)),
+}
+# 跨 run 共享缓存的步骤；scope lock 是流水线门禁、phase4 依赖工作区内容，只参与 --resume
+CACHEABLE_STEPS = frozenset(STEP_SOURCES) - {"style_scope_lock_build", "phase4_refactor"}
+# 未在 STEP_SOURCES 中的步骤（scope 校验、hooks、gates、phase5）观察工作区/插件的当前状态，resume 时总是重跑
+RESUME_DIR = ".resume"
+
+# name -> (mtime_ns, module)
+_MODULES: Dict[str, Tuple[int, ModuleType]] = {}
+_MODULES_LOCK = threading.Lock()
+
+
+def skill(name: str) -> ModuleType:
+    """Import a skill script by key (skill dirs contain '-', so load by file path).
+
+    Re-imported when the file's mtime changes, so a long-lived process (daemon, batch
+    worker) runs edited skill scripts like fullflow_daemon.load_script does; calls already
+    holding the old module finish with it.
+    """
+    path = SKILLS_ROOT / SKILL_SCRIPTS[name]
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        raise SystemExit(f"无法加载技能脚本: {path}")
+    with _MODULES_LOCK:
+        cached = _MODULES.get(name)
+        if cached is None or cached[0] != mtime:
+            spec = importlib.util.spec_from_file_location(f"rui_skill_{name}", path)
+            if spec is None or spec.loader is None:
+                raise SystemExit(f"无法加载技能脚本: {path}")
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[spec.name] = module
+            spec.loader.exec_module(module)
+            cached = _MODULES[name] = (mtime, module)
+        return cached[1]
+
+
+# 进程内只读静态数据（状态机规则、选型引擎输出）；batch worker / 常驻进程复用，单次运行无差别
+_STATIC: Dict[Any, Any] = {}
+_STATIC_LOCK = threading.Lock()
+
+
+def static_data(key: Any, load: Callable[[], Any]) -> Any:
+    with _STATIC_LOCK:
+        if key in _STATIC:
+            return _STATIC[key]
+    value = load()
+    with _STATIC_LOCK:
+        return _STATIC.setdefault(key, value)
+
+
+def preload_static_data() -> None:
+    """Import every skill module (direction presets, icon catalog, keyword tables) and parse shared rules once."""
+    for name in SKILL_SCRIPTS:
+        skill(name)
+    static_json(REPO_ROOT / "skills" / "contracts" / "state-machine-rules.yaml", {})
+
+
+def static_json(path: Path, default: Any) -> Any:
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return default
+    return static_data(("json", str(path), mtime), lambda: skill("state_machine").load_json(path, default))
+
+
+def now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def dump_json(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, indent=2) + "\n"
+
+
+def write_text(path: str, text: str) -> None:
+    Path(path).write_text(text, encoding="utf-8")
+
+
+def is_under(candidate: str, root: Path) -> bool:
+    return candidate == str(root) or candidate.startswith(str(root) + "/")
+
+
+def resolve_workspace_root(arg: str, caller_pwd: str, env: Mapping[str, str] | None = None) -> str:
+    env = os.environ if env is None else env
+    if arg:
+        candidate = arg
+    elif env.get("RUI_WORKSPACE_ROOT"):
+        candidate = env["RUI_WORKSPACE_ROOT"]
+    else:
+        candidate = caller_pwd
+        oldpwd = env.get("OLDPWD", "")
+        if is_under(candidate, REPO_ROOT) and oldpwd and os.path.isdir(oldpwd):
+            oldpwd_real = os.path.realpath(oldpwd)
+            if not is_under(oldpwd_real, REPO_ROOT):
+                candidate = oldpwd_real
+    if not candidate.startswith("/"):
+        candidate = f"{caller_pwd}/{candidate}"
+    if os.path.isdir(candidate):
+        return os.path.realpath(candidate)
+    raise SystemExit(f"Error: workspace root 不存在: {candidate}")
+
+
+def split_csv(values: List[str]) -> str:
+    return ",".join(values)
+
+
+def csv_items(csv: str) -> List[str]:
+    """Mirror the shell's `IFS=, read -a` + `${item// /}` handling."""
+    return [x.replace(" ", "") for x in csv.split(",") if x.replace(" ", "")]
+
+
+def source_stamp(paths: Tuple[str, ...]) -> Tuple[int, ...]:
+    """mtimes of static sources, so long-lived processes pick up edits to them."""
+    stamp = []
+    for rel in paths:
+        path = REPO_ROOT / rel
+        try:
+            stamp.append(max([path.stat().st_mtime_ns, *(p.stat().st_mtime_ns for p in path.rglob("*"))]) if path.is_dir() else path.stat().st_mtime_ns)
+        except OSError:
+            stamp.append(0)
+    return tuple(stamp)
+
+
+def load_config(workspace_root: str) -> Any:
+    candidates = [REPO_ROOT / ".rui-config.yaml", Path(workspace_root) / ".rui-config.yaml", Path.home() / ".rui-config.yaml"]
+    stamp = tuple(p.stat().st_mtime_ns if p.exists() else 0 for p in candidates)
+    return static_data(
+        ("config", workspace_root, stamp), lambda: skill("config").RuiConfig.load(REPO_ROOT, Path(workspace_root))
+    )
+
+
+def run_node(args: List[str]) -> str:
+    # ui_library_engine.mjs 对同一参数的输出只取决于引擎与 seed 数据，按参数在进程内复用
+    calls: List[int] = []
+
+    def load() -> str:
+        calls.append(1)
+        return run_node_uncached(args)
+
+    output = static_data(("node", source_stamp(SELECTOR_SOURCES), *args), load)
+    flow_trace.current_span().set(engine_memoized=not calls)
+    return output
+
+
+def run_node_uncached(args: List[str]) -> str:
+    with flow_trace.span(f"node ui_library_engine.mjs {args[0] if args else ''}".strip(), "subprocess", argv=args) as sp:
+        proc, usage = resource_usage.run_measured(
+            ["node", "skills/ui-selector-pro/scripts/ui_library_engine.mjs", *args],
+            cwd=REPO_ROOT,
+            text=True,
+        )
+        sp.set(exit_code=proc.returncode, stdout_bytes=len(proc.stdout.encode("utf-8")), resource=usage)
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(proc.returncode)
+    return proc.stdout
+
+
+def changed_files_csv(workspace_root: str) -> str:
+    try:
+        with flow_trace.span("git rev-parse", "subprocess") as sp:
+            inside, usage = resource_usage.run_measured(
+                ["git", "-C", workspace_root, "rev-parse", "--is-inside-work-tree"],
+                text=True,
+            )
+            sp.set(exit_code=inside.returncode, resource=usage)
+        if inside.returncode != 0:
+            return ""
+        with flow_trace.span("git diff --name-only", "subprocess") as sp:
+            proc, usage = resource_usage.run_measured(["git", "-C", workspace_root, "diff", "--name-only"], text=True)
+            sp.set(exit_code=proc.returncode, file_count=len(proc.stdout.splitlines()), resource=usage)
+    except OSError:
+        return ""
+    return ",".join(proc.stdout.splitlines())
+
+
+def tolerate(fn: Callable[[], Any]) -> None:
+    """Equivalent of the shell's `|| true` for best-effort steps."""
+    try:
+        fn()
+    except SystemExit:
+        pass
+    except Exception:
+        traceback.print_exc()
+
+
+# 每次运行一份工作区索引，按 out-dir 区分（daemon 中并发的运行互不共享）
+_INDEXES: Dict[str, workspace_index.WorkspaceIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def build_run_index(ctx: Dict[str, str]) -> None:
+    """Walk the workspace once for this run and save workspace.index.json (the out-dir and step cache are excluded)."""
+    with flow_trace.span("workspace_index", "index") as sp:
+        index = workspace_index.WorkspaceIndex.build(
+            Path(ctx["WORKSPACE_ROOT"]), exclude=[Path(ctx["OUT_DIR"]), Path(ctx["STEP_CACHE_DIR"])]
+        )
+        index.save(Path(ctx["WORKSPACE_INDEX_PATH"]))
+        sp.set(file_count=len(index.entries))
+    with _INDEXES_LOCK:
+        _INDEXES[ctx["OUT_DIR"]] = index
+
+
+def run_index(ctx: Dict[str, str]) -> workspace_index.WorkspaceIndex:
+    with _INDEXES_LOCK:
+        return _INDEXES[ctx["OUT_DIR"]]
+
+
+@contextlib.contextmanager
+def step_span(ctx: Dict[str, str], name: str) -> Iterator[Any]:
+    """Trace one step and append its CPU/RSS/IO usage to RESOURCE_USAGE_LOG."""
+    with flow_trace.span(name, "step") as sp:
+        with resource_usage.measure(ctx.get("RESOURCE_USAGE_LOG", ""), name) as usage:
+            yield sp
+        sp.set(resource={k: usage[k] for k in resource_usage.USAGE_FIELDS})
+
+
+def timed(ctx: Dict[str, str], prefix: str, fn: Callable[[], Any]) -> Any:
+    """Run fn in a step span and record <prefix>_START_MS / <prefix>_DURATION_MS like the shell timers."""
+    name = {p: n for n, p in skill("artifacts").TIMELINE_STEPS}.get(prefix, prefix.lower())
+    with step_span(ctx, name):
+        start = now_ms()
+        ctx[f"{prefix}_START_MS"] = str(start)
+        result = fn()
+        ctx[f"{prefix}_DURATION_MS"] = str(now_ms() - start)
+    return result
+
+
+def file_stats(paths: List[Path]) -> Tuple[int, int]:
+    """(file count, total bytes) over files and directory trees."""
+    count = size = 0
+    for path in paths:
+        members = [p for p in path.rglob("*") if p.is_file()] if path.is_dir() else [path]
+        for member in members:
+            try:
+                size += member.stat().st_size
+                count += 1
+            except OSError:
+                continue
+    return count, size
+
+
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the RUI fullflow pipeline in-process")
+    parser.add_argument("--brief", default="")
+    parser.add_argument("--brief-file", default="")
+    parser.add_argument("--framework", default="")
+    parser.add_argument("--project-type", default="")
+    parser.add_argument("--style-target", default="")
+    parser.add_argument("--scope-file", action="append", default=[])
+    parser.add_argument("--icon-mode", default="auto")
+    parser.add_argument("--icon-style", default=None)
+    parser.add_argument("--priority", action="append", default=[])
+    parser.add_argument("--design-style", default="")
+    parser.add_argument("--team-size", default="")
+    parser.add_argument("--density", default=None)
+    parser.add_argument("--brand-color", default="")
+    parser.add_argument("--top", default="5")
+    parser.add_argument("--auto-complete", action="store_true", default=None)
+    parser.add_argument("--refactor-threshold", default=None)
+    parser.add_argument("--render-threshold", default=None)
+    parser.add_argument("--duplicate-threshold", default=None)
+    parser.add_argument("--props-depth-threshold", default=None)
+    parser.add_argument("--acceptance-level", default=None)
+    parser.add_argument("--out-dir", default="")
+    parser.add_argument("--workspace-root", default="")
+    parser.add_argument("--direction", default="")
+    parser.add_argument("--resume", default="", help="续跑已有 out-dir：复用输入未变的已完成步骤，只重跑缺失/过期的步骤")
+    parser.add_argument("--cache-dir", default="", help="步骤缓存目录（默认取配置 cache.dir，相对 workspace root）")
+    parser.add_argument("--no-cache", action="store_true", help="禁用步骤缓存、分析缓存与工具检查缓存，全部重新计算")
+    parser.add_argument("--no-tool-cache", action="store_true", help="Phase 5/门禁的工具检查不复用也不写入结果缓存")
+    parser.add_argument("--jobs", type=int, default=4, help="Phase 1/2 并发步骤数上限（1 = 与 shell 相同的串行顺序）")
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error("--jobs 必须 >= 1")
+    return args
+
+
+EXECUTION_OPTIONS = ("out_dir", "jobs", "cache_dir", "no_cache", "no_tool_cache", "resume")
+
+
+def load_json_file(path: Path) -> Any:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def save_resume_args(args: argparse.Namespace, ctx: Dict[str, str]) -> None:
+    """Persist the resolved pipeline arguments so --resume can replay them exactly."""
+    saved = {k: v for k, v in vars(args).items() if k not in EXECUTION_OPTIONS}
+    saved.update({"brief": ctx["BRIEF"], "brief_file": "", "workspace_root": ctx["WORKSPACE_ROOT"]})
+    path = Path(ctx["OUT_DIR"]) / RESUME_DIR / "args.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(dump_json(saved), encoding="utf-8")
+
+
+def args_from_record(flow: Dict[str, Any], workspace_root: str) -> Dict[str, Any]:
+    """Map a flow.input.json-style record onto driver option names."""
+    saved: Dict[str, Any] = {
+        "brief": flow["brief"],
+        "framework": flow.get("framework", ""),
+        "project_type": flow.get("project_type", ""),
+        "style_target": flow.get("style_target") or "",
+        "scope_file": list(flow.get("scope_files") or []),
+        "icon_mode": flow.get("icon_mode", "auto"),
+        "priority": list(flow.get("priorities") or []),
+        "design_style": flow.get("design_style") or "",
+        "team_size": flow.get("team_size") or "",
+        "density": flow.get("density"),
+        "auto_complete": bool(flow.get("auto_complete")) or None,
+        "refactor_threshold": str(flow.get("refactor_threshold", "200")),
+        "render_threshold": str(flow.get("render_threshold", "30")),
+        "duplicate_threshold": str(flow.get("duplicate_threshold", "3")),
+        "props_depth_threshold": str(flow.get("props_depth_threshold", "3")),
+        "acceptance_level": flow.get("acceptance_level"),
+        "workspace_root": workspace_root,
+    }
+    # 记录中直接使用驱动参数名的字段（brand_color/top/direction 等）原样透传
+    options = vars(parse_args([]))
+    for key, value in flow.items():
+        if key in options and key not in saved and key not in EXECUTION_OPTIONS:
+            saved[key] = value
+    # flow.input.json 记录的是检测前的图标风格；只有与配置默认值不同才视为显式指定
+    config = load_config(workspace_root or os.getcwd())
+    if flow.get("icon_style") and flow["icon_style"] != config.data["design_tokens"].get("default_icon_style", "outline"):
+        saved["icon_style"] = flow["icon_style"]
+    return saved
+
+
+def args_from_flow_input(out_dir: Path) -> Dict[str, Any]:
+    """Fallback for out-dirs written by run_fullflow_pipeline.sh (no saved args)."""
+    flow = load_json_file(out_dir / "flow.input.json")
+    if not isinstance(flow, dict) or not flow.get("brief"):
+        raise SystemExit(f"Error: 无法续跑，缺少 {out_dir}/flow.input.json")
+    state = load_json_file(out_dir / "flow.state.json") or {}
+    workspace = str(out_dir.parent.parent) if out_dir.parent.name == "Ruiagents" else ""
+    return args_from_record(flow, str(state.get("workspace_root") or workspace))
+
+
+def namespace_from_saved(saved: Dict[str, Any]) -> argparse.Namespace:
+    args = parse_args([])
+    for key, value in saved.items():
+        if hasattr(args, key):
+            setattr(args, key, value)
+    return args
+
+
+def resume_args(args: argparse.Namespace) -> argparse.Namespace:
+    out_dir = Path(os.path.abspath(args.resume))
+    if not out_dir.is_dir():
+        raise SystemExit(f"Error: --resume 目录不存在: {out_dir}")
+    saved = load_json_file(out_dir / RESUME_DIR / "args.json")
+    if not isinstance(saved, dict):
+        saved = args_from_flow_input(out_dir)
+    resumed = namespace_from_saved(saved)
+    resumed.out_dir = str(out_dir)
+    resumed.resume = str(out_dir)
+    resumed.jobs = args.jobs
+    resumed.cache_dir = args.cache_dir
+    resumed.no_cache = args.no_cache
+    resumed.no_tool_cache = args.no_tool_cache
+    return resumed
+
+
+def prepare_context(
+    args: argparse.Namespace, caller_pwd: str | None = None, env: Mapping[str, str] | None = None
+) -> Dict[str, str]:
+    """Resolve options, config overrides and artifact paths exactly like the shell entrypoint.
+
+    caller_pwd/env default to this process; the daemon passes the client's.
+    """
+    caller_pwd = os.path.realpath(caller_pwd or os.getcwd())
+    brief = args.brief
+    if args.brief_file:
+        brief = (Path(caller_pwd) / args.brief_file).read_text(encoding="utf-8").rstrip("\n")
+    if not brief or not args.framework or not args.project_type:
+        raise SystemExit("Error: 缺少必填参数（--brief/--brief-file, --framework, --project-type）")
+    if args.icon_mode not in {"auto", "on", "off"}:
+        raise SystemExit("Error: --icon-mode 仅支持 auto|on|off")
+
+    workspace_root = resolve_workspace_root(args.workspace_root, caller_pwd, env)
+    config = load_config(workspace_root)
+    cfg_env = dict(line.split("=", 1) for line in config.to_env().splitlines() if "=" in line)
+    # 缓存与工具检查的并发/超时设置不影响步骤产物，不计入配置摘要
+    config_digest = hashlib.sha256(
+        json.dumps({k: v for k, v in config.data.items() if k not in {"cache", "tool_checks", "plugins"}}, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    cache_dir = args.cache_dir or cfg_env.get("RUI_CFG_CACHE_DIR", ".rui-cache")
+    if not cache_dir.startswith("/"):
+        cache_dir = f"{workspace_root}/{cache_dir}"
+
+    def pick(arg_value: str | None, cfg_key: str, default: str) -> str:
+        if arg_value is not None:
+            return str(arg_value)
+        return cfg_env.get(cfg_key) or default
+
+    ctx: Dict[str, str] = dict(cfg_env)
+    ctx.update(
+        {
+            "BRIEF": brief,
+            "FRAMEWORK": args.framework,
+            "PROJECT_TYPE": args.project_type,
+            "STYLE_TARGET": args.style_target,
+            "SCOPE_FILES_CSV": split_csv(args.scope_file),
+            "PRIORITY_CSV": split_csv(args.priority),
+            "ICON_MODE": args.icon_mode,
+            "ICON_STYLE": pick(args.icon_style, "RUI_CFG_ICON_STYLE", "outline"),
+            "ARG_ICON_STYLE_SET": "1" if args.icon_style is not None else "0",
+            "DESIGN_STYLE": args.design_style,
+            "TEAM_SIZE": args.team_size,
+            "DENSITY": pick(args.density, "RUI_CFG_DENSITY", "comfortable"),
+            "BRAND_COLOR": args.brand_color,
+            "TOP": str(args.top),
+            "AUTO_COMPLETE": "1" if args.auto_complete else cfg_env.get("RUI_CFG_AUTO_COMPLETE", "0"),
+            "REFACTOR_THRESHOLD": pick(args.refactor_threshold, "RUI_CFG_REFACTOR_FILE_LINES", "200"),
+            "RENDER_THRESHOLD": pick(args.render_threshold, "RUI_CFG_REFACTOR_RENDER_LINES", "30"),
+            "DUPLICATE_THRESHOLD": pick(args.duplicate_threshold, "RUI_CFG_REFACTOR_PATTERN_REPEAT", "3"),
+            "PROPS_DEPTH_THRESHOLD": pick(args.props_depth_threshold, "RUI_CFG_REFACTOR_PROP_DRILL", "3"),
+            "ACCEPTANCE_LEVEL": pick(args.acceptance_level, "RUI_CFG_ACCEPTANCE_LEVEL", "strict"),
+            "DIRECTION": args.direction,
+            "WORKSPACE_ROOT": workspace_root,
+            "SCHEDULER_JOBS": str(args.jobs),
+            "CONFIG_DIGEST": config_digest,
+            "STEP_CACHE_ENABLED": "0" if args.no_cache or cfg_env.get("RUI_CFG_CACHE_ENABLED") == "0" else "1",
+            "STEP_CACHE_DIR": cache_dir,
+        }
+    )
+    # 逐文件分析缓存与步骤缓存同目录、同开关
+    ctx["ANALYSIS_CACHE_PATH"] = str(Path(cache_dir) / analysis_cache.CACHE_FILE) if ctx["STEP_CACHE_ENABLED"] == "1" else ""
+    tool_cache_on = ctx["STEP_CACHE_ENABLED"] == "1" and not args.no_tool_cache
+    ctx["TOOL_CACHE_PATH"] = str(Path(cache_dir) / tool_cache.CACHE_FILE) if tool_cache_on else ""
+
+    if ctx["ACCEPTANCE_LEVEL"] not in {"strict", "normal", "loose"}:
+        raise SystemExit("Error: --acceptance-level 仅支持 strict|normal|loose")
+    for key in ("REFACTOR_THRESHOLD", "RENDER_THRESHOLD", "DUPLICATE_THRESHOLD", "PROPS_DEPTH_THRESHOLD"):
+        if not re.fullmatch(r"[0-9]+", ctx[key]):
+            raise SystemExit("Error: Phase4 阈值参数必须是非负整数")
+
+    out_dir = args.out_dir
+    if not out_dir:
+        out_dir = f"{workspace_root}/Ruiagents/{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    elif not out_dir.startswith("/"):
+        out_dir = f"{workspace_root}/{out_dir}"
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    ctx["OUT_DIR"] = out_dir
+    ctx["WORKFLOW_ID"] = f"rui-flow-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    ctx["STARTED_AT_UTC"] = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    ctx["RESUME"] = "1" if args.resume else "0"
+    if args.resume:
+        # 续跑沿用原 workflow，transition_log 在 write_flow_outputs 中合并
+        previous = load_json_file(Path(out_dir) / "flow.state.json") or {}
+        ctx["WORKFLOW_ID"] = str(previous.get("workflow_id") or ctx["WORKFLOW_ID"])
+        ctx["STARTED_AT_UTC"] = str(previous.get("started_at") or ctx["STARTED_AT_UTC"])
+
+    for key in (
+        "PHASE1", "PHASE2", "PHASE3", "PHASE4", "PHASE5", "REQ_ENGINE", "STYLE_SCOPE_BUILD",
+        "STYLE_SCOPE_VALIDATE", "ICON_DETECT", "ICON_GENERATE", "SELECTOR_RECOMMEND", "SELECTOR_EVALUATE",
+        "AESTHETIC_SCORE", "TOKENS", "ADAPTER_SELECT", "PHASE4_HOOK_BEFORE", "PHASE4_SCRIPT",
+        "PHASE5_SCRIPT", "PHASE5_HOOK_AFTER", "GATE_VALIDATE_PRE", "GATE_VALIDATE_POST",
+    ):
+        ctx[f"{key}_DURATION_MS"] = "0"
+
+    artifact_names = {
+        "FLOW_INPUT_PATH": "flow.input.json",
+        "REQ_SUMMARY_PATH": "requirements.summary.json",
+        "REQ_PRD_PATH": "requirements.prd.md",
+        "REQ_QUESTIONS_PATH": "requirements.questions.md",
+        "STYLE_PROFILE_PATH": "style-profile.yaml",
+        "STYLE_SCOPE_LOCK_PATH": "style.scope.lock.json",
+        "STYLE_SCOPE_CHECKLIST_PATH": "style.scope.checklist.md",
+        "ICON_MANIFEST_PATH": "icon.manifest.json",
+        "ICON_SPEC_PATH": "icon.spec.md",
+        "ICON_SPRITE_PATH": "icon.sprite.svg",
+        "ICON_CANVAS_DEMO_PATH": "canvas.icon.demo.js",
+        "ICON_ANALYSIS_PATH": "icon.need.analysis.json",
+        "RECOMMEND_PATH": "selector.recommend.json",
+        "EVALUATE_PATH": "selector.evaluate.json",
+        "SCORE_PATH": "aesthetic.score.json",
+        "TOKENS_JSON_PATH": "tokens.json",
+        "TOKENS_CSS_PATH": "tokens.css",
+        "ADAPTER_MANIFEST_PATH": "framework.adapter.manifest.json",
+        "FLOW_METRICS_PATH": "flow.metrics.json",
+        "STYLE_SCOPE_VALIDATION_PATH": "style.scope.validation.json",
+        "PLUGIN_PHASE4_HOOKS_PATH": "plugin.hooks.phase4.before.json",
+        "PLUGIN_PHASE5_HOOKS_PATH": "plugin.hooks.phase5.after.json",
+        "SCORECARD_PATH": "self-eval.scorecard.json",
+        "OPTIMIZATION_PLAN_PATH": "optimization.plan.md",
+        "REPORT_PATH": "fullflow.report.md",
+        "STAGE_STATUS_PATH": "stage.status.json",
+        "QUALITY_GATES_PATH": "quality.gates.md",
+        "DECISION_TRACE_PATH": "decision.trace.md",
+        "FLOW_STATE_PATH": "flow.state.json",
+        "GATE_VALIDATION_PATH": "gate-validation-report.json",
+        "PHASE4_REPORT_PATH": "phase4.refactor.report.json",
+        "PHASE5_REPORT_PATH": "phase5.acceptance.report.json",
+        "STATE_MACHINE_VALIDATION_PATH": "state-machine.validation.json",
+        "WORKSPACE_INDEX_PATH": workspace_index.INDEX_FILE,
+    }
+    for key, name in artifact_names.items():
+        ctx[key] = f"{out_dir}/{name}"
+    ctx["STATE_MACHINE_RULES_PATH"] = str(REPO_ROOT / "skills" / "contracts" / "state-machine-rules.yaml")
+    return ctx
+
+
+def step_requirements(ctx: Dict[str, str]) -> None:
+    brief = ctx["BRIEF"].strip()
+    if not brief:
+        raise SystemExit("brief is required: use --brief or --brief-file")
+    result = skill("requirements").build_requirements(brief, Path(ctx["OUT_DIR"]))
+    write_text(ctx["REQ_SUMMARY_PATH"], dump_json(result))
+
+
+def step_scope_lock(ctx: Dict[str, str]) -> None:
+    mod = skill("scope_lock")
+    allowed = csv_items(ctx["SCOPE_FILES_CSV"])
+    payload = mod.build_scope_lock(ctx["BRIEF"].strip(), ctx["STYLE_TARGET"], allowed)
+    mod.write_scope_lock(payload, Path(ctx["STYLE_SCOPE_LOCK_PATH"]), Path(ctx["STYLE_SCOPE_CHECKLIST_PATH"]))
+    ctx["SCOPE_LOCKED"] = "1" if payload.get("scope_locked") else "0"
+    if ctx["STYLE_SCOPE_REQUIRED"] == "1" and ctx["SCOPE_LOCKED"] != "1":
+        raise SystemExit("Error: 样式改动范围未锁定，请提供 --style-target（建议同时提供 --scope-file）")
+    if ctx["STYLE_SCOPE_REQUIRED"] != "1" and ctx["SCOPE_LOCKED"] != "1":
+        print("Warning: 未启用 style-scope-guard 强约束（本次未提供 --style-target/--scope-file）", file=sys.stderr)
+
+
+def step_scope_validate(ctx: Dict[str, str]) -> None:
+    if ctx["STYLE_SCOPE_REQUIRED"] != "1":
+        skill("artifacts").write_scope_validation_skipped(ctx["STYLE_SCOPE_VALIDATION_PATH"])
+        return
+
+    ctx["CHANGED_FILES_CSV"] = changed_files_csv(ctx["WORKSPACE_ROOT"])
+
+    def run() -> None:
+        mod = skill("scope_validate")
+        lock = json.loads(Path(ctx["STYLE_SCOPE_LOCK_PATH"]).read_text(encoding="utf-8"))
+        changed = mod.parse_changed(argparse.Namespace(changed_file=[], changed_files=ctx["CHANGED_FILES_CSV"]))
+        result = mod.validate_scope(
+            lock, changed, Path(ctx["WORKSPACE_ROOT"]).resolve(), ctx["STYLE_SCOPE_LOCK_PATH"], run_index(ctx)
+        )
+        write_text(ctx["STYLE_SCOPE_VALIDATION_PATH"], dump_json(result))
+
+    tolerate(run)
+
+
+def step_icon_detect(ctx: Dict[str, str]) -> None:
+    mode = ctx["ICON_MODE"]
+    if mode in {"on", "off"}:
+        skill("artifacts").write_icon_analysis_stub(ctx["ICON_ANALYSIS_PATH"], mode)
+        ctx["ICON_ENABLED"] = "1" if mode == "on" else "0"
+        return
+    analysis = asdict(skill("icon_detect").analyze(ctx["BRIEF"]))
+    write_text(ctx["ICON_ANALYSIS_PATH"], dump_json(analysis))
+    ctx["ICON_ENABLED"] = "1" if analysis.get("needed") else "0"
+    if ctx["ARG_ICON_STYLE_SET"] != "1":
+        ctx["ICON_STYLE"] = str(analysis.get("style_preference", "outline"))
+
+
+def step_icon_generate(ctx: Dict[str, str]) -> None:
+    if ctx["ICON_STYLE"] not in ICON_STYLES:
+        raise SystemExit(f"generate_icon_assets.py: invalid --style {ctx['ICON_STYLE']!r}")
+    brief = ctx["BRIEF"].strip()
+    if not brief:
+        raise SystemExit("brief is required: use --brief or --brief-file")
+    skill("icon_generate").generate_icon_assets(brief, Path(ctx["OUT_DIR"]), ctx["FRAMEWORK"], "auto", ctx["ICON_STYLE"], [])
+
+
+def step_selector_recommend(ctx: Dict[str, str]) -> None:
+    cmd = ["recommend", "--framework", ctx["FRAMEWORK"], "--project-type", ctx["PROJECT_TYPE"], "--top", ctx["TOP"], "--format", "json"]
+    for item in csv_items(ctx["PRIORITY_CSV"]):
+        cmd += ["--priority", item]
+    if ctx["DESIGN_STYLE"]:
+        cmd += ["--design-style", ctx["DESIGN_STYLE"]]
+    if ctx["TEAM_SIZE"]:
+        cmd += ["--team-size", ctx["TEAM_SIZE"]]
+    output = run_node(cmd)
+    write_text(ctx["RECOMMEND_PATH"], output)
+    data = json.loads(output)
+    ids = [x.get("library", {}).get("id", "") for x in data.get("results", [])[:3]]
+    ctx["TOP_IDS"] = ",".join(x for x in ids if x)
+    if not ctx["TOP_IDS"]:
+        raise SystemExit("Error: 推荐结果为空，无法继续")
+
+
+def step_selector_evaluate(ctx: Dict[str, str]) -> None:
+    write_text(ctx["EVALUATE_PATH"], run_node(["evaluate", "--libraries", ctx["TOP_IDS"], "--format", "json"]))
+
+
+def step_aesthetic_score(ctx: Dict[str, str]) -> None:
+    result = skill("score").build_result(ctx["BRIEF"])
+    write_text(ctx["SCORE_PATH"], dump_json(result))
+    if not ctx["DIRECTION"]:
+        ctx["DIRECTION"] = str(result.get("recommended_direction", {}).get("name", "Data Clarity"))
+
+
+def step_tokens(ctx: Dict[str, str]) -> None:
+    mod = skill("tokens")
+    argv = ["--density", ctx["DENSITY"], "--format", "both", "--json-out", ctx["TOKENS_JSON_PATH"], "--css-out", ctx["TOKENS_CSS_PATH"]]
+    if ctx["DIRECTION"]:
+        argv += ["--direction", ctx["DIRECTION"]]
+    else:
+        argv += ["--from-score-json", ctx["SCORE_PATH"]]
+    if ctx["BRAND_COLOR"]:
+        argv += ["--brand-color", ctx["BRAND_COLOR"]]
+    token_args = mod.parse_args(argv)
+    payload = mod.build_token_payload(token_args)
+    mod.write_if_path(token_args.json_out, json.dumps(payload, ensure_ascii=False, indent=2))
+    mod.write_if_path(token_args.css_out, mod.render_css(payload))
+
+
+def step_adapter(ctx: Dict[str, str]) -> None:
+    manifest = skill("adapter").build_adapter_manifest(ctx["FRAMEWORK"], REPO_ROOT, Path(ctx["OUT_DIR"]), True)
+    manifest_path = Path(ctx["ADAPTER_MANIFEST_PATH"]).resolve()
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    manifest_path.write_text(dump_json(manifest), encoding="utf-8")
+
+
+def step_snapshot(ctx: Dict[str, str], label: str, write_index: bool = False) -> str:
+    mod = skill("snapshot")
+    return mod.create_snapshot(Path(ctx["OUT_DIR"]), label, mod.RetentionPolicy.from_env(ctx), write_index)
+
+
+def plugin_hook_limits(ctx: Dict[str, str]) -> Tuple[int, int]:
+    """(parallelism, timeout_s) for plugin hooks, from plugins.* in .rui-config.yaml."""
+    hooks = skill("hooks")
+    parallelism = int(ctx.get("RUI_CFG_PLUGIN_PARALLELISM", "") or hooks.DEFAULT_PARALLELISM)
+    timeout = int(ctx.get("RUI_CFG_PLUGIN_TIMEOUT_S", "") or hooks.DEFAULT_TIMEOUT_S)
+    return max(1, parallelism), timeout
+
+
+def step_hooks(ctx: Dict[str, str], phase: str, when: str, report_key: str) -> None:
+    def run() -> None:
+        report = skill("hooks").run_hooks(
+            REPO_ROOT,
+            phase,
+            when,
+            Path(ctx["WORKSPACE_ROOT"]),
+            Path(ctx["OUT_DIR"]),
+            Path(ctx["FLOW_STATE_PATH"]),
+            *plugin_hook_limits(ctx),
+        )
+        write_text(ctx[report_key], dump_json(report))
+
+    tolerate(run)
+    # 插件可能改动工作区：重新 stat 已索引文件，丢弃变更文件的已解码内容
+    run_index(ctx).refresh()
+
+
+def open_analysis_cache(ctx: Dict[str, str]) -> analysis_cache.AnalysisCache:
+    path = ctx.get("ANALYSIS_CACHE_PATH", "")
+    return analysis_cache.AnalysisCache(Path(path) if path else None)
+
+
+def open_tool_cache(ctx: Dict[str, str]) -> tool_cache.ToolCheckCache:
+    path = ctx.get("TOOL_CACHE_PATH", "")
+    return tool_cache.ToolCheckCache(Path(path) if path else None)
+
+
+def step_phase4(ctx: Dict[str, str]) -> None:
+    mod = skill("phase4")
+    with open_analysis_cache(ctx) as cache:
+        report = mod.build_refactor_report(
+            Path(ctx["WORKSPACE_ROOT"]),
+            int(ctx["REFACTOR_THRESHOLD"]),
+            int(ctx["RENDER_THRESHOLD"]),
+            int(ctx["DUPLICATE_THRESHOLD"]),
+            int(ctx["PROPS_DEPTH_THRESHOLD"]),
+            run_index(ctx),
+            cache,
+        )
+    flow_trace.current_span().set(**{f"analysis_cache_{k}": v for k, v in cache.stats.items()})
+    out_dir = Path(ctx["OUT_DIR"])
+    mod.write_refactor_report(report, out_dir / "phase4.refactor.report.json", out_dir / "phase4.refactor.report.md")
+    ctx["PHASE4_STATUS"] = str(report.get("status", "pending"))
+    summary = report.get("summary", {})
+    flow_trace.current_span().set(file_count=summary.get("total_source_files", 0), findings=summary.get("findings_count", 0))
+
+
+def tool_check_limits(ctx: Dict[str, str]) -> Tuple[int, int]:
+    """(parallelism, timeout_s) for the shared tool checks, from tool_checks.* in .rui-config.yaml."""
+    parallelism = int(ctx.get("RUI_CFG_TOOL_PARALLELISM", "") or tool_checks.DEFAULT_PARALLELISM)
+    timeout = int(ctx.get("RUI_CFG_TOOL_TIMEOUT_S", "") or tool_checks.DEFAULT_TIMEOUT_S)
+    return max(1, parallelism), timeout
+
+
+def step_phase5(ctx: Dict[str, str]) -> None:
+    mod = skill("phase5")
+    out_dir = Path(ctx["OUT_DIR"])
+    with open_tool_cache(ctx) as cache:
+        report = mod.build_acceptance_report(
+            ctx["ACCEPTANCE_LEVEL"],
+            out_dir / "self-eval.scorecard.json",
+            out_dir / "gate-validation-report.json",
+            out_dir / "phase4.refactor.report.json",
+            Path(ctx["WORKSPACE_ROOT"]).resolve(),
+            out_dir / tool_checks.RESULTS_FILE,
+            *tool_check_limits(ctx),
+            cache,
+        )
+    flow_trace.current_span().set(**{f"tool_cache_{k}": v for k, v in cache.stats.items()})
+    mod.write_acceptance_report(report, out_dir / "phase5.acceptance.report.json", out_dir / "phase5.acceptance.report.md")
+    ctx["PHASE5_STATUS"] = str(report.get("status", "pending"))
+
+
+def step_gates(ctx: Dict[str, str], mode: str) -> None:
+    def run() -> None:
+        with open_analysis_cache(ctx) as cache, open_tool_cache(ctx) as checks_cache:
+            result = skill("gates").build_gate_report(
+                Path(ctx["OUT_DIR"]),
+                Path(ctx["WORKSPACE_ROOT"]).resolve(),
+                REPO_ROOT.resolve(),
+                mode,
+                run_index(ctx),
+                cache,
+                None,
+                "",
+                *tool_check_limits(ctx),
+                checks_cache,
+            )
+        flow_trace.current_span().set(**{f"analysis_cache_{k}": v for k, v in cache.stats.items()})
+        write_text(ctx["GATE_VALIDATION_PATH"], dump_json(result))
+        summary = result.get("summary", {})
+        flow_trace.current_span().set(
+            mode=mode,
+            gates=summary.get("total_gates", 0),
+            gates_failed=summary.get("failed", 0),
+            tool_checks=len(result.get("tool_checks", [])),
+        )
+
+    tolerate(run)
+
+
+def step_state_machine(ctx: Dict[str, str]) -> None:
+    mod = skill("state_machine")
+    state_file = Path(ctx["FLOW_STATE_PATH"])
+    rules_file = Path(ctx["STATE_MACHINE_RULES_PATH"])
+    failed = True
+    try:
+        report = mod.validate_flow_state(
+            mod.load_json(state_file, {}),
+            static_json(rules_file, {}),
+            mod.load_json(Path(ctx["STAGE_STATUS_PATH"]), []),
+            state_file,
+            rules_file,
+        )
+        write_text(ctx["STATE_MACHINE_VALIDATION_PATH"], dump_json(report))
+        failed = bool(report["issues"])
+    except Exception:
+        traceback.print_exc()
+    skill("artifacts").merge_state_machine_validation(
+        ctx["FLOW_STATE_PATH"], ctx["STATE_MACHINE_VALIDATION_PATH"], failed
+    )
+
+
+PHASE1_STEPS = ("requirements_elicitation", "style_scope_lock_build", "style_scope_validation")
+
+
+def phase12_steps(ctx: Dict[str, str], guards: StepGuards) -> List[Any]:
+    """Phase 1/2 as a dependency graph; inputs/outputs name the ctx keys each step reads/writes."""
+    Step = skill("scheduler").Step
+    graph = skill("artifacts").PIPELINE_GRAPH
+
+    def step(
+        name: str,
+        fn: Callable[[Dict[str, str]], Any],
+        inputs: Tuple[str, ...],
+        outputs: Tuple[str, ...],
+        when: Callable[[], bool] | None = None,
+    ) -> Any:
+        def run() -> None:
+            with step_span(ctx, name):
+                if name in STEP_SOURCES:
+                    guarded_call(ctx, guards, name, fn, inputs, outputs)
+                else:
+                    fn(ctx)
+
+        return Step(name, run, graph[name], inputs, outputs, when)
+
+    return [
+        step(
+            "requirements_elicitation", step_requirements, ("BRIEF",),
+            ("REQ_SUMMARY_PATH", "REQ_PRD_PATH", "REQ_QUESTIONS_PATH", "STYLE_PROFILE_PATH"),
+        ),
+        step(
+            "style_scope_lock_build", step_scope_lock, ("BRIEF", "STYLE_TARGET", "SCOPE_FILES_CSV"),
+            ("STYLE_SCOPE_LOCK_PATH", "STYLE_SCOPE_CHECKLIST_PATH", "SCOPE_LOCKED"),
+        ),
+        step(
+            "style_scope_validation", step_scope_validate, ("STYLE_SCOPE_LOCK_PATH",),
+            ("STYLE_SCOPE_VALIDATION_PATH", "CHANGED_FILES_CSV"),
+        ),
+        step(
+            "icon_need_detection", step_icon_detect, ("BRIEF", "ICON_MODE", "ARG_ICON_STYLE_SET", "ICON_STYLE"),
+            ("ICON_ANALYSIS_PATH", "ICON_ENABLED", "ICON_STYLE"),
+        ),
+        step(
+            "icon_generation", step_icon_generate, ("BRIEF", "FRAMEWORK", "ICON_ENABLED", "ICON_STYLE"),
+            ("ICON_MANIFEST_PATH", "ICON_SPEC_PATH", "ICON_SPRITE_PATH", "ICON_CANVAS_DEMO_PATH"),
+            when=lambda: ctx["ICON_ENABLED"] == "1",
+        ),
+        step(
+            "selector_recommend", step_selector_recommend,
+            ("FRAMEWORK", "PROJECT_TYPE", "PRIORITY_CSV", "TOP", "DESIGN_STYLE", "TEAM_SIZE"),
+            ("RECOMMEND_PATH", "TOP_IDS"),
+        ),
+        step("selector_evaluate", step_selector_evaluate, ("TOP_IDS",), ("EVALUATE_PATH",)),
+        step("aesthetic_score", step_aesthetic_score, ("BRIEF", "DIRECTION"), ("SCORE_PATH", "DIRECTION")),
+        step(
+            "token_generation", step_tokens, ("DIRECTION", "SCORE_PATH", "DENSITY", "BRAND_COLOR"),
+            ("TOKENS_JSON_PATH", "TOKENS_CSS_PATH"),
+        ),
+        step("framework_adapter_select", step_adapter, ("FRAMEWORK",), ("ADAPTER_MANIFEST_PATH",)),
+    ]
+
+
+@dataclass
+class StepGuards:
+    """Shared step cache (None when disabled) and this out-dir's resume journal."""
+
+    cache: Any
+    journal: Any
+    resume: bool = False
+
+
+def open_step_guards(ctx: Dict[str, str]) -> StepGuards:
+    mod = skill("step_cache")
+    cache = None
+    if ctx.get("STEP_CACHE_ENABLED") == "1":
+        max_mb = int(ctx.get("RUI_CFG_CACHE_MAX_MB", "256") or 256)
+        cache = mod.StepCache(Path(ctx["STEP_CACHE_DIR"]), max_mb * 1024 * 1024)
+    resume = ctx.get("RESUME") == "1"
+    journal = mod.StepJournal(Path(ctx["OUT_DIR"]) / RESUME_DIR / "steps.json", reset=not resume)
+    return StepGuards(cache, journal, resume)
+
+
+def step_key(ctx: Dict[str, str], name: str, inputs: Tuple[str, ...]) -> str:
+    mod = skill("step_cache")
+    sources, _extra = STEP_SOURCES[name]
+    out_dir = Path(ctx["OUT_DIR"])
+    return mod.StepCache.make_key(
+        {
+            "step": name,
+            "sources": mod.digest_sources([Path(__file__).resolve(), *(REPO_ROOT / src for src in sources)]),
+            "config": ctx["CONFIG_DIGEST"],
+            "inputs": {
+                k: mod.digest_file(Path(ctx[k]), out_dir) if k.endswith("_PATH") else ctx.get(k, "")
+                for k in inputs
+            },
+        }
+    )
+
+
+def guarded_call(
+    ctx: Dict[str, str],
+    guards: StepGuards,
+    name: str,
+    fn: Callable[[Dict[str, str]], Any],
+    inputs: Tuple[str, ...],
+    outputs: Tuple[str, ...],
+) -> None:
+    """Reuse a step's outputs (resume journal, then shared cache) when its key is unchanged; else run it."""
+    key = step_key(ctx, name, inputs)
+    prefix = dict(skill("artifacts").TIMELINE_STEPS)[name]
+    out_dir = Path(ctx["OUT_DIR"])
+    sp = flow_trace.current_span()
+    input_files, input_bytes = file_stats([Path(ctx[k]) for k in inputs if k.endswith("_PATH") and Path(ctx[k]).exists()])
+    sp.set(cache_key=key[:16], input_files=input_files, bytes_read=input_bytes)
+    if guards.resume:
+        values = guards.journal.reusable(name, key)
+        if values is not None:
+            ctx.update(values)
+            ctx[f"{prefix}_REUSED"] = "1"
+            sp.set(cache="reused")
+            return
+
+    paths = [Path(ctx[k]) for k in outputs if k.endswith("_PATH")] + [out_dir / rel for rel in STEP_SOURCES[name][1]]
+    cache = guards.cache if name in CACHEABLE_STEPS else None
+    entry = cache.lookup(key) if cache is not None else None
+    restored = False
+    if entry is not None:
+        try:
+            ctx.update(cache.restore(key, entry, out_dir))
+            ctx[f"{prefix}_CACHE"] = "hit"
+            restored = True
+        except OSError:
+            pass
+    if not restored:
+        fn(ctx)
+    values = {k: ctx[k] for k in outputs if not k.endswith("_PATH")}
+    existing = [p for p in paths if p.exists()]
+    output_files, output_bytes = file_stats(existing)
+    sp.set(
+        cache="hit" if restored else ("miss" if cache is not None else "disabled"),
+        output_files=output_files,
+        bytes_written=output_bytes,
+    )
+    if cache is not None and not restored:
+        cache.store(key, name, out_dir, existing, values)
+        ctx[f"{prefix}_CACHE"] = "miss"
+    guards.journal.record(name, key, existing, values)
+
+
+def workspace_fingerprint(index: workspace_index.WorkspaceIndex) -> str:
+    """Cheap stat-based digest of the sources Phase 4 scans (path, size, mtime), taken from the run's index."""
+    h = hashlib.sha256()
+    for entry in index.files(skill("phase4").SOURCE_EXT):
+        h.update(f"{entry.rel}\0{entry.size}\0{entry.mtime_ns}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def step_phase4_guarded(ctx: Dict[str, str], guards: StepGuards) -> None:
+    ctx["WORKSPACE_FINGERPRINT"] = workspace_fingerprint(run_index(ctx))
+    guarded_call(
+        ctx,
+        guards,
+        "phase4_refactor",
+        step_phase4,
+        ("WORKSPACE_FINGERPRINT", "REFACTOR_THRESHOLD", "RENDER_THRESHOLD", "DUPLICATE_THRESHOLD", "PROPS_DEPTH_THRESHOLD"),
+        ("PHASE4_REPORT_PATH", "PHASE4_STATUS"),
+    )
+
+
+def record_spans(ctx: Dict[str, str], pipeline_start: int, spans: Dict[str, Dict[str, int]]) -> None:
+    """Store scheduler spans as the shell-style timer variables plus Phase 1/2 wall durations."""
+    prefixes = dict(skill("artifacts").TIMELINE_STEPS)
+    for name, span in spans.items():
+        ctx[f"{prefixes[name]}_START_MS"] = str(pipeline_start + span["start_offset_ms"])
+        ctx[f"{prefixes[name]}_DURATION_MS"] = str(span["end_offset_ms"] - span["start_offset_ms"])
+    for phase_key, names in (
+        ("PHASE1_DURATION_MS", [n for n in spans if n in PHASE1_STEPS]),
+        ("PHASE2_DURATION_MS", [n for n in spans if n not in PHASE1_STEPS]),
+    ):
+        if names:
+            ctx[phase_key] = str(
+                max(spans[n]["end_offset_ms"] for n in names) - min(spans[n]["start_offset_ms"] for n in names)
+            )
+
+
+def report_resume_start(ctx: Dict[str, str]) -> None:
+    stages = load_json_file(Path(ctx["STAGE_STATUS_PATH"])) or []
+    done = [
+        str(row.get("phase"))
+        for row in stages
+        if isinstance(row, dict) and str(row.get("status", "")).startswith("completed")
+    ]
+    print(f"resume: {ctx['OUT_DIR']}（上次已完成阶段: {', '.join(done) or '无'}）", file=sys.stderr)
+
+
+def initial_snapshot(ctx: Dict[str, str], guards: StepGuards, spans: Dict[str, Dict[str, int]]) -> str:
+    """Snapshot Phase 1/2 output, unless a resumed run reused all of it and the snapshot already exists."""
+    prefixes = dict(skill("artifacts").TIMELINE_STEPS)
+    if guards.resume and all(ctx.get(f"{prefixes[name]}_REUSED") == "1" for name in spans if name in STEP_SOURCES):
+        versions = skill("snapshot").load_index(Path(ctx["OUT_DIR"]) / ".versions")["versions"]
+        if versions and versions[0].get("version"):
+            return str(versions[0]["version"])
+    return step_snapshot(ctx, "auto")
+
+
+def workspace_baseline(workspace_root: str) -> str:
+    info = Path(workspace_root) / "app" / "info.md"
+    if not info.is_file():
+        return "未检测到 app/info.md"
+    with open(info, "r", encoding="utf-8", errors="replace") as f:
+        return f.readline().rstrip("\n")
+
+
+def run_pipeline(ctx: Dict[str, str]) -> Dict[str, str]:
+    """Run every phase under a pipeline span, then export flow.trace.json / flow.trace.jsonl."""
+    tracer = flow_trace.Tracer()
+    token = flow_trace.activate(tracer)
+    fd, ctx["RESOURCE_USAGE_LOG"] = tempfile.mkstemp(prefix="rui-usage-", suffix=".jsonl")
+    os.close(fd)
+    # 运行登记表：开始时登记为 in_progress，结束（含失败）时按最终状态再登记
+    registry = skill("registry")
+    registry_file = registry.registry_path(ctx["WORKSPACE_ROOT"])
+    registry.register(registry_file, ctx["OUT_DIR"], ctx["WORKFLOW_ID"], ctx["STARTED_AT_UTC"], "in_progress")
+    succeeded = False
+    try:
+        with flow_trace.span(
+            "pipeline", "pipeline", workflow_id=ctx["WORKFLOW_ID"], jobs=int(ctx["SCHEDULER_JOBS"]), resumed=ctx.get("RESUME") == "1"
+        ):
+            run_phases(ctx)
+        succeeded = True
+    finally:
+        registry.register(registry_file, ctx["OUT_DIR"], ctx["WORKFLOW_ID"], ctx["STARTED_AT_UTC"], "" if succeeded else "failed")
+        with _INDEXES_LOCK:
+            _INDEXES.pop(ctx["OUT_DIR"], None)
+        flow_trace.deactivate(token)
+        tracer.write(ctx["OUT_DIR"])
+        Path(ctx.pop("RESOURCE_USAGE_LOG")).unlink(missing_ok=True)
+    return ctx
+
+
+def run_phases(ctx: Dict[str, str]) -> None:
+    artifacts = skill("artifacts")
+    pipeline_start = now_ms()
+    ctx["PIPELINE_START_MS"] = str(pipeline_start)
+    artifacts.write_flow_input(ctx)
+
+    ctx["STYLE_SCOPE_REQUIRED"] = "1" if (ctx["STYLE_TARGET"] or csv_items(ctx["SCOPE_FILES_CSV"])) else "0"
+    ctx["ICON_ENABLED"] = "0"
+    guards = open_step_guards(ctx)
+    if guards.resume:
+        report_resume_start(ctx)
+    build_run_index(ctx)
+    with flow_trace.span("phase1_2", "phase", phases=["phase1_requirements", "phase2_architecture"]):
+        spans = skill("scheduler").run_dag(phase12_steps(ctx, guards), int(ctx["SCHEDULER_JOBS"]), pipeline_start)
+    record_spans(ctx, pipeline_start, spans)
+    if guards.cache is not None:
+        ctx["STEP_CACHE_EVICTED"] = str(guards.cache.evict())
+    ctx["PHASE3_DURATION_MS"] = "0"
+    ctx["INITIAL_VERSION_NAME"] = initial_snapshot(ctx, guards, spans)
+
+    ctx["PHASE4_STATUS"] = "pending"
+    ctx["PHASE5_STATUS"] = "pending"
+    if ctx["AUTO_COMPLETE"] == "1":
+        phase4_start = now_ms()
+        with flow_trace.span("phase4_self_review", "phase"):
+            timed(ctx, "PHASE4_HOOK_BEFORE", lambda: step_hooks(ctx, "phase4_self_review", "before", "PLUGIN_PHASE4_HOOKS_PATH"))
+            timed(ctx, "PHASE4_SCRIPT", lambda: step_phase4_guarded(ctx, guards))
+        ctx["PHASE4_DURATION_MS"] = str(now_ms() - phase4_start)
+        timed(ctx, "GATE_VALIDATE_PRE", lambda: step_gates(ctx, "off"))
+        phase5_start = now_ms()
+        with flow_trace.span("phase5_acceptance", "phase"):
+            timed(ctx, "PHASE5_SCRIPT", lambda: step_phase5(ctx))
+            ctx["PHASE5_DURATION_MS"] = str(now_ms() - phase5_start)
+            timed(ctx, "PHASE5_HOOK_AFTER", lambda: step_hooks(ctx, "phase5_acceptance", "after", "PLUGIN_PHASE5_HOOKS_PATH"))
+    else:
+        artifacts.write_pending_phase_reports(ctx["PHASE4_REPORT_PATH"], ctx["PHASE5_REPORT_PATH"])
+        artifacts.write_pending_hook_reports([ctx["PLUGIN_PHASE4_HOOKS_PATH"], ctx["PLUGIN_PHASE5_HOOKS_PATH"]])
+
+    ctx["TOTAL_DURATION_MS"] = str(now_ms() - pipeline_start)
+    ctx["PIPELINE_PEAK_RSS_KB"] = str(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+    with flow_trace.span("finalize", "phase"):
+        artifacts.write_flow_metrics(ctx, ctx["FLOW_METRICS_PATH"], ctx["OUT_DIR"])
+
+        ctx["WORKSPACE_BASELINE"] = workspace_baseline(ctx["WORKSPACE_ROOT"])
+        artifacts.write_flow_outputs(ctx)
+        step_state_machine(ctx)
+
+        timed(ctx, "GATE_VALIDATE_POST", lambda: step_gates(ctx, "auto"))
+        final_label = "final" if (ctx["AUTO_COMPLETE"] == "1" and ctx["PHASE5_STATUS"] == "completed") else "after-feedback"
+        ctx["VERSION_NAME"] = step_snapshot(ctx, final_label, write_index=True)
+    out_dir = Path(ctx["OUT_DIR"])
+    if str(out_dir.parent) == f"{ctx['WORKSPACE_ROOT']}/Ruiagents":
+        link = out_dir.parent / "current"
+        if link.is_symlink():
+            link.unlink()
+        if not link.exists():
+            link.symlink_to(out_dir.name)
+
+
+def format_summary(ctx: Dict[str, str]) -> str:
+    lines = [
+        "fullflow complete",
+        f"workspace_root: {ctx['WORKSPACE_ROOT']}",
+        f"output: {ctx['OUT_DIR']}",
+        f"style_scope_lock: {ctx['STYLE_SCOPE_LOCK_PATH']}",
+    ]
+    if ctx["ICON_ENABLED"] == "1":
+        lines.append(f"icon_manifest: {ctx['ICON_MANIFEST_PATH']}")
+    lines += [
+        f"stage_status: {ctx['STAGE_STATUS_PATH']}",
+        f"phase4_report: {ctx['PHASE4_REPORT_PATH']}",
+        f"phase5_report: {ctx['PHASE5_REPORT_PATH']}",
+        f"quality_gates: {ctx['QUALITY_GATES_PATH']}",
+        f"gate_validation: {ctx['GATE_VALIDATION_PATH']}",
+        f"state_machine_validation: {ctx['STATE_MACHINE_VALIDATION_PATH']}",
+        f"flow_metrics: {ctx['FLOW_METRICS_PATH']}",
+        f"flow_trace: {ctx['OUT_DIR']}/flow.trace.json",
+        f"workspace_index: {ctx['WORKSPACE_INDEX_PATH']}",
+        f"style_scope_validation: {ctx['STYLE_SCOPE_VALIDATION_PATH']}",
+        f"icon_analysis: {ctx['ICON_ANALYSIS_PATH']}",
+        f"plugin_phase4_hooks: {ctx['PLUGIN_PHASE4_HOOKS_PATH']}",
+        f"plugin_phase5_hooks: {ctx['PLUGIN_PHASE5_HOOKS_PATH']}",
+        f"artifact_changelog: {ctx['OUT_DIR']}/CHANGELOG.md",
+        f"artifact_version_initial: {ctx['INITIAL_VERSION_NAME']}",
+        f"artifact_version: {ctx['VERSION_NAME']}",
+        f"flow_state: {ctx['FLOW_STATE_PATH']}",
+        f"scorecard: {ctx['SCORECARD_PATH']}",
+        f"optimization_plan: {ctx['OPTIMIZATION_PLAN_PATH']}",
+        f"decision_trace: {ctx['DECISION_TRACE_PATH']}",
+        f"report: {ctx['REPORT_PATH']}",
+    ]
+    return "\n".join(lines)
+
+
+def print_summary(ctx: Dict[str, str]) -> None:
+    print(format_summary(ctx))
+
+
+def main(argv: List[str] | None = None) -> int:
+    args = parse_args(argv)
+    if args.resume:
+        args = resume_args(args)
+    ctx = prepare_context(args)
+    if not args.resume:
+        save_resume_args(args, ctx)
+    run_pipeline(ctx)
+    print_summary(ctx)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
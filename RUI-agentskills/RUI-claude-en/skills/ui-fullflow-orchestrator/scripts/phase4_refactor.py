@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""Phase 4 self-review: scan workspace sources against refactor thresholds."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+# 共享工作区索引与 config_loader 同在 skill-structure-governor/scripts
+SHARED_SCRIPTS = str(Path(__file__).resolve().parents[2] / "skill-structure-governor" / "scripts")
+if SHARED_SCRIPTS not in sys.path:
+    sys.path.insert(0, SHARED_SCRIPTS)
+from analysis_cache import AnalysisCache  # noqa: E402
+from changed_files import add_arguments as add_changed_arguments, resolve_changed, scope_summary  # noqa: E402
+from workspace_index import WorkspaceIndex, load_or_build  # noqa: E402
+from workspace_metrics import ANALYZER, FileContext, analyze_files  # noqa: E402
+
+SOURCE_EXT = {".ts", ".tsx", ".js", ".jsx", ".css", ".scss", ".vue", ".svelte"}
+METRICS = ("file_lines", "render_logic_lines", "repeated_pattern_count", "props_drilling_depth")
+
+
+def collect_source_files(workspace_root: Path, index: Optional[WorkspaceIndex] = None) -> List[Path]:
+    index = index or WorkspaceIndex.build(workspace_root)
+    return [e.path for e in index.files(SOURCE_EXT)]
+
+
+def file_metrics(suffix: str, lines: List[str], rel: str = "") -> Dict[str, Any]:
+    """Threshold-independent per-file metrics from the shared single-pass analyzer."""
+    return ANALYZER.analyze(FileContext(rel, suffix.lower(), "\n".join(lines), lines))
+
+
+def findings_from_metrics(relative_file: str, metrics: Dict[str, Any], thresholds: Dict[str, int]) -> List[Dict[str, Any]]:
+    findings: List[Dict[str, Any]] = []
+    file_line_threshold = thresholds["file_lines"]
+    render_threshold = thresholds["render_logic_lines"]
+    duplicate_threshold = thresholds["repeated_pattern_count"]
+    props_depth_threshold = thresholds["props_drilling_depth"]
+
+    # 1) 单文件行数
+    line_count = metrics["file_lines"]
+    if line_count > file_line_threshold:
+        findings.append(
+            {
+                "file": relative_file,
+                "metric": "file_lines",
+                "actual": line_count,
+                "threshold": file_line_threshold,
+                "reason": f"文件行数超过阈值 {file_line_threshold}",
+            }
+        )
+    if "render_logic_lines" not in metrics:
+        return findings
+
+    # 2) 渲染逻辑行数
+    render_line_count = metrics["render_logic_lines"]
+    if render_line_count > render_threshold:
+        findings.append(
+            {
+                "file": relative_file,
+                "metric": "render_logic_lines",
+                "actual": render_line_count,
+                "threshold": render_threshold,
+                "reason": f"渲染逻辑行数超过阈值 {render_threshold}",
+            }
+        )
+
+    # 3) 相同模式重复次数
+    repeated_pattern, repeated_count = metrics["repeated_pattern"]
+    if repeated_count >= duplicate_threshold:
+        findings.append(
+            {
+                "file": relative_file,
+                "metric": "repeated_pattern_count",
+                "actual": repeated_count,
+                "threshold": duplicate_threshold,
+                "reason": f"检测到重复模式次数 >= {duplicate_threshold}",
+                "sample": (repeated_pattern[:117] + "...") if len(repeated_pattern) > 120 else repeated_pattern,
+            }
+        )
+
+    # 4) Props 穿透层级
+    prop_name, forward_depth = metrics["forwarded_prop"]
+    if forward_depth > props_depth_threshold:
+        findings.append(
+            {
+                "file": relative_file,
+                "metric": "props_drilling_depth",
+                "actual": forward_depth,
+                "threshold": props_depth_threshold,
+                "reason": f"疑似 props 穿透层级超过阈值 {props_depth_threshold}",
+                "prop": prop_name,
+            }
+        )
+    return findings
+
+
+def analyze_lines(relative_file: str, suffix: str, lines: List[str], thresholds: Dict[str, int]) -> List[Dict[str, Any]]:
+    return findings_from_metrics(relative_file, file_metrics(suffix, lines, relative_file), thresholds)
+
+
+def build_refactor_report(
+    workspace_root: Path,
+    file_line_threshold: int = 200,
+    render_threshold: int = 30,
+    duplicate_threshold: int = 3,
+    props_depth_threshold: int = 3,
+    index: Optional[WorkspaceIndex] = None,
+    cache: Optional[AnalysisCache] = None,
+    changed: Optional[Iterable[str]] = None,
+    changed_since: str = "",
+    workers: int = 1,
+) -> Dict[str, Any]:
+    """Scan every indexed source file, or only the changed set when `changed` is given.
+
+    workers > 1 analyses the files that are not served from the cache on a process pool (0 = one per CPU).
+    """
+    workspace_root = workspace_root.resolve()
+    if not workspace_root.exists():
+        raise SystemExit(f"workspace root 不存在: {workspace_root}")
+
+    thresholds = {
+        "file_lines": file_line_threshold,
+        "render_logic_lines": render_threshold,
+        "repeated_pattern_count": duplicate_threshold,
+        "props_drilling_depth": props_depth_threshold,
+    }
+    index = index or WorkspaceIndex.build(workspace_root)
+    files = index.files(SOURCE_EXT)
+    changed_set = None if changed is None else set(changed)
+    # 变更范围模式：只分析、只报告变更集中的源文件
+    scanned = files if changed_set is None else [e for e in files if e.rel in changed_set]
+
+    # 逐文件指标与阈值无关，与门禁校验共用同一单遍分析器及其缓存；findings 每次按当前阈值重建
+    parallel: Dict[str, Any] = {}
+    per_file = analyze_files(index, scanned, cache, workers or os.cpu_count() or 1, parallel)
+
+    findings: List[Dict[str, Any]] = []
+    metric_counts = {metric: 0 for metric in METRICS}
+    for entry in scanned:
+        metrics = per_file.get(entry.rel)
+        if metrics is None:
+            continue
+        for item in findings_from_metrics(entry.rel, metrics, thresholds):
+            findings.append(item)
+            metric_counts[item["metric"]] += 1
+
+    status = "completed_with_findings" if findings else "completed"
+
+    summary = {
+        "phase": "phase4_self_review",
+        "status": status,
+        "workspace_root": str(workspace_root),
+        "thresholds": thresholds,
+        "total_source_files": len(files),
+        "findings_count": len(findings),
+        "metric_counts": metric_counts,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+    if parallel:
+        summary["parallel"] = parallel
+    if changed_set is not None:
+        summary["changed_scope"] = scope_summary(sorted(changed_set), changed_since, len(scanned))
+
+    recommendations = []
+    if metric_counts["file_lines"] > 0:
+        recommendations.append("优先处理超长文件，按页面结构与组件职责拆分。")
+    if metric_counts["render_logic_lines"] > 0:
+        recommendations.append("将冗长渲染逻辑提取为子组件，降低主组件复杂度。")
+    if metric_counts["repeated_pattern_count"] > 0:
+        recommendations.append("提取重复 UI 模式为复用组件或渲染函数。")
+    if metric_counts["props_drilling_depth"] > 0:
+        recommendations.append("对疑似 props 穿透链路引入 Context/组合式状态收敛。")
+    if not recommendations:
+        recommendations.append("未命中重构阈值，可进入验收阶段。")
+
+    return {
+        "summary": summary,
+        "findings": findings,
+        "recommendations": recommendations,
+        "status": status,
+    }
+
+
+def render_markdown(report_obj: Dict[str, Any]) -> str:
+    summary = report_obj["summary"]
+    thresholds = summary["thresholds"]
+    metric_counts = summary["metric_counts"]
+    findings = report_obj["findings"]
+    md_lines = [
+        "# Phase 4 Refactor Report",
+        "",
+        f"- status: {report_obj['status']}",
+        f"- total_source_files: {summary['total_source_files']}",
+        f"- thresholds: file_lines={thresholds['file_lines']}, render_logic_lines={thresholds['render_logic_lines']}, repeated_pattern_count={thresholds['repeated_pattern_count']}, props_drilling_depth={thresholds['props_drilling_depth']}",
+        f"- findings_count: {len(findings)}",
+    ]
+    scope = summary.get("changed_scope")
+    if scope:
+        md_lines.append(f"- changed_scope: since={scope['since'] or '-'}, changed_files={scope['changed_count']}, analyzed_files={scope['analyzed_files']}")
+    parallel = summary.get("parallel")
+    if parallel:
+        md_lines.append(
+            f"- parallel: workers={parallel['workers']}, chunks={parallel['chunks']}, analyzed_files={parallel['analyzed_files']}, "
+            f"serial_ms={parallel['serial_ms']}, wall_ms={parallel['wall_ms']}, speedup={parallel['speedup']}x"
+        )
+    md_lines += [
+        "",
+        "## Metric Counts",
+        f"- file_lines: {metric_counts['file_lines']}",
+        f"- render_logic_lines: {metric_counts['render_logic_lines']}",
+        f"- repeated_pattern_count: {metric_counts['repeated_pattern_count']}",
+        f"- props_drilling_depth: {metric_counts['props_drilling_depth']}",
+        "",
+        "## Findings",
+    ]
+    if findings:
+        for idx, item in enumerate(findings, start=1):
+            extra = []
+            if item.get("prop"):
+                extra.append(f"prop={item['prop']}")
+            if item.get("sample"):
+                extra.append(f"sample={item['sample']}")
+            extra_text = f" [{'; '.join(extra)}]" if extra else ""
+            md_lines.append(
+                f"{idx}. {item['file']} - {item['metric']}: {item['reason']} (actual={item['actual']}, threshold={item['threshold']}){extra_text}"
+            )
+    else:
+        md_lines.append("- none")
+    md_lines.append("")
+    md_lines.append("## Recommendations")
+    for idx, rec in enumerate(report_obj["recommendations"], start=1):
+        md_lines.append(f"{idx}. {rec}")
+    md_lines.append("")
+    return "\n".join(md_lines)
+
+
+def write_refactor_report(report_obj: Dict[str, Any], report_json: Path, report_md: Path) -> None:
+    report_json.write_text(json.dumps(report_obj, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    report_md.write_text(render_markdown(report_obj), encoding="utf-8")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run phase4 refactor scan")
+    parser.add_argument("--workspace-root", required=True)
+    parser.add_argument("--refactor-threshold", type=int, default=200)
+    parser.add_argument("--render-threshold", type=int, default=30)
+    parser.add_argument("--duplicate-threshold", type=int, default=3)
+    parser.add_argument("--props-depth-threshold", type=int, default=3)
+    parser.add_argument("--report-json", required=True)
+    parser.add_argument("--report-md", required=True)
+    parser.add_argument("--index", default="", help="本次运行的 workspace.index.json（缺省时自行遍历工作区）")
+    parser.add_argument("--analysis-cache", default="", help="逐文件指标缓存 analysis.sqlite（缺省不缓存）")
+    add_changed_arguments(parser)
+    parser.add_argument("--workers", type=int, default=1, help="逐文件分析的进程数（1 为串行，0 为 CPU 核数）")
+    args = parser.parse_args()
+
+    workspace_root = Path(args.workspace_root)
+    changed = resolve_changed(workspace_root, args.changed_since, args.changed_files)
+    with AnalysisCache(Path(args.analysis_cache) if args.analysis_cache else None) as cache:
+        report_obj = build_refactor_report(
+            workspace_root,
+            args.refactor_threshold,
+            args.render_threshold,
+            args.duplicate_threshold,
+            args.props_depth_threshold,
+            load_or_build(args.index, workspace_root.resolve()),
+            cache,
+            changed,
+            args.changed_since,
+            args.workers,
+        )
+    write_refactor_report(report_obj, Path(args.report_json), Path(args.report_md))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""Per-step resource accounting (CPU user/sys, max RSS, read/write bytes) for the fullflow pipeline.
+
+Subprocess steps are measured exactly: the child is waited for with
+waitid(WNOWAIT) so /proc/<pid>/io can still be read, then wait4() reaps it and
+returns its rusage (which already includes any descendants it reaped).
+In-process steps (fullflow_driver) use RUSAGE_THREAD and /proc/thread-self/io
+deltas plus the usage of the subprocesses they start through run_measured();
+a step that had no other step in flight also picks up children reaped by
+other means from RUSAGE_CHILDREN and /proc/self/io.
+
+Every measured step appends one JSON line to a usage log
+(run_fullflow_pipeline.sh wraps each step command with `resource_usage.py run`);
+fullflow_artifacts aggregates the log into metrics.resource_usage. For
+`python3 <script.py>` commands the wrapper forks and runs the script with
+runpy instead of starting a second interpreter, so measuring a Python step
+costs one fork rather than one more interpreter start-up.
+
+  python3 resource_usage.py run --log usage.jsonl --step aesthetic_score -- python3 score_ui_brief.py ...
+  python3 resource_usage.py summary usage.jsonl
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import os
+import resource
+import runpy
+import signal
+import subprocess
+import sys
+import threading
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+USAGE_FIELDS = (
+    "cpu_user_ms",
+    "cpu_sys_ms",
+    "max_rss_kb",
+    "rss_growth_kb",
+    "read_bytes",
+    "write_bytes",
+    "disk_read_bytes",
+    "disk_write_bytes",
+)
+# 聚合时取最大值的字段，其余字段求和
+PEAK_FIELDS = {"max_rss_kb", "rss_growth_kb"}
+# /proc/<pid>/io：rchar/wchar 为 read()/write() 传递的字节数，read_bytes/write_bytes 为实际落到存储层的字节数
+PROC_IO_FIELDS = {
+    "rchar": "read_bytes",
+    "wchar": "write_bytes",
+    "read_bytes": "disk_read_bytes",
+    "write_bytes": "disk_write_bytes",
+}
+# ru_maxrss 在 macOS 上以字节计，Linux 上以 KB 计
+RSS_DIVISOR = 1024 if sys.platform == "darwin" else 1
+RUSAGE_THREAD = getattr(resource, "RUSAGE_THREAD", resource.RUSAGE_SELF)
+
+
+def empty_usage() -> Dict[str, int]:
+    return {k: 0 for k in USAGE_FIELDS}
+
+
+def merge_usage(total: Dict[str, int], sample: Mapping[str, Any]) -> Dict[str, int]:
+    for k in USAGE_FIELDS:
+        value = int(sample.get(k, 0) or 0)
+        total[k] = max(total[k], value) if k in PEAK_FIELDS else total[k] + value
+    return total
+
+
+def read_proc_io(pid: int | str = "self") -> Dict[str, int]:
+    """I/O counters of /proc/<pid>/io ("thread-self" for the calling thread); {} where unavailable."""
+    try:
+        text = Path(f"/proc/{pid}/io").read_text(encoding="ascii")
+    except OSError:
+        return {}
+    counters: Dict[str, int] = {}
+    for line in text.splitlines():
+        key, _, value = line.partition(":")
+        if key in PROC_IO_FIELDS:
+            counters[PROC_IO_FIELDS[key]] = int(value)
+    return counters
+
+
+def rusage_sample(ru: Any) -> Dict[str, int]:
+    return {
+        "cpu_user_ms": round(ru.ru_utime * 1000),
+        "cpu_sys_ms": round(ru.ru_stime * 1000),
+        "max_rss_kb": ru.ru_maxrss // RSS_DIVISOR,
+    }
+
+
+def wait_measured(pid: int, exited: Optional[threading.Event] = None) -> Tuple[int, Dict[str, int]]:
+    """Reap pid and return (exit code, usage of the child and the descendants it reaped)."""
+    io: Dict[str, int] = {}
+    try:
+        # 先等待但不回收，子进程仍是僵尸时 /proc/<pid>/io 可读
+        os.waitid(os.P_PID, pid, os.WEXITED | os.WNOWAIT)
+        if exited is not None:
+            exited.set()
+        io = read_proc_io(pid)
+    except (AttributeError, OSError):
+        pass
+    _, status, ru = os.wait4(pid, 0)
+    if exited is not None:
+        exited.set()
+    return os.waitstatus_to_exitcode(status), {**empty_usage(), **rusage_sample(ru), **io}
+
+
+def append_record(log_path: str | Path, record: Mapping[str, Any]) -> None:
+    """Append one JSON line; a single O_APPEND write keeps concurrent writers from interleaving."""
+    line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+    fd = os.open(str(log_path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+def read_log(log_path: str | Path) -> List[Dict[str, Any]]:
+    try:
+        lines = Path(log_path).read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return []
+    records = []
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(record, dict) and record.get("step"):
+            records.append(record)
+    return records
+
+
+def aggregate(records: Iterable[Mapping[str, Any]], group_of: Mapping[str, str] | None = None) -> Dict[str, Dict[str, int]]:
+    """Sum CPU/IO and take the max RSS per step, or per group_of[step] when a mapping is given."""
+    groups: Dict[str, Dict[str, int]] = {}
+    for record in records:
+        step = str(record["step"])
+        key = group_of.get(step, "other") if group_of is not None else step
+        total = groups.setdefault(key, {**empty_usage(), "runs": 0})
+        merge_usage(total, record)
+        total["runs"] += 1
+    return groups
+
+
+class _Frame:
+    def __init__(self, step: str):
+        self.step = step
+        self.children = empty_usage()
+        self.subprocesses = 0
+        self.overlapped = False
+
+    def add_child(self, usage: Mapping[str, Any]) -> None:
+        merge_usage(self.children, usage)
+        self.subprocesses += 1
+
+
+_ACTIVE: ContextVar[Optional[_Frame]] = ContextVar("rui_usage_frame", default=None)
+# 进程内同时在测量的步骤；只有独占期间的 RUSAGE_CHILDREN / /proc/self/io 增量才能归到某个步骤
+_INFLIGHT: List[_Frame] = []
+_INFLIGHT_LOCK = threading.Lock()
+
+
+def _snapshot() -> Dict[str, Any]:
+    return {
+        "thread": resource.getrusage(RUSAGE_THREAD),
+        "thread_io": read_proc_io("thread-self"),
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN),
+        "self_io": read_proc_io("self"),
+        "self_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // RSS_DIVISOR,
+    }
+
+
+def _delta(end: Mapping[str, int], start: Mapping[str, int]) -> Dict[str, int]:
+    return {k: max(end[k] - start.get(k, 0), 0) for k in end}
+
+
+def _cpu(ru: Any) -> Dict[str, int]:
+    sample = rusage_sample(ru)
+    return {"cpu_user_ms": sample["cpu_user_ms"], "cpu_sys_ms": sample["cpu_sys_ms"]}
+
+
+@contextlib.contextmanager
+def measure(log_path: str, step: str) -> Iterator[Dict[str, Any]]:
+    """Charge the calling thread's usage, plus subprocesses started via run_measured(), to step.
+
+    The yielded dict is filled with the step's record on exit; it is also
+    appended to log_path when one is given.
+    """
+    frame = _Frame(step)
+    with _INFLIGHT_LOCK:
+        for other in _INFLIGHT:
+            other.overlapped = True
+        frame.overlapped = bool(_INFLIGHT)
+        _INFLIGHT.append(frame)
+    token = _ACTIVE.set(frame)
+    record: Dict[str, Any] = {}
+    start = _snapshot()
+    try:
+        yield record
+    finally:
+        _ACTIVE.reset(token)
+        with _INFLIGHT_LOCK:
+            _INFLIGHT.remove(frame)
+        end = _snapshot()
+        own = _delta({**_cpu(end["thread"]), **end["thread_io"]}, {**_cpu(start["thread"]), **start["thread_io"]})
+        children = dict(frame.children)
+        if not frame.overlapped:
+            # 独占期间回收的子进程（含 run_measured 之外启动的）都计入 RUSAGE_CHILDREN 与 /proc/self/io
+            reaped = _delta(_cpu(end["children"]), _cpu(start["children"]))
+            reaped.update(_delta(_delta(end["self_io"], start["self_io"]), _delta(end["thread_io"], start["thread_io"])))
+            for k, v in reaped.items():
+                children[k] = max(children[k], v)
+            if end["children"].ru_maxrss > start["children"].ru_maxrss:
+                children["max_rss_kb"] = max(children["max_rss_kb"], end["children"].ru_maxrss // RSS_DIVISOR)
+        usage = merge_usage(merge_usage(empty_usage(), own), children)
+        usage["max_rss_kb"] = max(end["self_rss_kb"], children["max_rss_kb"])
+        usage["rss_growth_kb"] = end["self_rss_kb"] - start["self_rss_kb"]
+        record.update({"step": step, "in_process": True, "subprocesses": frame.subprocesses, **usage})
+        if log_path:
+            append_record(log_path, record)
+
+
+def run_measured(
+    cmd: Sequence[str], timeout: float | None = None, sink: Any = None, **kwargs: Any
+) -> Tuple[subprocess.CompletedProcess, Dict[str, int]]:
+    """subprocess.run(cmd, capture_output=True, ...) that also returns the child's usage.
+
+    The usage is charged to the enclosing measure() frame. Raises
+    subprocess.TimeoutExpired like subprocess.run when timeout elapses.
+    With an output_stream.OutputSink, the (binary) pipes are streamed into
+    its log files and the result carries only the sink's bounded tails.
+    """
+    proc = subprocess.Popen(list(cmd), stdout=subprocess.PIPE, stderr=subprocess.PIPE, **kwargs)
+    output: Dict[str, Any] = {}
+    if sink is not None:
+        sink.event("started", pid=proc.pid, cmd=list(cmd))
+
+    def drain(name: str, stream: Any) -> None:
+        if sink is not None:
+            sink.pump(name, stream)
+            output[name] = sink.tail(name)
+        else:
+            output[name] = stream.read()
+
+    readers = [threading.Thread(target=drain, args=(name, stream), daemon=True) for name, stream in (("stdout", proc.stdout), ("stderr", proc.stderr))]
+    for reader in readers:
+        reader.start()
+    exited = threading.Event()
+    timed_out = threading.Event()
+
+    def kill() -> None:
+        # 只在子进程未退出时发信号；退出后 pid 可能被复用
+        if not exited.is_set():
+            timed_out.set()
+            with contextlib.suppress(OSError):
+                # 独立会话启动的子进程连同其子孙一起结束，孙进程不会继续占着管道
+                if kwargs.get("start_new_session"):
+                    os.killpg(proc.pid, signal.SIGKILL)
+                else:
+                    os.kill(proc.pid, signal.SIGKILL)
+
+    timer = threading.Timer(timeout, kill) if timeout else None
+    if timer is not None:
+        timer.daemon = True
+        timer.start()
+    try:
+        code, usage = wait_measured(proc.pid, exited)
+    finally:
+        if timer is not None:
+            timer.cancel()
+    proc.returncode = code
+    for reader in readers:
+        reader.join()
+    proc.stdout.close()
+    proc.stderr.close()
+    frame = _ACTIVE.get()
+    if frame is not None:
+        frame.add_child(usage)
+    if sink is not None:
+        sink.event("timeout" if timed_out.is_set() else "finished", exit_code=code, **sink.counters())
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(proc.args, timeout, output.get("stdout"), output.get("stderr"))
+    return subprocess.CompletedProcess(proc.args, code, output.get("stdout"), output.get("stderr")), usage
+
+
+def python_script(cmd: List[str]) -> str:
+    """The script path when cmd is `python3 <script.py> ...` (no interpreter flags), else ""."""
+    if len(cmd) < 2 or os.path.basename(cmd[0]) not in {"python", "python3", os.path.basename(sys.executable)}:
+        return ""
+    return cmd[1] if cmd[1].endswith(".py") and os.path.isfile(cmd[1]) else ""
+
+
+def fork_script(script: str, argv: List[str]) -> int:
+    """Fork a child that runs script as __main__ in this interpreter; return its pid."""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid:
+        return pid
+    code = 0
+    try:
+        sys.argv = [script, *argv]
+        sys.path[0] = os.path.dirname(os.path.abspath(script))
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit as exc:
+        if exc.code is None:
+            code = 0
+        elif isinstance(exc.code, int):
+            code = exc.code
+        else:
+            print(exc.code, file=sys.stderr)
+            code = 1
+    except BaseException:
+        import traceback
+
+        traceback.print_exc()
+        code = 1
+    finally:
+        with contextlib.suppress(Exception):
+            sys.stdout.flush()
+            sys.stderr.flush()
+        os._exit(code)
+
+
+def run_command(log_path: str, step: str, cmd: List[str]) -> int:
+    """Run cmd with inherited stdio, log its usage under step, and return its exit code."""
+    script = python_script(cmd)
+    try:
+        pid = fork_script(script, cmd[2:]) if script else os.posix_spawnp(cmd[0], cmd, os.environ)
+    except OSError as exc:
+        print(f"Error: 无法启动 {cmd[0]}: {exc}", file=sys.stderr)
+        return 127
+    # 终端中断交给子进程处理，等待其退出后照常记录
+    previous = signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        code, usage = wait_measured(pid)
+    finally:
+        signal.signal(signal.SIGINT, previous)
+    if log_path:
+        append_record(log_path, {"step": step, "in_process": False, "subprocesses": 1, "exit_code": code, **usage})
+    return code
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure fullflow step resource usage")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("run", help="运行命令并把其资源使用追加到日志")
+    p.add_argument("--log", default="", help="JSONL 日志路径（为空则只运行不记录）")
+    p.add_argument("--step", required=True)
+    p.add_argument("cmd", nargs=argparse.REMAINDER)
+    p = sub.add_parser("summary", help="按步骤汇总日志")
+    p.add_argument("log")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        cmd = args.cmd[1:] if args.cmd[:1] == ["--"] else args.cmd
+        if not cmd:
+            parser.error("run 需要 -- <command>")
+        return run_command(args.log, args.step, cmd)
+    print(json.dumps(aggregate(read_log(args.log)), ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""Content-addressed cache and per-run resume journal for fullflow pipeline steps.
+
+Entries live under <cache-dir>/steps/<key[:2]>/<key>/ with an entry.json
+(step name, ctx values, file list, size) and a files/ tree relative to the
+out-dir. Text outputs are stored with the out-dir path replaced by a
+placeholder so an entry can be restored into any later run. The entry.json
+mtime is bumped on every hit; eviction drops least-recently-used entries until
+the total size fits the configured budget.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+OUT_DIR_PLACEHOLDER = "@@RUI_OUT_DIR@@"
+ENTRY_FILE = "entry.json"
+
+# str(path) -> (stamp, digest)；stamp 变化（文件增删、mtime 或大小变化）时重新计算
+_SOURCE_DIGESTS: Dict[str, Tuple[Tuple[Tuple[str, int, int], ...], str]] = {}
+_SOURCE_DIGESTS_LOCK = threading.Lock()
+
+
+def sha256_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def source_files(path: Path) -> List[Tuple[str, Path]]:
+    if path.is_dir():
+        return [(str(f.relative_to(path)), f) for f in sorted(p for p in path.rglob("*") if p.is_file())]
+    return [(path.name, path)]
+
+
+def files_stamp(files: List[Tuple[str, Path]]) -> Tuple[Tuple[str, int, int], ...]:
+    stamp = []
+    for rel, f in files:
+        try:
+            st = f.stat()
+            stamp.append((rel, st.st_mtime_ns, st.st_size))
+        except OSError:
+            stamp.append((rel, -1, -1))
+    return tuple(stamp)
+
+
+def digest_sources(paths: Iterable[Path]) -> str:
+    """Hash script/data sources (files, or directory trees) that define a step's behaviour.
+
+    Per-path digests are memoized against the (name, mtime_ns, size) of every file under
+    the path, so a long-lived process (daemon, batch worker) re-hashes a source after it is
+    edited and only re-stats it otherwise.
+    """
+    h = hashlib.sha256()
+    for path in paths:
+        cache_key = str(path)
+        files = source_files(path)
+        stamp = files_stamp(files)
+        with _SOURCE_DIGESTS_LOCK:
+            cached = _SOURCE_DIGESTS.get(cache_key)
+        if cached is not None and cached[0] == stamp:
+            digest = cached[1]
+        else:
+            sub = hashlib.sha256()
+            for rel, f in files:
+                sub.update(rel.encode("utf-8"))
+                try:
+                    sub.update(f.read_bytes())
+                except OSError:
+                    sub.update(b"<missing>")
+            digest = sub.hexdigest()
+            with _SOURCE_DIGESTS_LOCK:
+                _SOURCE_DIGESTS[cache_key] = (stamp, digest)
+        h.update(digest.encode("ascii"))
+    return h.hexdigest()
+
+
+def out_dir_variants(out_dir: Path) -> List[str]:
+    variants = {str(out_dir), str(out_dir.resolve())}
+    return sorted(variants, key=len, reverse=True)
+
+
+def mask_out_dir(text: str, out_dir: Path) -> str:
+    for variant in out_dir_variants(out_dir):
+        text = text.replace(variant, OUT_DIR_PLACEHOLDER)
+    return text
+
+
+def digest_file(path: Path, out_dir: Path) -> str:
+    """Content hash of an upstream artifact, independent of which out-dir it was written to."""
+    if not path.exists():
+        return "<missing>"
+    raw = path.read_bytes()
+    try:
+        return sha256_text(mask_out_dir(raw.decode("utf-8"), out_dir))
+    except UnicodeDecodeError:
+        return hashlib.sha256(raw).hexdigest()
+
+
+class StepCache:
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = root
+        self.steps_root = root / "steps"
+        self.max_bytes = max_bytes
+
+    def entry_dir(self, key: str) -> Path:
+        return self.steps_root / key[:2] / key
+
+    @staticmethod
+    def make_key(payload: Mapping[str, Any]) -> str:
+        return sha256_text(json.dumps(payload, ensure_ascii=False, sort_keys=True))
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        entry_path = self.entry_dir(key) / ENTRY_FILE
+        try:
+            entry = json.loads(entry_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(entry_path, None)
+        except OSError:
+            pass
+        return entry
+
+    def restore(self, key: str, entry: Mapping[str, Any], out_dir: Path) -> Dict[str, str]:
+        """Copy cached files into out_dir and return the cached ctx values (out-dir placeholders expanded)."""
+        files_root = self.entry_dir(key) / "files"
+        for rel in entry.get("files", []):
+            src = files_root / rel
+            dst = out_dir / rel
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            raw = src.read_bytes()
+            if rel in entry.get("text_files", []):
+                dst.write_text(raw.decode("utf-8").replace(OUT_DIR_PLACEHOLDER, str(out_dir)), encoding="utf-8")
+            else:
+                dst.write_bytes(raw)
+        return {k: str(v).replace(OUT_DIR_PLACEHOLDER, str(out_dir)) for k, v in entry.get("values", {}).items()}
+
+    def store(self, key: str, step: str, out_dir: Path, paths: Iterable[Path], values: Mapping[str, str]) -> None:
+        """Atomically publish an entry; a concurrent writer of the same key wins without error."""
+        final_dir = self.entry_dir(key)
+        if final_dir.exists():
+            return
+        final_dir.parent.mkdir(parents=True, exist_ok=True)
+        tmp_dir = Path(tempfile.mkdtemp(prefix=f".{key[:12]}-", dir=final_dir.parent))
+        files: List[str] = []
+        text_files: List[str] = []
+        size = 0
+        try:
+            for path in paths:
+                members = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+                for member in members:
+                    if not member.is_file():
+                        continue
+                    rel = str(member.resolve().relative_to(out_dir.resolve()))
+                    dst = tmp_dir / "files" / rel
+                    dst.parent.mkdir(parents=True, exist_ok=True)
+                    raw = member.read_bytes()
+                    try:
+                        dst.write_text(mask_out_dir(raw.decode("utf-8"), out_dir), encoding="utf-8")
+                        text_files.append(rel)
+                    except UnicodeDecodeError:
+                        dst.write_bytes(raw)
+                    files.append(rel)
+                    size += dst.stat().st_size
+            entry = {
+                "step": step,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "size_bytes": size,
+                "files": files,
+                "text_files": text_files,
+                "values": {k: mask_out_dir(str(v), out_dir) for k, v in values.items()},
+            }
+            (tmp_dir / ENTRY_FILE).write_text(json.dumps(entry, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+            os.rename(tmp_dir, final_dir)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        items = []
+        if not self.steps_root.exists():
+            return items
+        for entry_path in self.steps_root.glob(f"*/*/{ENTRY_FILE}"):
+            try:
+                entry = json.loads(entry_path.read_text(encoding="utf-8"))
+                last_used = entry_path.stat().st_mtime
+            except (OSError, ValueError):
+                continue
+            items.append(
+                {
+                    "key": entry_path.parent.name,
+                    "step": entry.get("step", ""),
+                    "size_bytes": int(entry.get("size_bytes", 0)),
+                    "last_used": last_used,
+                }
+            )
+        return items
+
+    def evict(self) -> int:
+        """Drop least-recently-used entries until the cache fits max_bytes; return the number removed."""
+        items = sorted(self.entries(), key=lambda x: x["last_used"])
+        total = sum(x["size_bytes"] for x in items)
+        removed = 0
+        for item in items:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(self.entry_dir(item["key"]), ignore_errors=True)
+            total -= item["size_bytes"]
+            removed += 1
+        return removed
+
+
+def digest_bytes(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+class StepJournal:
+    """Completed steps of one out-dir (key, output digests, ctx values), consulted by --resume.
+
+    The journal is rewritten atomically after every recorded step, so an
+    interrupted run keeps everything that finished before the interruption.
+    """
+
+    def __init__(self, path: Path, reset: bool = False):
+        self.path = path
+        self.lock = threading.Lock()
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        if not reset:
+            try:
+                raw = json.loads(path.read_text(encoding="utf-8"))
+                self.steps = dict(raw.get("steps") or {})
+            except (OSError, ValueError):
+                self.steps = {}
+        else:
+            self.flush()
+
+    def flush(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps({"steps": self.steps}, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def reusable(self, name: str, key: str) -> Optional[Dict[str, str]]:
+        """Return the recorded ctx values if the step ran with this key and its outputs are untouched."""
+        entry = self.steps.get(name)
+        if not entry or entry.get("key") != key:
+            return None
+        for file_path, digest in (entry.get("files") or {}).items():
+            path = Path(file_path)
+            if not path.is_file() or digest_bytes(path) != digest:
+                return None
+        return dict(entry.get("values") or {})
+
+    def record(self, name: str, key: str, paths: Iterable[Path], values: Mapping[str, str]) -> None:
+        files: Dict[str, str] = {}
+        for path in paths:
+            members = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+            for member in members:
+                if member.is_file():
+                    files[str(member)] = digest_bytes(member)
+        with self.lock:
+            self.steps[name] = {
+                "key": key,
+                "completed_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "files": files,
+                "values": dict(values),
+            }
+            self.flush()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Inspect or prune the fullflow step cache")
+    parser.add_argument("--cache-dir", required=True)
+    parser.add_argument("--max-size-mb", type=float, default=256)
+    parser.add_argument("action", choices=["stats", "evict", "clear"])
+    args = parser.parse_args()
+
+    cache = StepCache(Path(args.cache_dir), int(args.max_size_mb * 1024 * 1024))
+    if args.action == "clear":
+        shutil.rmtree(cache.steps_root, ignore_errors=True)
+        print(json.dumps({"cleared": str(cache.steps_root)}, ensure_ascii=False))
+        return
+    removed = cache.evict() if args.action == "evict" else 0
+    items = cache.entries()
+    per_step: Dict[str, int] = {}
+    for item in items:
+        per_step[item["step"]] = per_step.get(item["step"], 0) + 1
+    print(
+        json.dumps(
+            {
+                "cache_dir": str(cache.root),
+                "entries": len(items),
+                "size_bytes": sum(x["size_bytes"] for x in items),
+                "max_bytes": cache.max_bytes,
+                "evicted": removed,
+                "per_step": per_step,
+            },
+            ensure_ascii=False,
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -5,9 +5,20 @@ import argparse
 import json
 import re
 import subprocess
+import sys
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterable, List, Optional
+
+# 共享工作区索引与 config_loader 同在 skill-structure-governor/scripts
+SHARED_SCRIPTS = str(Path(__file__).resolve().parents[2] / "skill-structure-governor" / "scripts")
+if SHARED_SCRIPTS not in sys.path:
+    sys.path.insert(0, SHARED_SCRIPTS)
+from analysis_cache import AnalysisCache  # noqa: E402
+from changed_files import add_arguments as add_changed_arguments, resolve_changed, scope_summary  # noqa: E402
+import tool_checks as toolchain  # noqa: E402
+from workspace_index import FileEntry, WorkspaceIndex, load_or_build  # noqa: E402
+from workspace_metrics import COMPONENT_EXT, LOGIC_EXT, analyze_files  # noqa: E402
 
 
 def load(path: Path, default: Dict[str, Any] | List[Any] | None = None):
@@ -72,104 +83,33 @@ def gate_row(name: str, threshold: str, actual: Any, passed: bool, evidence: str
     }
 
 
-def detect_runner(workspace_root: Path) -> List[str]:
-    if (workspace_root / "pnpm-lock.yaml").exists():
-        return ["pnpm"]
-    if (workspace_root / "yarn.lock").exists():
-        return ["yarn"]
-    return ["npm"]
+def collect_source_files(workspace_root: Path, exts: set[str], index: Optional[WorkspaceIndex] = None) -> List[Path]:
+    index = index or WorkspaceIndex.build(workspace_root)
+    return [e.path for e in index.files(exts)]
 
 
-def run_tool_checks(workspace_root: Path) -> Tuple[List[Dict[str, Any]], Dict[str, bool]]:
-    checks: List[Dict[str, Any]] = []
-    gate_flags = {
-        "lint_gate": True,
-        "typecheck_gate": True,
-        "test_gate": True,
-        "a11y_gate": True,
-        "performance_gate": True,
-    }
-    package_json = workspace_root / "package.json"
-    if not package_json.exists():
-        checks.append({"name": "toolchain", "status": "skipped", "reason": "package.json_not_found"})
-        return checks, gate_flags
+def is_ts_source(entry: FileEntry) -> bool:
+    return entry.suffix in {".ts", ".tsx"} and not entry.rel.endswith(".d.ts")
 
-    try:
-        pkg = json.loads(package_json.read_text(encoding="utf-8"))
-    except Exception:
-        checks.append({"name": "toolchain", "status": "skipped", "reason": "package_json_invalid"})
-        return checks, gate_flags
-
-    scripts = (pkg or {}).get("scripts") or {}
-    runner = detect_runner(workspace_root)
-    matrix = [
-        ("lint", "lint", "lint_gate"),
-        ("typecheck", "typecheck", "typecheck_gate"),
-        ("test", "test", "test_gate"),
-        ("a11y", "a11y", "a11y_gate"),
-        ("lighthouse", "lighthouse", "performance_gate"),
-    ]
-    for name, script_key, gate_key in matrix:
-        if script_key not in scripts:
-            checks.append({"name": name, "script": script_key, "status": "skipped", "reason": "script_not_found"})
-            continue
-        cmd = [*runner, "run", script_key]
-        try:
-            proc = subprocess.run(cmd, cwd=workspace_root, capture_output=True, text=True, timeout=300)
-            passed = proc.returncode == 0
-            checks.append({
-                "name": name,
-                "script": script_key,
-                "status": "passed" if passed else "failed",
-                "exit_code": proc.returncode,
-                "stdout_tail": (proc.stdout or "")[-500:],
-                "stderr_tail": (proc.stderr or "")[-500:],
-            })
-            if not passed:
-                gate_flags[gate_key] = False
-        except Exception as exc:
-            checks.append({"name": name, "script": script_key, "status": "failed", "error": str(exc)})
-            gate_flags[gate_key] = False
-    return checks, gate_flags
-
-
-def collect_source_files(workspace_root: Path, exts: set[str]) -> List[Path]:
-    skip_dirs = {".git", "node_modules", "dist", "build", ".next", "coverage", "Ruiagents"}
-    out: List[Path] = []
-    if not workspace_root.exists():
-        return out
-    for p in workspace_root.rglob("*"):
-        if not p.is_file():
-            continue
-        if any(part in skip_dirs for part in p.parts):
-            continue
-        if p.suffix.lower() in exts:
-            out.append(p)
-    return out
+
+def collect_gate_metrics(index: WorkspaceIndex, cache: Optional[AnalysisCache] = None) -> Dict[str, Dict[str, Any]]:
+    """rel -> per-file metrics (workspace_metrics) for every component/logic source, shared with Phase 4."""
+    return analyze_files(index, index.files(COMPONENT_EXT | LOGIC_EXT), cache)
 
 
-def measure_component_reuse(workspace_root: Path) -> Dict[str, Any]:
-    files = collect_source_files(workspace_root, {".tsx", ".jsx", ".vue", ".svelte"})
+def measure_component_reuse(
+    workspace_root: Path, index: Optional[WorkspaceIndex] = None, per_file: Optional[Dict[str, Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    index = index or WorkspaceIndex.build(workspace_root)
+    files = index.files(COMPONENT_EXT)
     if not files:
         return {"available": False, "reuse_rate": None, "evidence": "no_component_source_files", "summary": {}}
 
-    html_tags = {
-        "div", "span", "p", "a", "ul", "ol", "li", "button", "input", "textarea", "label", "select", "option",
-        "form", "section", "header", "footer", "main", "aside", "nav", "article", "img", "svg", "path", "g", "canvas",
-        "table", "thead", "tbody", "tr", "td", "th", "h1", "h2", "h3", "h4", "h5", "h6",
-    }
+    per_file = collect_gate_metrics(index) if per_file is None else per_file
     tag_counter: Dict[str, int] = {}
-    pattern = re.compile(r"<([A-Za-z][A-Za-z0-9_-]*)\\b")
-
-    for file_path in files:
-        content = file_path.read_text(encoding="utf-8", errors="ignore")
-        for match in pattern.findall(content):
-            tag = match.strip()
-            lower = tag.lower()
-            is_custom = tag[:1].isupper() or ("-" in tag and lower not in html_tags)
-            if not is_custom:
-                continue
-            tag_counter[tag] = tag_counter.get(tag, 0) + 1
+    for entry in files:
+        for tag, count in ((per_file.get(entry.rel) or {}).get("component_tags") or {}).items():
+            tag_counter[tag] = tag_counter.get(tag, 0) + count
 
     total_usage = sum(tag_counter.values())
     if total_usage == 0:
@@ -197,32 +137,29 @@ def measure_component_reuse(workspace_root: Path) -> Dict[str, Any]:
     }
 
 
-def measure_cyclomatic_complexity(workspace_root: Path) -> Dict[str, Any]:
-    files = collect_source_files(workspace_root, {".ts", ".tsx", ".js", ".jsx", ".vue", ".svelte"})
+def measure_cyclomatic_complexity(
+    workspace_root: Path,
+    index: Optional[WorkspaceIndex] = None,
+    per_file: Optional[Dict[str, Dict[str, Any]]] = None,
+    changed: Optional[Iterable[str]] = None,
+) -> Dict[str, Any]:
+    """Max keyword-based complexity over logic files (only the changed ones when `changed` is given)."""
+    index = index or WorkspaceIndex.build(workspace_root)
+    files = index.files(LOGIC_EXT)
+    if changed is not None:
+        changed_set = set(changed)
+        files = [e for e in files if e.rel in changed_set]
     if not files:
         return {"available": False, "max_complexity": None, "evidence": "no_logic_source_files", "summary": {}}
 
-    keyword_patterns = [
-        re.compile(r"\\bif\\b"),
-        re.compile(r"\\bfor\\b"),
-        re.compile(r"\\bwhile\\b"),
-        re.compile(r"\\bcase\\b"),
-        re.compile(r"\\bcatch\\b"),
-        re.compile(r"&&"),
-        re.compile(r"\\|\\|"),
-        re.compile(r"\\?.*:"),
-    ]
-
+    per_file = collect_gate_metrics(index) if per_file is None else per_file
     max_complexity = 1
     max_file = ""
-    for file_path in files:
-        content = file_path.read_text(encoding="utf-8", errors="ignore")
-        complexity = 1
-        for pattern in keyword_patterns:
-            complexity += len(pattern.findall(content))
+    for entry in files:
+        complexity = (per_file.get(entry.rel) or {}).get("complexity", 1)
         if complexity > max_complexity:
             max_complexity = complexity
-            max_file = str(file_path.relative_to(workspace_root))
+            max_file = entry.rel
 
     return {
         "available": True,
@@ -245,16 +182,16 @@ def parse_percent(text: str) -> float | None:
         return None
 
 
-def measure_ts_coverage(workspace_root: Path) -> Dict[str, Any]:
-    ts_files = [
-        p for p in collect_source_files(workspace_root, {".ts", ".tsx"})
-        if not p.name.endswith(".d.ts")
-    ]
+def measure_ts_coverage(
+    workspace_root: Path, index: Optional[WorkspaceIndex] = None, per_file: Optional[Dict[str, Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    index = index or WorkspaceIndex.build(workspace_root)
+    ts_files = [e for e in index.files({".ts", ".tsx"}) if is_ts_source(e)]
     if not ts_files:
         return {"available": False, "coverage": None, "evidence": "no_ts_files", "summary": {}}
 
     package_json = workspace_root / "package.json"
-    runner = detect_runner(workspace_root)
+    runner = toolchain.detect_runner(workspace_root)
     if package_json.exists():
         try:
             pkg = json.loads(package_json.read_text(encoding="utf-8"))
@@ -274,25 +211,13 @@ def measure_ts_coverage(workspace_root: Path) -> Dict[str, Any]:
             pass
 
     # Fallback: static explicit-type ratio from source text.
-    var_decl = re.compile(r"\\b(?:const|let|var)\\s+[A-Za-z_$][\\w$]*")
-    typed_var_decl = re.compile(r"\\b(?:const|let|var)\\s+[A-Za-z_$][\\w$]*\\s*:\\s*[^=;]+")
-    fn_params = re.compile(r"(?:function\\s+[A-Za-z_$][\\w$]*|function|=>)\\s*\\(([^)]*)\\)")
+    per_file = collect_gate_metrics(index) if per_file is None else per_file
     total_points = 0
     typed_points = 0
-
-    for file_path in ts_files:
-        content = file_path.read_text(encoding="utf-8", errors="ignore")
-        vars_total = len(var_decl.findall(content))
-        vars_typed = len(typed_var_decl.findall(content))
-        total_points += vars_total
-        typed_points += vars_typed
-
-        for raw in fn_params.findall(content):
-            params = [p.strip() for p in raw.split(",") if p.strip() and p.strip() not in {"...args", "args"}]
-            if not params:
-                continue
-            total_points += len(params)
-            typed_points += len([p for p in params if ":" in p])
+    for entry in ts_files:
+        typed, total = (per_file.get(entry.rel) or {}).get("type_points") or [0, 0]
+        typed_points += typed
+        total_points += total
 
     if total_points == 0:
         return {
@@ -321,20 +246,19 @@ def bool_or_true_if_none(v: float | int | None, fn) -> bool:
     return bool(fn(v))
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description="Validate quality gates")
-    parser.add_argument("--out-dir", required=True)
-    parser.add_argument("--workspace-root", default="")
-    parser.add_argument("--repo-root", default="")
-    parser.add_argument("--report", required=True)
-    parser.add_argument("--tool-checks", choices=["auto", "on", "off"], default="auto")
-    args = parser.parse_args()
-
-    out_dir = Path(args.out_dir)
-    workspace_root = Path(args.workspace_root).resolve() if args.workspace_root else Path(".").resolve()
-    repo_root = Path(args.repo_root).resolve() if args.repo_root else Path(__file__).resolve().parents[3]
-    report = Path(args.report)
-
+def build_gate_report(
+    out_dir: Path,
+    workspace_root: Path,
+    repo_root: Path,
+    tool_checks_mode: str = "auto",
+    index: Optional[WorkspaceIndex] = None,
+    cache: Optional[AnalysisCache] = None,
+    changed: Optional[List[str]] = None,
+    changed_since: str = "",
+    tool_parallelism: int = toolchain.DEFAULT_PARALLELISM,
+    tool_timeout: int = toolchain.DEFAULT_TIMEOUT_S,
+    tool_cache: Optional[toolchain.ToolCheckCache] = None,
+) -> Dict[str, Any]:
     scorecard = load(out_dir / "self-eval.scorecard.json", {})
     req = load(out_dir / "requirements.summary.json", {})
     aesthetic = load(out_dir / "aesthetic.score.json", {})
@@ -371,30 +295,24 @@ def main() -> None:
     icon_gate = bool(gates.get("icon_gate")) if "icon_gate" in gates else bool(not icon_analysis or icon_analysis.get("needed", False))
     must_pass_gate = bool(gates.get("must_pass_gate")) if "must_pass_gate" in gates else True
 
-    reuse_metric = measure_component_reuse(workspace_root)
-    complexity_metric = measure_cyclomatic_complexity(workspace_root)
-    ts_metric = measure_ts_coverage(workspace_root)
+    # 三项静态度量共用一次遍历与同一份逐文件指标（未变更文件取自分析缓存）
+    # 变更范围模式：复杂度只看变更文件；复用率与 TS 覆盖率仍是全工作区比率
+    index = index or WorkspaceIndex.build(workspace_root)
+    per_file = collect_gate_metrics(index, cache)
+    reuse_metric = measure_component_reuse(workspace_root, index, per_file)
+    complexity_metric = measure_cyclomatic_complexity(workspace_root, index, per_file, changed)
+    ts_metric = measure_ts_coverage(workspace_root, index, per_file)
 
+    # 工具链检查：on 复用本次运行 Phase 5 写入的 tool-checks.json（脚本未变时），否则运行并写入；auto 读取 Phase 5 报告
     tool_checks: List[Dict[str, Any]] = []
-    tool_gate_flags = {"lint_gate": True, "typecheck_gate": True, "test_gate": True, "a11y_gate": True, "performance_gate": True}
-    if args.tool_checks == "on":
-        tool_checks, tool_gate_flags = run_tool_checks(workspace_root)
-    elif args.tool_checks == "auto":
+    if tool_checks_mode == "on":
+        tool_checks = toolchain.shared_checks(
+            workspace_root, out_dir / toolchain.RESULTS_FILE, tool_parallelism, tool_timeout, True, tool_cache
+        )
+    elif tool_checks_mode == "auto":
         if p5 and isinstance(p5.get("tool_checks"), list):
             tool_checks = p5.get("tool_checks") or []
-            for row in tool_checks:
-                if row.get("status") == "failed":
-                    name = row.get("name")
-                    if name == "lint":
-                        tool_gate_flags["lint_gate"] = False
-                    elif name == "typecheck":
-                        tool_gate_flags["typecheck_gate"] = False
-                    elif name == "test":
-                        tool_gate_flags["test_gate"] = False
-                    elif name == "a11y":
-                        tool_gate_flags["a11y_gate"] = False
-                    elif name == "lighthouse":
-                        tool_gate_flags["performance_gate"] = False
+    tool_gate_flags = toolchain.gate_flags(tool_checks)
 
     details = [
         gate_row("requirement_completeness", f">= {req_min}", req_score, req_score >= req_min, "requirements.summary.json"),
@@ -454,7 +372,48 @@ def main() -> None:
         },
         "recommendations": [f"修复 {x['gate']} 未通过项" for x in failed],
     }
+    if changed is not None:
+        changed_set = set(changed)
+        analyzed = sum(1 for e in index.files(LOGIC_EXT) if e.rel in changed_set)
+        result["summary"]["changed_scope"] = scope_summary(changed, changed_since, analyzed)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Validate quality gates")
+    parser.add_argument("--out-dir", required=True)
+    parser.add_argument("--workspace-root", default="")
+    parser.add_argument("--repo-root", default="")
+    parser.add_argument("--report", required=True)
+    parser.add_argument("--tool-checks", choices=["auto", "on", "off"], default="auto")
+    parser.add_argument("--index", default="", help="本次运行的 workspace.index.json（缺省时自行遍历工作区）")
+    parser.add_argument("--analysis-cache", default="", help="逐文件指标缓存 analysis.sqlite（缺省不缓存）")
+    add_changed_arguments(parser)
+    parser.add_argument("--tool-parallelism", type=int, default=toolchain.DEFAULT_PARALLELISM, help="--tool-checks on 时同时运行的检查数")
+    parser.add_argument("--tool-timeout", type=int, default=toolchain.DEFAULT_TIMEOUT_S, help="单项工具检查超时（秒）")
+    toolchain.add_cache_arguments(parser)
+    args = parser.parse_args()
+
+    out_dir = Path(args.out_dir)
+    workspace_root = Path(args.workspace_root).resolve() if args.workspace_root else Path(".").resolve()
+    repo_root = Path(args.repo_root).resolve() if args.repo_root else Path(__file__).resolve().parents[3]
+    report = Path(args.report)
 
+    changed = resolve_changed(workspace_root, args.changed_since, args.changed_files)
+    with AnalysisCache(Path(args.analysis_cache) if args.analysis_cache else None) as cache, toolchain.open_cache(args) as tool_cache:
+        result = build_gate_report(
+            out_dir,
+            workspace_root,
+            repo_root,
+            args.tool_checks,
+            load_or_build(args.index, workspace_root),
+            cache,
+            changed,
+            args.changed_since,
+            args.tool_parallelism,
+            args.tool_timeout,
+            tool_cache,
+        )
     report.write_text(json.dumps(result, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
     print(json.dumps(result, ensure_ascii=False, indent=2))
 
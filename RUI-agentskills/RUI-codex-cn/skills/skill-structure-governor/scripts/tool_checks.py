@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""Shared workspace toolchain checks (lint / typecheck / test / a11y / lighthouse).
+
+Phase 5 and validate_gates.py both run the workspace's package.json scripts
+through the detected package manager (pnpm / yarn / npm). The checks are
+independent, so run_checks() starts them on a thread pool bounded by
+`parallelism` (each check is its own child process; the threads only wait)
+and returns rows in CHECKS order whatever order they finish in.
+
+The rows of a run are written to <out-dir>/tool-checks.json together with a
+fingerprint of the workspace root, runner and script commands. Phase 5 runs
+the checks and writes the artifact; `validate_gates.py --tool-checks on`
+reads it back through shared_checks() while the fingerprint still matches,
+so each script runs at most once per pipeline.
+
+Across runs, a tool_cache.ToolCheckCache serves a check whose workspace tree,
+package.json, lockfile and command are unchanged since it last passed or
+failed; such rows carry `cached: true`.
+
+Check output is never held in memory in full: with an out-dir, each check
+streams into <out-dir>/logs/tool-checks/<name>.{stdout,stderr}.log (rows
+carry the relative paths) and reports progress to <out-dir>/logs/progress.jsonl;
+rows keep only the last 500 characters (output_stream.OutputSink).
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from output_stream import OutputSink, run_streamed
+from tool_cache import ToolCheckCache, check_key, file_digest
+
+RESULTS_FILE = "tool-checks.json"
+DEFAULT_PARALLELISM = 2
+DEFAULT_TIMEOUT_S = 300
+
+# (check name, package.json script, gate flag)
+CHECKS: Tuple[Tuple[str, str, str], ...] = (
+    ("lint", "lint", "lint_gate"),
+    ("typecheck", "typecheck", "typecheck_gate"),
+    ("test", "test", "test_gate"),
+    ("a11y", "a11y", "a11y_gate"),
+    ("lighthouse", "lighthouse", "performance_gate"),
+)
+
+
+LOCKFILES = ("pnpm-lock.yaml", "yarn.lock", "package-lock.json")
+
+
+def detect_runner(workspace_root: Path) -> List[str]:
+    if (workspace_root / "pnpm-lock.yaml").exists():
+        return ["pnpm"]
+    if (workspace_root / "yarn.lock").exists():
+        return ["yarn"]
+    return ["npm"]
+
+
+def detect_lockfile(workspace_root: Path) -> Optional[Path]:
+    for name in LOCKFILES:
+        if (workspace_root / name).exists():
+            return workspace_root / name
+    return None
+
+
+def load_scripts(workspace_root: Path) -> Tuple[Optional[Dict[str, str]], str]:
+    """(package.json scripts, "") or (None, skip reason) when there is no usable package.json."""
+    package_json = workspace_root / "package.json"
+    if not package_json.exists():
+        return None, "package.json_not_found"
+    try:
+        pkg = json.loads(package_json.read_text(encoding="utf-8"))
+    except Exception:
+        return None, "package_json_invalid"
+    scripts = pkg.get("scripts") if isinstance(pkg, dict) else None
+    return ({k: str(v) for k, v in scripts.items()} if isinstance(scripts, dict) else {}), ""
+
+
+def fingerprint(workspace_root: Path, runner: List[str], scripts: Optional[Dict[str, str]]) -> str:
+    """Identifies what a set of rows was produced from: workspace, runner and the checked script commands."""
+    commands = None if scripts is None else {key: scripts.get(key) for _, key, _ in CHECKS}
+    payload = {"workspace_root": str(workspace_root), "runner": runner, "commands": commands}
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def run_check(
+    workspace_root: Path, runner: List[str], name: str, script_key: str, timeout: int, out_dir: Optional[Path] = None
+) -> Dict[str, Any]:
+    start = time.perf_counter()
+    sink = OutputSink(out_dir, "tool-checks", name)
+    try:
+        code = run_streamed([*runner, "run", script_key], sink, timeout=timeout, cwd=workspace_root)
+        row: Dict[str, Any] = {
+            "name": name,
+            "script": script_key,
+            "status": "passed" if code == 0 else "failed",
+            "exit_code": code,
+            "stdout_tail": sink.tail("stdout"),
+            "stderr_tail": sink.tail("stderr"),
+        }
+    except Exception as exc:
+        row = {"name": name, "script": script_key, "status": "failed", "error": str(exc)}
+    row.update(sink.log_paths())
+    row["duration_ms"] = round((time.perf_counter() - start) * 1000.0, 1)
+    return row
+
+
+def check_inputs(workspace_root: Path, runner: List[str], cache: ToolCheckCache, exclude: Iterable[Path] = ()) -> Dict[str, Any]:
+    """Everything but the command that a check's cache key covers."""
+    lockfile = detect_lockfile(workspace_root)
+    return {
+        "tree": cache.tree_digest(workspace_root, exclude),
+        "package_json": file_digest(workspace_root / "package.json"),
+        "lockfile": [lockfile.name, file_digest(lockfile)] if lockfile else None,
+        "runner": runner,
+    }
+
+
+def run_checks(
+    workspace_root: Path,
+    parallelism: int = DEFAULT_PARALLELISM,
+    timeout: int = DEFAULT_TIMEOUT_S,
+    cache: Optional[ToolCheckCache] = None,
+    exclude: Iterable[Path] = (),
+    out_dir: Optional[Path] = None,
+) -> List[Dict[str, Any]]:
+    """Run every defined check script, at most `parallelism` at a time; rows keep CHECKS order.
+
+    With an enabled cache, checks whose inputs are unchanged are served from it (`cached: true`)
+    and fresh outcomes are stored; exclude lists directories (out-dir) left out of the tree hash.
+    With out_dir, check output is streamed to per-check log files under it.
+    """
+    scripts, reason = load_scripts(workspace_root)
+    if scripts is None:
+        return [{"name": "toolchain", "status": "skipped", "reason": reason}]
+    runner = detect_runner(workspace_root)
+    pending = [(name, key) for name, key, _ in CHECKS if key in scripts]
+    rows: Dict[str, Dict[str, Any]] = {}
+    keys: Dict[str, str] = {}
+    if cache is not None and cache.enabled and pending:
+        inputs = check_inputs(workspace_root, runner, cache, exclude)
+        for name, key in pending:
+            keys[name] = check_key(inputs, name, scripts[key])
+            hit = cache.get(keys[name])
+            if hit is not None:
+                rows[name] = {**hit, "cached": True}
+    pending = [(name, key) for name, key in pending if name not in rows]
+    if pending:
+        with ThreadPoolExecutor(max_workers=max(1, min(parallelism, len(pending)))) as pool:
+            futures = {name: pool.submit(run_check, workspace_root, runner, name, key, timeout, out_dir) for name, key in pending}
+            for name, future in futures.items():
+                rows[name] = future.result()
+                if name in keys:
+                    cache.put(keys[name], rows[name])
+    return [
+        rows.get(name) or {"name": name, "script": key, "status": "skipped", "reason": "script_not_found"}
+        for name, key, _ in CHECKS
+    ]
+
+
+def gate_flags(rows: List[Dict[str, Any]]) -> Dict[str, bool]:
+    """Gate flag per check; only a failed row turns its gate off (skipped checks pass)."""
+    flags = {gate_key: True for _, _, gate_key in CHECKS}
+    gate_of = {name: gate_key for name, _, gate_key in CHECKS}
+    for row in rows:
+        if row.get("status") == "failed" and row.get("name") in gate_of:
+            flags[gate_of[row["name"]]] = False
+    return flags
+
+
+def current_fingerprint(workspace_root: Path) -> str:
+    return fingerprint(workspace_root, detect_runner(workspace_root), load_scripts(workspace_root)[0])
+
+
+def write_results(path: Path, workspace_root: Path, rows: List[Dict[str, Any]], parallelism: int) -> None:
+    doc = {
+        "workspace_root": str(workspace_root),
+        "runner": detect_runner(workspace_root),
+        "fingerprint": current_fingerprint(workspace_root),
+        "parallelism": parallelism,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "checks": rows,
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(doc, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def load_results(path: Path, workspace_root: Path) -> Optional[List[Dict[str, Any]]]:
+    """Rows of a previous run of this pipeline, or None when missing or produced from other scripts."""
+    try:
+        doc = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(doc, dict) or not isinstance(doc.get("checks"), list):
+        return None
+    if doc.get("fingerprint") != current_fingerprint(workspace_root):
+        return None
+    return doc["checks"]
+
+
+def shared_checks(
+    workspace_root: Path,
+    results_path: Optional[Path],
+    parallelism: int = DEFAULT_PARALLELISM,
+    timeout: int = DEFAULT_TIMEOUT_S,
+    reuse: bool = True,
+    cache: Optional[ToolCheckCache] = None,
+) -> List[Dict[str, Any]]:
+    """Rows from results_path when reusable, otherwise run the checks and (re)write results_path."""
+    if results_path is not None and reuse:
+        rows = load_results(results_path, workspace_root)
+        if rows is not None:
+            return rows
+    out_dir = results_path.parent if results_path is not None else None
+    rows = run_checks(workspace_root, parallelism, timeout, cache, [out_dir] if out_dir else [], out_dir)
+    if results_path is not None:
+        write_results(results_path, workspace_root, rows, parallelism)
+    return rows
+
+
+def add_cache_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--tool-cache", default="", help="工具检查结果缓存 tool-checks.sqlite（缺省不缓存）")
+    parser.add_argument("--no-tool-cache", action="store_true", help="忽略 --tool-cache，全部重新运行")
+
+
+def open_cache(args: argparse.Namespace) -> ToolCheckCache:
+    return ToolCheckCache(Path(args.tool_cache) if args.tool_cache and not args.no_tool_cache else None)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the workspace tool checks (lint/typecheck/test/a11y/lighthouse)")
+    parser.add_argument("--workspace-root", default=".")
+    parser.add_argument("--out-dir", default="", help="写入/复用 <out-dir>/tool-checks.json（缺省仅打印）")
+    parser.add_argument("--parallelism", type=int, default=DEFAULT_PARALLELISM, help="同时运行的检查数")
+    parser.add_argument("--timeout", type=int, default=DEFAULT_TIMEOUT_S, help="单项检查超时（秒）")
+    parser.add_argument("--refresh", action="store_true", help="忽略已有 tool-checks.json，重新运行")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
+    workspace_root = Path(args.workspace_root).resolve()
+    results_path = Path(args.out_dir) / RESULTS_FILE if args.out_dir else None
+    with open_cache(args) as cache:
+        rows = shared_checks(workspace_root, results_path, args.parallelism, args.timeout, not args.refresh, cache)
+    print(json.dumps({"checks": rows, "gate_flags": gate_flags(rows)}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""Shared workspace file index: one walk per run, reused by every analyzer.
+
+The index records each workspace file's relative path, suffix, size and
+mtime, as listed by workspace_walk.Walker (skip_dirs and .gitignore /
+.ruiignore matches are pruned before descending). File contents are decoded
+lazily (utf-8, errors ignored) on first access and cached for later readers;
+per-file analyzer results (workspace_metrics.py) are memoized alongside.
+Phase 4, validate_gates.py and validate_scope_change.py take an index instead
+of walking the workspace themselves. fullflow_driver.py keeps one index in
+memory per run; run_fullflow_pipeline.sh builds it once and the step scripts
+load the saved artifact with --index.
+
+  workspace.index.json  metadata only (path, suffix, size, mtime_ns), sorted by path
+
+The index is a snapshot taken at build time. refresh() re-stats the indexed
+files (no directory walk) and drops cached contents and results of files that
+changed; the pipeline calls it after plugin hooks, which may edit the
+workspace. Files created after the build are not picked up.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from workspace_walk import SKIP_DIRS, Walker
+
+INDEX_FILE = "workspace.index.json"
+INDEX_VERSION = 1
+
+
+class FileEntry:
+    __slots__ = ("rel", "path", "suffix", "size", "mtime_ns")
+
+    def __init__(self, rel: str, path: Path, size: int, mtime_ns: int):
+        self.rel = rel
+        self.path = path
+        self.suffix = path.suffix.lower()
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"path": self.rel, "suffix": self.suffix, "size": self.size, "mtime_ns": self.mtime_ns}
+
+
+class WorkspaceIndex:
+    def __init__(
+        self, root: Path, entries: Iterable[FileEntry], skip_dirs: Iterable[str] = SKIP_DIRS, ignore_files: Iterable[str] = ()
+    ):
+        self.root = root
+        self.skip_dirs = frozenset(skip_dirs)
+        self.ignore_files = sorted(ignore_files)
+        self.entries: Dict[str, FileEntry] = {e.rel: e for e in sorted(entries, key=lambda e: e.rel)}
+        self._texts: Dict[str, str] = {}
+        # 进程内逐文件分析结果：analyzer id -> rel -> 结果（对应当前索引中的文件版本）
+        self.metrics: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, workspace_root: Path, skip_dirs: Iterable[str] = SKIP_DIRS, exclude: Iterable[Path] = ()) -> "WorkspaceIndex":
+        """Walk workspace_root once; skip_dirs are directory names, exclude are absolute dirs (e.g. the out-dir)."""
+        walker = Walker(Path(workspace_root), skip_dirs, exclude)
+        entries: List[FileEntry] = []
+        for rel, dir_entry in walker.files():
+            try:
+                st = dir_entry.stat()
+            except OSError:
+                continue
+            entries.append(FileEntry(rel, walker.root / rel, st.st_size, st.st_mtime_ns))
+        return cls(walker.root, entries, walker.skip_dirs, walker.ignore_sources)
+
+    @classmethod
+    def load(cls, path: Path) -> "WorkspaceIndex":
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        if data.get("version") != INDEX_VERSION:
+            raise ValueError(f"不支持的 workspace index 版本: {data.get('version')}")
+        root = Path(data["workspace_root"])
+        entries = [
+            FileEntry(row["path"], root / row["path"], int(row["size"]), int(row["mtime_ns"]))
+            for row in data.get("files") or []
+        ]
+        return cls(root, entries, data.get("skip_dirs") or SKIP_DIRS, data.get("ignore_files") or ())
+
+    def to_dict(self) -> Dict[str, Any]:
+        by_suffix: Dict[str, int] = {}
+        for e in self.entries.values():
+            by_suffix[e.suffix] = by_suffix.get(e.suffix, 0) + 1
+        return {
+            "version": INDEX_VERSION,
+            "workspace_root": str(self.root),
+            "skip_dirs": sorted(self.skip_dirs),
+            "ignore_files": self.ignore_files,
+            "file_count": len(self.entries),
+            "total_bytes": sum(e.size for e in self.entries.values()),
+            "by_suffix": dict(sorted(by_suffix.items())),
+            "files": [e.to_dict() for e in self.entries.values()],
+        }
+
+    def save(self, out: Path) -> Path:
+        """Write the metadata artifact; out may be the out-dir or a file path."""
+        out = Path(out)
+        path = out / INDEX_FILE if out.is_dir() else out
+        path.write_text(json.dumps(self.to_dict(), ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        return path
+
+    def files(self, suffixes: Optional[Iterable[str]] = None) -> List[FileEntry]:
+        """Entries in path order, optionally filtered by (lower-case) suffix."""
+        if suffixes is None:
+            return list(self.entries.values())
+        wanted = set(suffixes)
+        return [e for e in self.entries.values() if e.suffix in wanted]
+
+    def get(self, rel: str) -> Optional[FileEntry]:
+        return self.entries.get(Path(rel).as_posix())
+
+    def text(self, entry: FileEntry | str) -> str:
+        """Decoded contents, read on first access and cached; raises OSError like Path.read_text."""
+        rel = entry if isinstance(entry, str) else entry.rel
+        with self._lock:
+            cached = self._texts.get(rel)
+        if cached is not None:
+            return cached
+        content = (self.root / rel).read_text(encoding="utf-8", errors="ignore")
+        with self._lock:
+            return self._texts.setdefault(rel, content)
+
+    def refresh(self) -> List[str]:
+        """Re-stat indexed files; update changed entries, drop deleted ones and their cached contents."""
+        changed: List[str] = []
+        for rel, e in list(self.entries.items()):
+            try:
+                st = e.path.stat()
+            except OSError:
+                st = None
+            if st is not None and (st.st_size, st.st_mtime_ns) == (e.size, e.mtime_ns):
+                continue
+            changed.append(rel)
+            with self._lock:
+                self._texts.pop(rel, None)
+                for results in self.metrics.values():
+                    results.pop(rel, None)
+                if st is None:
+                    del self.entries[rel]
+                else:
+                    e.size, e.mtime_ns = st.st_size, st.st_mtime_ns
+        return changed
+
+
+def load_or_build(index_path: str, workspace_root: Path) -> WorkspaceIndex:
+    """CLI helper for the step scripts: reuse the run's saved index (re-stat'ed) or walk the workspace."""
+    if index_path and os.path.isfile(index_path):
+        index = WorkspaceIndex.load(Path(index_path))
+        index.refresh()
+        return index
+    return WorkspaceIndex.build(workspace_root)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the shared workspace file index")
+    parser.add_argument("--workspace-root", required=True)
+    parser.add_argument("--out", required=True, help="out-dir（写入 workspace.index.json）或索引文件路径")
+    parser.add_argument("--exclude", action="append", default=[], help="额外排除的绝对目录（如 out-dir），可重复")
+    args = parser.parse_args()
+
+    index = WorkspaceIndex.build(Path(args.workspace_root), exclude=[Path(p) for p in args.exclude])
+    print(index.save(Path(args.out)))
+
+
+if __name__ == "__main__":
+    main()
@@ -113,31 +113,11 @@ def build_markdown(payload: dict) -> str:
     return "\n".join(lines) + "\n"
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description="Build style scope lock artifacts")
-    parser.add_argument("--brief", help="User brief text")
-    parser.add_argument("--brief-file", help="Path to brief text file")
-    parser.add_argument("--target", help="Explicit style target from user")
-    parser.add_argument(
-        "--allowed-file",
-        action="append",
-        default=[],
-        help="Allowed file path for style edits, repeatable or comma-separated",
-    )
-    parser.add_argument("--json-out", required=True, help="Output path for style.scope.lock.json")
-    parser.add_argument("--md-out", required=True, help="Output path for style.scope.checklist.md")
-    args = parser.parse_args()
-
-    brief = ""
-    if args.brief_file:
-        brief = Path(args.brief_file).read_text(encoding="utf-8").strip()
-    elif args.brief:
-        brief = args.brief.strip()
-
-    explicit_target = normalize_text(args.target or "")
+def build_scope_lock(brief: str, target: str = "", allowed_values: List[str] | None = None) -> dict:
+    explicit_target = normalize_text(target or "")
     inferred_target = infer_target_from_brief(brief) if not explicit_target else ""
     style_target = explicit_target or inferred_target
-    allowed_files = parse_allowed_files(args.allowed_file or [])
+    allowed_files = parse_allowed_files(allowed_values or [])
 
     is_generic_target = style_target == "全局样式（需用户进一步确认具体区域）"
     scope_locked = bool(style_target) and not is_generic_target
@@ -216,13 +196,39 @@ def main() -> None:
         "requires_confirmation": bool(confirmation_questions),
         "confirmation_questions": confirmation_questions,
     }
+    return payload
 
-    json_out = Path(args.json_out)
-    md_out = Path(args.md_out)
+
+def write_scope_lock(payload: dict, json_out: Path, md_out: Path) -> None:
     json_out.parent.mkdir(parents=True, exist_ok=True)
     md_out.parent.mkdir(parents=True, exist_ok=True)
     json_out.write_text(json.dumps(payload, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
     md_out.write_text(build_markdown(payload), encoding="utf-8")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build style scope lock artifacts")
+    parser.add_argument("--brief", help="User brief text")
+    parser.add_argument("--brief-file", help="Path to brief text file")
+    parser.add_argument("--target", help="Explicit style target from user")
+    parser.add_argument(
+        "--allowed-file",
+        action="append",
+        default=[],
+        help="Allowed file path for style edits, repeatable or comma-separated",
+    )
+    parser.add_argument("--json-out", required=True, help="Output path for style.scope.lock.json")
+    parser.add_argument("--md-out", required=True, help="Output path for style.scope.checklist.md")
+    args = parser.parse_args()
+
+    brief = ""
+    if args.brief_file:
+        brief = Path(args.brief_file).read_text(encoding="utf-8").strip()
+    elif args.brief:
+        brief = args.brief.strip()
+
+    payload = build_scope_lock(brief, args.target or "", args.allowed_file or [])
+    write_scope_lock(payload, Path(args.json_out), Path(args.md_out))
     print(json.dumps(payload, ensure_ascii=False, indent=2))
 
 
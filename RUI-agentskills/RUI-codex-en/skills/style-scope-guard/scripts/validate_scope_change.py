@@ -4,8 +4,15 @@ from __future__ import annotations
 import argparse
 import json
 import re
+import sys
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Set
+
+# 共享工作区索引与 config_loader 同在 skill-structure-governor/scripts
+SHARED_SCRIPTS = str(Path(__file__).resolve().parents[2] / "skill-structure-governor" / "scripts")
+if SHARED_SCRIPTS not in sys.path:
+    sys.path.insert(0, SHARED_SCRIPTS)
+from workspace_index import WorkspaceIndex  # noqa: E402
 
 LOGIC_INDICATORS = [
     r"\bfetch\s*\(",
@@ -30,19 +37,23 @@ def parse_changed(args: argparse.Namespace) -> List[str]:
     return items
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description="Validate style scope lock against changed files")
-    parser.add_argument("--lock-file", required=True)
-    parser.add_argument("--changed-file", action="append", default=[])
-    parser.add_argument("--changed-files", default="")
-    parser.add_argument("--workspace-root", default=".")
-    parser.add_argument("--json-out", default="")
-    args = parser.parse_args()
+def read_changed(f: str, workspace: Path, suffixes: Set[str], index: Optional[WorkspaceIndex]) -> Optional[str]:
+    """Content of a changed file with one of suffixes; indexed files reuse the shared decoded contents."""
+    entry = index.get(f) if index is not None else None
+    if entry is not None:
+        if entry.suffix not in suffixes:
+            return None
+        try:
+            return index.text(entry)
+        except OSError:
+            return None
+    p = (workspace / f).resolve()
+    if not p.exists() or not p.is_file() or p.suffix.lower() not in suffixes:
+        return None
+    return p.read_text(encoding="utf-8", errors="ignore")
 
-    lock = json.loads(Path(args.lock_file).read_text(encoding="utf-8"))
-    changed = parse_changed(args)
-    workspace = Path(args.workspace_root).resolve()
 
+def validate_scope(lock: Dict, changed: List[str], workspace: Path, lock_file: str, index: Optional[WorkspaceIndex] = None) -> Dict:
     allowed_files = set(lock.get("allowed_files") or [])
     forbidden_patterns = [x.get("pattern", "") for x in (lock.get("forbidden_patterns") or []) if isinstance(x, dict)]
     forbidden_css_props = {x.get("property") for x in (lock.get("forbidden_css_properties") or []) if isinstance(x, dict) and x.get("property")}
@@ -61,12 +72,9 @@ def main() -> None:
 
     # heuristic logic-change checks
     for f in changed:
-        p = (workspace / f).resolve()
-        if not p.exists() or not p.is_file():
+        content = read_changed(f, workspace, {".ts", ".tsx", ".js", ".jsx", ".vue", ".svelte"}, index)
+        if content is None:
             continue
-        if p.suffix.lower() not in {".ts", ".tsx", ".js", ".jsx", ".vue", ".svelte"}:
-            continue
-        content = p.read_text(encoding="utf-8", errors="ignore")
         for indicator in LOGIC_INDICATORS:
             if re.search(indicator, content):
                 violations.append({"type": "logic_change", "file": f, "reason": f"检测到逻辑变更信号: {indicator}"})
@@ -74,12 +82,9 @@ def main() -> None:
 
     # css property policy checks
     for f in changed:
-        p = (workspace / f).resolve()
-        if not p.exists() or not p.is_file():
-            continue
-        if p.suffix.lower() not in {".css", ".scss", ".less", ".sass"}:
+        content = read_changed(f, workspace, {".css", ".scss", ".less", ".sass"}, index)
+        if content is None:
             continue
-        content = p.read_text(encoding="utf-8", errors="ignore")
         props = re.findall(r"([a-zA-Z-]+)\s*:", content)
         for prop in props:
             prop_l = prop.lower()
@@ -91,7 +96,7 @@ def main() -> None:
 
     result = {
         "scope_lock_valid": len(violations) == 0,
-        "lock_file": args.lock_file,
+        "lock_file": lock_file,
         "changed_files": changed,
         "violations": violations,
         "summary": {
@@ -99,6 +104,25 @@ def main() -> None:
             "violation_count": len(violations),
         },
     }
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Validate style scope lock against changed files")
+    parser.add_argument("--lock-file", required=True)
+    parser.add_argument("--changed-file", action="append", default=[])
+    parser.add_argument("--changed-files", default="")
+    parser.add_argument("--workspace-root", default=".")
+    parser.add_argument("--json-out", default="")
+    parser.add_argument("--index", default="", help="本次运行的 workspace.index.json（可选，复用其中的文件元数据）")
+    args = parser.parse_args()
+
+    lock = json.loads(Path(args.lock_file).read_text(encoding="utf-8"))
+    changed = parse_changed(args)
+    workspace = Path(args.workspace_root).resolve()
+
+    index = WorkspaceIndex.load(Path(args.index)) if args.index and Path(args.index).is_file() else None
+    result = validate_scope(lock, changed, workspace, args.lock_file, index)
 
     out = json.dumps(result, ensure_ascii=False, indent=2)
     if args.json_out:
@@ -301,7 +301,7 @@ DENSITY_PRESETS: Dict[str, Dict[str, Any]] = {
 }
 
 
-def parse_args() -> argparse.Namespace:
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Generate design tokens from direction or scoring result.")
     parser.add_argument(
         "--direction",
@@ -324,7 +324,7 @@ def parse_args() -> argparse.Namespace:
     )
     parser.add_argument("--json-out", help="Write JSON output to file")
     parser.add_argument("--css-out", help="Write CSS output to file")
-    return parser.parse_args()
+    return parser.parse_args(argv)
 
 
 def normalize_hex(color: str) -> str:
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""Dependency-graph step scheduler for the in-process fullflow driver.
+
+Steps declare the steps they need plus the context keys they read (inputs)
+and write (outputs). Ready steps run on a bounded thread pool; with jobs=1
+they run one by one in declaration order, matching the shell pipeline.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Set, Tuple
+
+
+@dataclass(frozen=True)
+class Step:
+    name: str
+    run: Callable[[], Any]
+    needs: Tuple[str, ...] = ()
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    # 就绪时求值；返回 False 则跳过该步骤（不计时，但视为已完成）
+    when: Optional[Callable[[], bool]] = None
+
+
+def now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def ancestors(name: str, needs: Mapping[str, Sequence[str]]) -> Set[str]:
+    seen: Set[str] = set()
+    stack = list(needs.get(name, ()))
+    while stack:
+        cur = stack.pop()
+        if cur in seen:
+            continue
+        seen.add(cur)
+        stack.extend(needs.get(cur, ()))
+    return seen
+
+
+def validate_graph(steps: Sequence[Step]) -> None:
+    """Reject unknown/cyclic dependencies and inputs produced by a step that is not an ancestor."""
+    names = [s.name for s in steps]
+    if len(set(names)) != len(names):
+        raise ValueError(f"重复的步骤名: {names}")
+    needs = {s.name: s.needs for s in steps}
+    producers: Dict[str, str] = {}
+    for s in steps:
+        for dep in s.needs:
+            if dep not in needs:
+                raise ValueError(f"步骤 {s.name} 依赖未知步骤 {dep}")
+        for key in s.outputs:
+            if key in producers:
+                raise ValueError(f"输出 {key} 同时由 {producers[key]} 与 {s.name} 写入")
+            producers[key] = s.name
+    for s in steps:
+        if s.name in ancestors(s.name, needs):
+            raise ValueError(f"步骤依赖成环: {s.name}")
+        upstream = ancestors(s.name, needs)
+        for key in s.inputs:
+            producer = producers.get(key)
+            if producer and producer != s.name and producer not in upstream:
+                raise ValueError(f"步骤 {s.name} 读取 {key}，但未声明依赖其生产者 {producer}")
+
+
+def run_dag(steps: Sequence[Step], jobs: int = 1, origin_ms: Optional[int] = None) -> Dict[str, Dict[str, int]]:
+    """Run steps as their dependencies complete; return {name: {start_offset_ms, end_offset_ms}}.
+
+    The first failing step's exception is re-raised after queued steps are cancelled.
+    """
+    validate_graph(steps)
+    origin = now_ms() if origin_ms is None else origin_ms
+    spans: Dict[str, Dict[str, int]] = {}
+    done: Set[str] = set()
+    started: Set[str] = set()
+    running: Dict[Future, str] = {}
+
+    def execute(step: Step) -> Tuple[int, int]:
+        start = now_ms()
+        step.run()
+        return start, now_ms()
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        while len(done) < len(steps):
+            progressed = True
+            while progressed:
+                progressed = False
+                for step in steps:
+                    if step.name in started or not set(step.needs) <= done:
+                        continue
+                    if len(running) >= max(1, jobs):
+                        break
+                    started.add(step.name)
+                    if step.when is not None and not step.when():
+                        done.add(step.name)
+                        progressed = True
+                        continue
+                    # 复制调用方上下文（如当前 trace span），使工作线程中的步骤继承它
+                    running[pool.submit(contextvars.copy_context().run, execute, step)] = step.name
+            if not running:
+                if len(done) < len(steps):
+                    raise RuntimeError(f"调度停滞，未完成步骤: {sorted(set(s.name for s in steps) - done)}")
+                break
+            finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    start, end = future.result()
+                except BaseException:
+                    for other in running:
+                        other.cancel()
+                    raise
+                spans[name] = {"start_offset_ms": start - origin, "end_offset_ms": end - origin}
+                done.add(name)
+    return spans
+
+
+def critical_path(
+    durations: Mapping[str, int], needs: Mapping[str, Sequence[str]]
+) -> Tuple[List[str], int]:
+    """Longest duration-weighted chain through the executed steps (skipped steps are ignored)."""
+    best: Dict[str, Tuple[int, List[str]]] = {}
+
+    def visit(name: str) -> Tuple[int, List[str]]:
+        if name not in best:
+            upstream = [visit(dep) for dep in needs.get(name, ()) if dep in durations]
+            length, path = max(upstream, key=lambda x: x[0], default=(0, []))
+            best[name] = (length + durations[name], path + [name])
+        return best[name]
+
+    total, path = max((visit(name) for name in durations), key=lambda x: x[0], default=(0, []))
+    return path, total
@@ -2,14 +2,54 @@
 from __future__ import annotations
 
 import argparse
+import copy
+import importlib.util
 import json
 import os
+import resource
+import signal
 import subprocess
+import sys
+import threading
+import time
+import traceback
+from dataclasses import dataclass
 from datetime import datetime, timezone
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict, List
+from types import ModuleType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Set, Tuple
+
+from flow_scheduler import Step, ancestors, now_ms, run_dag
+from flow_trace import span
+from resource_usage import run_measured
+
+SHARED_SCRIPTS = str(Path(__file__).resolve().parents[2] / "skill-structure-governor" / "scripts")
+if SHARED_SCRIPTS not in sys.path:
+    sys.path.insert(0, SHARED_SCRIPTS)
+from output_stream import OutputSink  # noqa: E402
 
 DONE_STATUSES = {"completed", "completed_with_findings", "completed_with_risk"}
+DEFAULT_PARALLELISM = 4
+DEFAULT_TIMEOUT_S = 120
+TRACEBACK_CHARS = 1000
+# plugin.yaml limits 键 -> (setrlimit 资源, 换算到该资源单位的倍数)；timeout_s 另行覆盖墙钟超时
+RLIMITS: Dict[str, Tuple[int, int]] = {
+    "cpu_s": (resource.RLIMIT_CPU, 1),
+    "memory_mb": (resource.RLIMIT_AS, 1024 * 1024),
+    "open_files": (resource.RLIMIT_NOFILE, 1),
+}
+LIMIT_KEYS = (*RLIMITS, "timeout_s")
+# 超出地址空间/文件数上限时子进程通常自行报错退出，只能从 stderr 末尾识别
+LIMIT_MARKERS = {
+    "memory_mb": ("MemoryError", "Cannot allocate memory", "out of memory", "bad_alloc"),
+    "open_files": ("Too many open files", "EMFILE"),
+}
+
+# `python: module:function` 入口按模块文件缓存：同一进程（daemon / batch worker 可跨多次运行）内
+# 模块文件 mtime 不变时只导入一次，修改后重新导入
+_ENTRY_MODULES: Dict[Path, Tuple[int, ModuleType]] = {}
+_ENTRY_LOCK = threading.Lock()
 
 
 def load_json(path: Path, default: Any) -> Any:
@@ -27,18 +67,33 @@ def load_plugin(path: Path) -> Dict[str, Any]:
     return data if isinstance(data, dict) else {}
 
 
-def dependencies_passed(plugin: Dict[str, Any], flow_state: Dict[str, Any]) -> tuple[bool, List[str]]:
+def name_list(value: Any) -> List[str]:
+    """A plugin.yaml name field: one string or a list of strings."""
+    if isinstance(value, str):
+        return [value] if value.strip() else []
+    return [str(x) for x in value or [] if isinstance(x, str) and x.strip()]
+
+
+def dependencies_passed(
+    plugin: Dict[str, Any], flow_state: Dict[str, Any], plugin_status: Optional[Mapping[str, bool]] = None
+) -> tuple[bool, List[str]]:
+    """Skill dependencies must be done in flow_state; plugin dependencies must have completed all hooks of this run."""
     deps = plugin.get("dependencies") or []
     if not deps:
         return True, []
-    if not flow_state:
-        return True, []
+    plugin_status = plugin_status or {}
     skills = flow_state.get("skills_status") if isinstance(flow_state, dict) else {}
     if not isinstance(skills, dict):
         skills = {}
 
     missing = []
     for dep in deps:
+        if isinstance(dep, str) and dep in plugin_status:
+            if not plugin_status[dep]:
+                missing.append(dep)
+            continue
+        if not flow_state:
+            continue
         meta = skills.get(dep) if isinstance(dep, str) else None
         status = (meta or {}).get("status") if isinstance(meta, dict) else None
         if status not in DONE_STATUSES:
@@ -56,6 +111,365 @@ def find_artifact(path_text: str, out_dir: Path, workspace_root: Path, plugin_di
     return any(p.exists() for p in checks)
 
 
+def hook_label(plugin: str, phase: str, when: str, action: str) -> str:
+    """Log file stem of one hook: <plugin>.<phase>.<when>.<action stem>, path-safe."""
+    raw = f"{plugin}.{phase}.{when}.{Path(action).stem}"
+    return "".join(ch if ch.isalnum() or ch in "._-" else "_" for ch in raw)
+
+
+def load_entry_point(plugin: str, plugin_dir: Path, entry: str) -> Tuple[Callable[..., Any], bool]:
+    """(function, was already imported) for `module:function`, module dotted relative to the plugin dir.
+
+    A module file edited since its import (new mtime) is imported again.
+    """
+    module_name, sep, func_name = entry.partition(":")
+    if not sep or not module_name or not func_name:
+        raise ValueError(f"python entry point must be module:function, got {entry!r}")
+    base = plugin_dir.joinpath(*module_name.split("."))
+    path = base.with_suffix(".py") if base.with_suffix(".py").is_file() else base / "__init__.py"
+    if not path.is_file():
+        raise FileNotFoundError(f"{module_name} not found under {plugin_dir}")
+    path = path.resolve()
+    mtime = path.stat().st_mtime_ns
+    with _ENTRY_LOCK:
+        entry_module = _ENTRY_MODULES.get(path)
+        cached = entry_module is not None and entry_module[0] == mtime
+        if cached:
+            module = entry_module[1]
+        else:
+            safe = "".join(ch if ch.isalnum() else "_" for ch in f"{plugin}_{module_name}")
+            spec = importlib.util.spec_from_file_location(f"rui_plugin_{safe}", path)
+            if spec is None or spec.loader is None:
+                raise ImportError(f"cannot load {path}")
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            _ENTRY_MODULES[path] = (mtime, module)
+    func = getattr(module, func_name, None)
+    if not callable(func):
+        raise AttributeError(f"{module_name} has no callable {func_name}")
+    return func, cached
+
+
+def hook_limits(definition: Dict[str, Any], hook: Dict[str, Any]) -> Dict[str, int]:
+    """Positive integer limits from the plugin's `limits`, overridden per hook by `hooks[].limits`."""
+    merged: Dict[str, Any] = {}
+    for source in (definition.get("limits"), hook.get("limits")):
+        if isinstance(source, dict):
+            merged.update(source)
+    limits: Dict[str, int] = {}
+    for key in LIMIT_KEYS:
+        value = merged.get(key)
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0:
+            limits[key] = int(value)
+    return limits
+
+
+def rlimit_setter(limits: Mapping[str, int]) -> Optional[Callable[[], None]]:
+    """preexec_fn applying the rlimits in the child; soft limits never exceed the inherited hard limit."""
+    pairs = []
+    for key, (res, scale) in RLIMITS.items():
+        if key not in limits:
+            continue
+        soft = limits[key] * scale
+        _, hard = resource.getrlimit(res)
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        # CPU 软限制触发 SIGXCPU，硬限制多留 1 秒，进程忽略 SIGXCPU 时由 SIGKILL 兜底
+        new_hard = soft + 1 if key == "cpu_s" and (hard == resource.RLIM_INFINITY or soft < hard) else soft
+        pairs.append((res, (soft, new_hard)))
+    if not pairs:
+        return None
+
+    def apply() -> None:
+        for res, value in pairs:
+            resource.setrlimit(res, value)
+
+    return apply
+
+
+def limit_hit(limits: Mapping[str, int], code: int, usage: Mapping[str, Any], stderr_tail: str) -> Optional[str]:
+    """Which declared limit (if any) ended or broke the hook process."""
+    if "cpu_s" in limits:
+        cpu_ms = int(usage.get("cpu_user_ms", 0) or 0) + int(usage.get("cpu_sys_ms", 0) or 0)
+        if code == -signal.SIGXCPU or (code == -signal.SIGKILL and cpu_ms >= limits["cpu_s"] * 1000):
+            return "cpu_s"
+    if code != 0:
+        for key, markers in LIMIT_MARKERS.items():
+            if key in limits and any(m in stderr_tail for m in markers):
+                return key
+    return None
+
+
+@dataclass
+class HookJob:
+    id: str
+    plugin: str
+    plugin_dir: Path
+    definition: Dict[str, Any]
+    hook: Dict[str, Any]
+
+    @property
+    def action_rel(self) -> str:
+        return str(self.hook.get("action") or "").strip()
+
+    @property
+    def entry(self) -> str:
+        """`module:function` of an in-process Python hook ("" for process hooks)."""
+        return str(self.hook.get("python") or "").strip()
+
+    @property
+    def target(self) -> str:
+        return self.action_rel or self.entry
+
+    @property
+    def after(self) -> List[str]:
+        return sorted(set(name_list(self.definition.get("after")) + name_list(self.hook.get("after"))))
+
+
+def collect_hooks(plugins_root: Path, phase: str, when: str) -> List[HookJob]:
+    """Hooks registered for phase/when, in plugin directory order then declaration order."""
+    jobs: List[HookJob] = []
+    seen: Set[str] = set()
+    if not plugins_root.exists():
+        return jobs
+    for plugin_yaml in sorted(plugins_root.glob("*/plugin.yaml")):
+        plugin = load_plugin(plugin_yaml)
+        if not plugin:
+            continue
+        plugin_name = str(plugin.get("name") or plugin_yaml.parent.name)
+        for hook in plugin.get("hooks") or []:
+            if not isinstance(hook, dict) or hook.get("phase") != phase or hook.get("when") != when:
+                continue
+            job_id = base = f"{plugin_name}:{str(hook.get('action') or hook.get('python') or '').strip()}"
+            n = 1
+            while job_id in seen:
+                n += 1
+                job_id = f"{base}#{n}"
+            seen.add(job_id)
+            jobs.append(HookJob(job_id, plugin_name, plugin_yaml.parent, plugin, hook))
+    return jobs
+
+
+def hook_order(jobs: Sequence[HookJob]) -> Tuple[Dict[str, Tuple[str, ...]], Set[str]]:
+    """(hook id -> hook ids it waits for, ids on an ordering cycle).
+
+    A hook waits for every hook (at this phase/when) of the plugins named in its
+    plugin's `dependencies` or in `after:` (plugin- or hook-level). Hooks on a
+    cycle are dropped from the graph, and so are the edges to them.
+    """
+    by_plugin: Dict[str, List[str]] = {}
+    for job in jobs:
+        by_plugin.setdefault(job.plugin, []).append(job.id)
+    needs: Dict[str, Tuple[str, ...]] = {}
+    for job in jobs:
+        names = set(name_list(job.definition.get("dependencies"))) | set(job.after)
+        preds = [dep for name in sorted(names - {job.plugin}) for dep in by_plugin.get(name, [])]
+        needs[job.id] = tuple(preds)
+    cyclic = {job_id for job_id in needs if job_id in ancestors(job_id, needs)}
+    return {job_id: tuple(d for d in deps if d not in cyclic) for job_id, deps in needs.items() if job_id not in cyclic}, cyclic
+
+
+def run_hooks(
+    repo_root: Path,
+    phase: str,
+    when: str,
+    workspace_root: Path,
+    out_dir: Path,
+    state_file: Path | None = None,
+    parallelism: int = DEFAULT_PARALLELISM,
+    timeout: int = DEFAULT_TIMEOUT_S,
+) -> Dict[str, Any]:
+    """Run the phase/when hooks of every plugin, independent ones concurrently (at most `parallelism`)."""
+    workspace_root = workspace_root.resolve()
+    out_dir = out_dir.resolve()
+    flow_state = load_json(state_file, {}) if state_file else {}
+    jobs = collect_hooks(repo_root / "skills" / "plugins", phase, when)
+    needs, cyclic = hook_order(jobs)
+    rows: Dict[str, Dict[str, Any]] = {}
+    plugin_jobs: Dict[str, List[str]] = {}
+    for job in jobs:
+        plugin_jobs.setdefault(job.plugin, []).append(job.id)
+
+    def plugin_status() -> Dict[str, bool]:
+        # 依赖的插件已按 hook_order 先行结束：全部 hook completed 才算就绪
+        return {
+            name: all(rows.get(job_id, {}).get("status") == "completed" for job_id in ids) for name, ids in plugin_jobs.items()
+        }
+
+    def run_process(job: HookJob, row: Dict[str, Any]) -> None:
+        action_rel = job.action_rel
+        action = job.plugin_dir / action_rel
+        if not action.exists() or not action.is_file():
+            row["reason"] = "action_not_found"
+            return
+
+        cmd = [str(action)] if os.access(action, os.X_OK) else ["bash", str(action)]
+        env = dict(os.environ)
+        env.update(
+            {
+                "RUI_OUT_DIR": str(out_dir),
+                "RUI_WORKSPACE_ROOT": str(workspace_root),
+                "RUI_PHASE": phase,
+                "RUI_WHEN": when,
+                "RUI_PLUGIN_NAME": job.plugin,
+            }
+        )
+
+        # 输出流式写入 <out-dir>/logs/hooks/，报告里只保留末尾 500 字符
+        sink = OutputSink(out_dir, "hooks", hook_label(job.plugin, phase, when, action_rel))
+        row.update(sink.log_paths())
+        limits = hook_limits(job.definition, job.hook)
+        if limits:
+            row["limits"] = limits
+        with span(f"{job.plugin}:{action_rel}", "hook", plugin=job.plugin, phase=phase, when=when) as sp:
+            start = time.perf_counter()
+            try:
+                proc, usage = run_measured(
+                    cmd,
+                    cwd=workspace_root,
+                    timeout=limits.get("timeout_s", timeout),
+                    sink=sink,
+                    env=env,
+                    preexec_fn=rlimit_setter(limits),
+                    start_new_session=True,
+                )
+                row["status"] = "completed" if proc.returncode == 0 else "failed"
+                row["exit_code"] = proc.returncode
+                row["stdout"] = proc.stdout
+                row["stderr"] = proc.stderr
+                row["resource_usage"] = usage
+                hit = limit_hit(limits, proc.returncode, usage, proc.stderr or "")
+                if hit:
+                    row["limit_hit"] = hit
+                sp.set(exit_code=proc.returncode, stdout_bytes=sink.bytes["stdout"], resource=usage)
+            except subprocess.TimeoutExpired as exc:
+                row["status"] = "failed"
+                row["error"] = str(exc)
+                row["limit_hit"] = "timeout_s"
+            except Exception as exc:
+                row["status"] = "failed"
+                row["error"] = str(exc)
+            row["exec_ms"] = round((time.perf_counter() - start) * 1000.0, 1)
+            sp.set(status=row["status"], limit_hit=row.get("limit_hit"))
+
+    def run_python(job: HookJob, row: Dict[str, Any]) -> None:
+        limits = hook_limits(job.definition, job.hook)
+        if limits:
+            # setrlimit 作用于整个进程，进程内入口无法单独限制
+            row["limits"] = limits
+            row["limits_enforced"] = False
+        with span(f"{job.plugin}:{job.entry}", "hook", plugin=job.plugin, phase=phase, when=when, runtime="python") as sp:
+            start = time.perf_counter()
+            try:
+                func, cached = load_entry_point(job.plugin, job.plugin_dir, job.entry)
+            except Exception as exc:
+                row["status"] = "failed"
+                row["reason"] = "entry_point_not_loadable"
+                row["error"] = f"{type(exc).__name__}: {exc}"
+                sp.set(status=row["status"])
+                return
+            finally:
+                row["import_ms"] = round((time.perf_counter() - start) * 1000.0, 1)
+            row["import_cached"] = cached
+            start = time.perf_counter()
+            try:
+                result = func(
+                    out_dir=out_dir,
+                    workspace_root=workspace_root,
+                    phase=phase,
+                    when=when,
+                    flow_state=copy.deepcopy(flow_state),
+                )
+                failed = result is False or (isinstance(result, int) and not isinstance(result, bool) and result != 0)
+                row["status"] = "failed" if failed else "completed"
+                if isinstance(result, (dict, list, str, int, float)) and not isinstance(result, bool):
+                    row["result"] = result
+            except Exception as exc:
+                row["status"] = "failed"
+                row["error"] = f"{type(exc).__name__}: {exc}"
+                row["traceback"] = traceback.format_exc()[-TRACEBACK_CHARS:]
+            row["exec_ms"] = round((time.perf_counter() - start) * 1000.0, 1)
+            sp.set(status=row["status"], import_cached=cached)
+
+    def run_one(job: HookJob) -> None:
+        expected_artifacts = [x for x in (job.definition.get("artifacts") or []) if isinstance(x, str) and x.strip()]
+        row: Dict[str, Any] = {
+            "plugin": job.plugin,
+            "phase": phase,
+            "when": when,
+            "action": job.action_rel,
+            "status": "skipped",
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "dependencies": job.definition.get("dependencies") or [],
+            "after": job.after,
+            "artifacts": expected_artifacts,
+        }
+        if job.entry and not job.action_rel:
+            row["python"] = job.entry
+        rows[job.id] = row
+        start = time.perf_counter()
+        dep_ok, dep_missing = dependencies_passed(job.definition, flow_state, plugin_status())
+        if not dep_ok:
+            row["reason"] = f"dependencies_not_ready: {', '.join(dep_missing)}"
+            return
+        if job.action_rel:
+            run_process(job, row)
+        elif job.entry:
+            run_python(job, row)
+        else:
+            row["reason"] = "action_not_found"
+        row["duration_ms"] = round((time.perf_counter() - start) * 1000.0, 1)
+
+        if row["status"] == "completed" and expected_artifacts:
+            missing_artifacts = [
+                item for item in expected_artifacts if not find_artifact(item, out_dir, workspace_root, job.plugin_dir)
+            ]
+            row["artifacts_ok"] = not missing_artifacts
+            if missing_artifacts:
+                row["status"] = "failed"
+                row["reason"] = "artifacts_missing"
+                row["missing_artifacts"] = missing_artifacts
+
+    started = now_ms()
+    steps = [Step(job.id, partial(run_one, job), needs[job.id]) for job in jobs if job.id not in cyclic]
+    spans = run_dag(steps, jobs=max(1, parallelism), origin_ms=started)
+    for job in jobs:
+        if job.id in cyclic:
+            rows[job.id] = {
+                "plugin": job.plugin,
+                "phase": phase,
+                "when": when,
+                "action": job.action_rel,
+                **({"python": job.entry} if job.entry and not job.action_rel else {}),
+                "status": "skipped",
+                "reason": "ordering_cycle",
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "dependencies": job.definition.get("dependencies") or [],
+                "after": job.after,
+            }
+        elif job.id in spans:
+            rows[job.id].update(spans[job.id])
+            rows[job.id]["waited_for"] = list(needs[job.id])
+    ordered = [rows[job.id] for job in jobs]
+
+    summary = {
+        "total": len(ordered),
+        "completed": len([x for x in ordered if x.get("status") == "completed"]),
+        "failed": len([x for x in ordered if x.get("status") == "failed"]),
+        "skipped": len([x for x in ordered if x.get("status") == "skipped"]),
+    }
+    report = {
+        "phase": phase,
+        "when": when,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "parallelism": max(1, parallelism),
+        "wall_ms": now_ms() - started,
+        "summary": summary,
+        "hooks": ordered,
+    }
+    return report
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Run plugin hooks")
     parser.add_argument("--repo-root", required=True)
@@ -65,111 +479,22 @@ def main() -> None:
     parser.add_argument("--out-dir", required=True)
     parser.add_argument("--state-file", default="")
     parser.add_argument("--report", required=True)
+    parser.add_argument("--parallelism", type=int, default=DEFAULT_PARALLELISM, help="同时运行的 hook 数（无先后约束的 hook 并发）")
+    parser.add_argument("--timeout", type=int, default=DEFAULT_TIMEOUT_S, help="单个 hook 超时（秒）")
     args = parser.parse_args()
 
-    repo_root = Path(args.repo_root)
-    workspace_root = Path(args.workspace_root).resolve()
-    out_dir = Path(args.out_dir).resolve()
-    plugins_root = repo_root / "skills" / "plugins"
     report_path = Path(args.report)
     state_file = Path(args.state_file) if args.state_file else None
-    flow_state = load_json(state_file, {}) if state_file else {}
-
-    rows: List[Dict[str, Any]] = []
-    if plugins_root.exists():
-        for plugin_yaml in sorted(plugins_root.glob("*/plugin.yaml")):
-            plugin = load_plugin(plugin_yaml)
-            if not plugin:
-                continue
-            hooks = plugin.get("hooks") or []
-            plugin_name = str(plugin.get("name") or plugin_yaml.parent.name)
-            dep_ok, dep_missing = dependencies_passed(plugin, flow_state)
-            expected_artifacts = [x for x in (plugin.get("artifacts") or []) if isinstance(x, str) and x.strip()]
-
-            for hook in hooks:
-                if hook.get("phase") != args.phase or hook.get("when") != args.when:
-                    continue
-
-                action_rel = str(hook.get("action") or "").strip()
-                action = plugin_yaml.parent / action_rel
-                row: Dict[str, Any] = {
-                    "plugin": plugin_name,
-                    "phase": args.phase,
-                    "when": args.when,
-                    "action": action_rel,
-                    "status": "skipped",
-                    "timestamp": datetime.now(timezone.utc).isoformat(),
-                    "dependencies": plugin.get("dependencies") or [],
-                    "artifacts": expected_artifacts,
-                }
-
-                if not dep_ok:
-                    row["status"] = "skipped"
-                    row["reason"] = f"dependencies_not_ready: {', '.join(dep_missing)}"
-                    rows.append(row)
-                    continue
-
-                if not action.exists() or not action.is_file():
-                    row["status"] = "skipped"
-                    row["reason"] = "action_not_found"
-                    rows.append(row)
-                    continue
-
-                cmd = [str(action)] if os.access(action, os.X_OK) else ["bash", str(action)]
-                env = dict(os.environ)
-                env.update(
-                    {
-                        "RUI_OUT_DIR": str(out_dir),
-                        "RUI_WORKSPACE_ROOT": str(workspace_root),
-                        "RUI_PHASE": args.phase,
-                        "RUI_WHEN": args.when,
-                        "RUI_PLUGIN_NAME": plugin_name,
-                    }
-                )
-
-                try:
-                    proc = subprocess.run(
-                        cmd,
-                        cwd=workspace_root,
-                        capture_output=True,
-                        text=True,
-                        timeout=120,
-                        env=env,
-                    )
-                    row["status"] = "completed" if proc.returncode == 0 else "failed"
-                    row["exit_code"] = proc.returncode
-                    row["stdout"] = (proc.stdout or "")[:500]
-                    row["stderr"] = (proc.stderr or "")[:500]
-                except Exception as exc:
-                    row["status"] = "failed"
-                    row["error"] = str(exc)
-
-                if row["status"] == "completed" and expected_artifacts:
-                    missing_artifacts = [
-                        item
-                        for item in expected_artifacts
-                        if not find_artifact(item, out_dir, workspace_root, plugin_yaml.parent)
-                    ]
-                    if missing_artifacts:
-                        row["status"] = "failed"
-                        row["reason"] = "artifacts_missing"
-                        row["missing_artifacts"] = missing_artifacts
-
-                rows.append(row)
-
-    summary = {
-        "total": len(rows),
-        "completed": len([x for x in rows if x.get("status") == "completed"]),
-        "failed": len([x for x in rows if x.get("status") == "failed"]),
-        "skipped": len([x for x in rows if x.get("status") == "skipped"]),
-    }
-    report = {
-        "phase": args.phase,
-        "when": args.when,
-        "generated_at": datetime.now(timezone.utc).isoformat(),
-        "summary": summary,
-        "hooks": rows,
-    }
+    report = run_hooks(
+        Path(args.repo_root),
+        args.phase,
+        args.when,
+        Path(args.workspace_root),
+        Path(args.out_dir),
+        state_file,
+        args.parallelism,
+        args.timeout,
+    )
     report_path.write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
     print(json.dumps(report, ensure_ascii=False, indent=2))
 
@@ -1,11 +1,97 @@
 #!/usr/bin/env python3
+"""Artifact snapshots under <out-dir>/.versions/.
+
+Every snapshotted file is stored once as a content-addressed blob
+
+  .versions/objects/<sha256[:2]>/<sha256>   (read-only)
+
+and each version directory vN-label/ holds hardlinks to its blobs (a copy
+where the filesystem refuses links), so an artifact unchanged between
+snapshots costs one directory entry instead of another full copy.
+
+The version index is an append-only log, .versions/index.jsonl: a snapshot
+appends one `add` record, and retention / archival append `prune` /
+`archive` records, so writing a snapshot costs the same however long the
+history is. load_index() replays the log; index.json, the materialized
+summary listing every version with its {file name: sha256} map, is rebuilt
+on demand (`index` subcommand, `--write-index`, `gc`), and `gc` also compacts
+the log into a single `base` record. CHANGELOG.md is appended to, never
+rewritten, and each version records `changelog_bytes`, the changelog length
+at that version, instead of carrying its own copy. Writers serialize on an
+flock of .versions/.lock, so concurrent snapshot calls are safe.
+
+Retention follows artifacts.keep_history / artifacts.max_history_count of
+.rui-config.yaml: after each snapshot the oldest versions beyond the limit
+(all but the newest when keep_history is false) are pruned, and blobs no
+longer referenced by any remaining version are garbage-collected.
+
+Older versions are then archived: loose versions beyond
+artifacts.archive_keep_loose, or created more than
+artifacts.archive_after_days ago (the newest always stays loose), are packed
+into one .versions/archives/<first>..<last>.tar.{gz,xz} (stdlib tarfile;
+hardlinked files are stored once) and their directories removed. Each index
+entry records `storage` ("loose" / "archive") and, when archived, the
+`archive` path. read_artifact() / the `cat` subcommand extract a single file
+on demand and restore it into the blob store.
+
+diff_versions() / the `diff` subcommand compare two versions by the sha256
+maps in index.json: files with equal digests are never read, and changed
+.json artifacts get a structural diff keyed by JSON path ($.a.b[0]).
+"""
+
 from __future__ import annotations
 
 import argparse
+import contextlib
+import fcntl
+import hashlib
 import json
+import os
 import shutil
-from datetime import datetime, timezone
+import sys
+import tarfile
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Set, Tuple
+
+SNAPSHOT_SUFFIXES = {".json", ".md", ".css", ".yaml", ".svg"}
+OBJECTS_DIR = "objects"
+ARCHIVES_DIR = "archives"
+INDEX_FILE = "index.json"
+INDEX_LOG = "index.jsonl"
+LOCK_FILE = ".lock"
+CHANGELOG_FILE = "CHANGELOG.md"
+DEFAULT_MAX_HISTORY = 10
+DEFAULT_ARCHIVE_KEEP_LOOSE = 5
+DEFAULT_ARCHIVE_AFTER_DAYS = 30.0
+COMPRESSIONS = ("gz", "xz")
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    keep_history: bool = True
+    max_history: int = DEFAULT_MAX_HISTORY
+    # 0 表示不按数量/时间归档
+    archive_keep_loose: int = DEFAULT_ARCHIVE_KEEP_LOOSE
+    archive_after_days: float = DEFAULT_ARCHIVE_AFTER_DAYS
+    compression: str = "gz"
+
+    @classmethod
+    def from_env(cls, env: Mapping[str, str]) -> "RetentionPolicy":
+        """From the RUI_CFG_* variables of config_loader.py --print-env."""
+        compression = env.get("RUI_CFG_ARCHIVE_COMPRESSION", "") or "gz"
+        return cls(
+            keep_history=env.get("RUI_CFG_KEEP_HISTORY", "1") != "0",
+            max_history=int(env.get("RUI_CFG_MAX_HISTORY", "") or DEFAULT_MAX_HISTORY),
+            archive_keep_loose=int(env.get("RUI_CFG_ARCHIVE_KEEP_LOOSE", "") or DEFAULT_ARCHIVE_KEEP_LOOSE),
+            archive_after_days=float(env.get("RUI_CFG_ARCHIVE_AFTER_DAYS", "") or DEFAULT_ARCHIVE_AFTER_DAYS),
+            compression=compression if compression in COMPRESSIONS else "gz",
+        )
+
+    @classmethod
+    def from_args(cls, args: argparse.Namespace) -> "RetentionPolicy":
+        return cls(not args.no_keep_history, args.max_history, args.archive_keep_loose, args.archive_after_days, args.compression)
 
 
 def pick_label(requested: str, index: int) -> str:
@@ -20,64 +106,369 @@ def pick_label(requested: str, index: int) -> str:
     return f"iteration-{index}"
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description="Create artifact snapshot version")
-    parser.add_argument("--out-dir", required=True)
-    parser.add_argument("--label", default="auto")
-    args = parser.parse_args()
+def version_number(name: str) -> Optional[int]:
+    if not name.startswith("v"):
+        return None
+    prefix = name[1:].split("-", 1)[0]
+    return int(prefix) if prefix.isdigit() else None
 
-    out_dir = Path(args.out_dir).resolve()
-    version_root = out_dir / ".versions"
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def object_path(version_root: Path, digest: str) -> Path:
+    return version_root / OBJECTS_DIR / digest[:2] / digest
+
+
+def store_blob(version_root: Path, source: Path) -> Tuple[str, int]:
+    """Store source as a blob; return (sha256, bytes newly written — 0 when the blob already existed)."""
+    digest = file_sha256(source)
+    blob = object_path(version_root, digest)
+    if blob.exists():
+        return digest, 0
+    blob.parent.mkdir(parents=True, exist_ok=True)
+    tmp = blob.with_name(f".{digest}.{os.getpid()}.tmp")
+    shutil.copyfile(source, tmp)
+    os.chmod(tmp, 0o444)
+    os.replace(tmp, blob)
+    return digest, blob.stat().st_size
+
+
+def link_blob(blob: Path, target: Path) -> None:
+    if target.exists():
+        target.unlink()
+    try:
+        os.link(blob, target)
+    except OSError:
+        # 不支持硬链接的文件系统退化为复制
+        shutil.copyfile(blob, target)
+
+
+@contextlib.contextmanager
+def locked(version_root: Path) -> Iterator[None]:
+    """Exclusive flock on .versions/.lock for everything that changes the store."""
     version_root.mkdir(parents=True, exist_ok=True)
+    with open(version_root / LOCK_FILE, "a") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
 
-    existing = []
-    for d in version_root.iterdir():
-        if not d.is_dir() or not d.name.startswith("v"):
-            continue
-        prefix = d.name[1:].split("-", 1)[0]
-        if prefix.isdigit():
-            existing.append(int(prefix))
-
-    next_idx = max(existing, default=0) + 1
-    label = pick_label(args.label, next_idx)
-    version_name = f"v{next_idx}-{label}"
-    target = version_root / version_name
-    target.mkdir(parents=True, exist_ok=True)
-
-    for p in out_dir.iterdir():
-        if not p.is_file():
-            continue
-        if p.suffix.lower() not in {".json", ".md", ".css", ".yaml", ".svg"}:
-            continue
-        shutil.copy2(p, target / p.name)
 
-    index_path = version_root / "index.json"
-    index_obj = {"versions": []}
+def load_legacy_index(version_root: Path) -> Dict[str, Any]:
+    index_path = version_root / INDEX_FILE
     if index_path.exists():
         try:
             raw = json.loads(index_path.read_text(encoding="utf-8"))
             if isinstance(raw, dict) and isinstance(raw.get("versions"), list):
-                index_obj = raw
+                return raw
         except Exception:
             pass
+    return {"versions": []}
+
+
+def replay(index_obj: Dict[str, Any], record: Mapping[str, Any]) -> None:
+    op = record.get("op")
+    if op == "base" and isinstance(record.get("index"), dict):
+        index_obj.clear()
+        index_obj.update(json.loads(json.dumps(record["index"])))
+        index_obj.setdefault("versions", [])
+    elif op == "add" and isinstance(record.get("entry"), dict):
+        index_obj["versions"].append(dict(record["entry"]))
+    elif op == "prune":
+        names = set(record.get("versions") or [])
+        index_obj["versions"] = [v for v in index_obj["versions"] if not (isinstance(v, dict) and v.get("version") in names)]
+        index_obj.setdefault("pruned", []).extend(record.get("versions") or [])
+    elif op == "archive":
+        files = record.get("files") or {}
+        for entry in index_obj["versions"]:
+            if isinstance(entry, dict) and entry.get("version") in (record.get("versions") or []):
+                entry["storage"] = "archive"
+                entry["archive"] = record.get("archive")
+                if isinstance(files.get(entry["version"]), dict):
+                    entry["files"] = files[entry["version"]]
+
+
+def load_index(version_root: Path) -> Dict[str, Any]:
+    """Replay .versions/index.jsonl; stores that predate the log fall back to index.json."""
+    log_path = version_root / INDEX_LOG
+    if not log_path.exists():
+        return load_legacy_index(version_root)
+    index_obj: Dict[str, Any] = {"versions": []}
+    with log_path.open("r", encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # 未写完的末行（并发读取时）直接跳过
+                continue
+            if isinstance(record, dict):
+                replay(index_obj, record)
+    return index_obj
 
-    index_obj["versions"].append(
-        {
-            "version": version_name,
-            "label": label,
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "artifact_count": len([x for x in target.iterdir() if x.is_file()]),
-        }
-    )
-    index_path.write_text(json.dumps(index_obj, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
 
-    changelog_path = out_dir / "CHANGELOG.md"
-    lines = []
-    if changelog_path.exists():
-        lines = changelog_path.read_text(encoding="utf-8").splitlines()
+def append_log(version_root: Path, records: Iterable[Mapping[str, Any]]) -> None:
+    """Append records to index.jsonl; the first append seeds the log from a legacy index.json."""
+    lines = [json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n" for r in records]
     if not lines:
-        lines = ["# Artifact Changelog", ""]
-    lines.extend(
+        return
+    log_path = version_root / INDEX_LOG
+    if not log_path.exists():
+        legacy = load_legacy_index(version_root)
+        if legacy["versions"] or legacy.get("pruned"):
+            lines.insert(0, json.dumps({"op": "base", "index": legacy}, ensure_ascii=False, separators=(",", ":")) + "\n")
+    with log_path.open("a", encoding="utf-8") as fh:
+        fh.write("".join(lines))
+
+
+def compact_log(version_root: Path, index_obj: Dict[str, Any]) -> None:
+    """Replace index.jsonl with one base record holding the current index."""
+    log_path = version_root / INDEX_LOG
+    tmp = log_path.with_name(f".{INDEX_LOG}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps({"op": "base", "index": index_obj}, ensure_ascii=False, separators=(",", ":")) + "\n", encoding="utf-8")
+    os.replace(tmp, log_path)
+
+
+def write_index(version_root: Path, index_obj: Dict[str, Any]) -> None:
+    index_path = version_root / INDEX_FILE
+    tmp = index_path.with_name(f".{INDEX_FILE}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(index_obj, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    os.replace(tmp, index_path)
+
+
+def materialize_index(version_root: Path) -> Dict[str, Any]:
+    """Rebuild index.json from the log (callers hold the lock)."""
+    index_obj = load_index(version_root)
+    if version_root.is_dir():
+        write_index(version_root, index_obj)
+    return index_obj
+
+
+def sorted_versions(index_obj: Dict[str, Any]) -> List[Dict[str, Any]]:
+    versions = [v for v in index_obj["versions"] if isinstance(v, dict) and v.get("version")]
+    return sorted(versions, key=lambda v: version_number(str(v["version"])) or 0)
+
+
+def is_archived(entry: Mapping[str, Any]) -> bool:
+    return entry.get("storage") == "archive" and bool(entry.get("archive"))
+
+
+def apply_retention(version_root: Path, index_obj: Dict[str, Any], keep_history: bool, max_history: int) -> List[str]:
+    """Drop the oldest versions beyond the limit from disk and index; return their names.
+
+    An archive is deleted once none of the versions packed into it remain.
+    """
+    limit = max(1, max_history) if keep_history else 1
+    versions = sorted_versions(index_obj)
+    pruned = versions[: max(0, len(versions) - limit)]
+    for entry in pruned:
+        shutil.rmtree(version_root / str(entry["version"]), ignore_errors=True)
+    names = {str(v["version"]) for v in pruned}
+    index_obj["versions"] = [v for v in index_obj["versions"] if not (isinstance(v, dict) and v.get("version") in names)]
+    if names:
+        index_obj.setdefault("pruned", []).extend(sorted(names, key=lambda n: version_number(n) or 0))
+        live = {str(v["archive"]) for v in index_obj["versions"] if isinstance(v, dict) and is_archived(v)}
+        for entry in pruned:
+            if is_archived(entry) and str(entry["archive"]) not in live:
+                (version_root / str(entry["archive"])).unlink(missing_ok=True)
+    return sorted(names, key=lambda n: version_number(n) or 0)
+
+
+def archive_versions(version_root: Path, index_obj: Dict[str, Any], policy: RetentionPolicy, now: Optional[datetime] = None) -> List[str]:
+    """Pack loose versions past the count/age thresholds into one compressed tar; return their names."""
+    loose = [v for v in sorted_versions(index_obj) if not is_archived(v) and (version_root / str(v["version"])).is_dir()]
+    now = now or datetime.now(timezone.utc)
+    cutoff = now - timedelta(days=policy.archive_after_days) if policy.archive_after_days > 0 else None
+    by_count = {id(v) for v in loose[: max(0, len(loose) - policy.archive_keep_loose)]} if policy.archive_keep_loose > 0 else set()
+
+    def too_old(entry: Dict[str, Any]) -> bool:
+        try:
+            created = datetime.fromisoformat(str(entry.get("created_at")))
+        except ValueError:
+            return False
+        if created.tzinfo is None:
+            created = created.replace(tzinfo=timezone.utc)
+        return cutoff is not None and created < cutoff
+
+    # 最新版本始终保持展开
+    eligible = [v for v in loose[:-1] if id(v) in by_count or too_old(v)]
+    if not eligible:
+        return []
+    rel = f"{ARCHIVES_DIR}/{eligible[0]['version']}..{eligible[-1]['version']}.tar.{policy.compression}"
+    archive = version_root / rel
+    archive.parent.mkdir(parents=True, exist_ok=True)
+    tmp = archive.with_name(f".{archive.name}.{os.getpid()}.tmp")
+    with tarfile.open(tmp, f"w:{policy.compression}") as tar:
+        for entry in eligible:
+            version_dir = version_root / str(entry["version"])
+            if not isinstance(entry.get("files"), dict):
+                # 旧式整份复制的版本：归档时补记文件摘要
+                entry["files"] = {p.name: file_sha256(p) for p in sorted(version_dir.iterdir()) if p.is_file()}
+            # 硬链接到同一 blob 的文件在包内只存一份
+            tar.add(version_dir, arcname=str(entry["version"]))
+    os.replace(tmp, archive)
+    for entry in eligible:
+        shutil.rmtree(version_root / str(entry["version"]), ignore_errors=True)
+        entry["storage"] = "archive"
+        entry["archive"] = rel
+    return [str(v["version"]) for v in eligible]
+
+
+def find_version(index_obj: Dict[str, Any], version: str) -> Dict[str, Any]:
+    """Index entry for a full version name, or for a bare `vN`."""
+    versions = sorted_versions(index_obj)
+    entry = next((v for v in versions if v["version"] == version), None)
+    if entry is None and version_number(version) is not None and "-" not in version:
+        entry = next((v for v in versions if version_number(str(v["version"])) == version_number(version)), None)
+    if entry is None:
+        raise KeyError(f"unknown version {version}")
+    return entry
+
+
+def version_files(version_root: Path, entry: Dict[str, Any]) -> Dict[str, str]:
+    """{file name: sha256} of a version; hashed from its directory for entries written before blobs existed."""
+    if isinstance(entry.get("files"), dict):
+        return {str(k): str(v) for k, v in entry["files"].items()}
+    version_dir = version_root / str(entry["version"])
+    if not version_dir.is_dir():
+        return {}
+    return {p.name: file_sha256(p) for p in sorted(version_dir.iterdir()) if p.is_file()}
+
+
+def read_version_file(version_root: Path, entry: Dict[str, Any], name: str) -> bytes:
+    version = str(entry["version"])
+    loose = version_root / version / name
+    if loose.is_file():
+        return loose.read_bytes()
+    if name == CHANGELOG_FILE and isinstance(entry.get("changelog_bytes"), int):
+        # 追加写的 CHANGELOG.md：该版本时的内容即其前 changelog_bytes 字节
+        with (version_root.parent / CHANGELOG_FILE).open("rb") as fh:
+            return fh.read(entry["changelog_bytes"])
+    digest = (entry.get("files") or {}).get(name)
+    if digest and object_path(version_root, digest).is_file():
+        return object_path(version_root, digest).read_bytes()
+    if not is_archived(entry):
+        raise FileNotFoundError(f"{version}/{name}")
+    with tarfile.open(version_root / str(entry["archive"])) as tar:
+        try:
+            member = tar.getmember(f"{version}/{name}")
+        except KeyError:
+            raise FileNotFoundError(f"{version}/{name}") from None
+        fh = tar.extractfile(member)
+        if fh is None:
+            raise FileNotFoundError(f"{version}/{name}")
+        data = fh.read()
+    if digest and hashlib.sha256(data).hexdigest() == digest:
+        blob = object_path(version_root, digest)
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        tmp = blob.with_name(f".{digest}.{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        os.chmod(tmp, 0o444)
+        os.replace(tmp, blob)
+    return data
+
+
+def read_artifact(out_dir: Path, version: str, name: str) -> bytes:
+    """Contents of one file of a version: from its directory, its blob, or lazily from its archive.
+
+    A file extracted from an archive is restored into the blob store, so the next read is direct.
+    """
+    version_root = Path(out_dir).resolve() / ".versions"
+    return read_version_file(version_root, find_version(load_index(version_root), version), name)
+
+
+def json_path(parent: str, key: Any) -> str:
+    if isinstance(key, int):
+        return f"{parent}[{key}]"
+    return f"{parent}.{key}" if str(key).isidentifier() else f"{parent}[{json.dumps(str(key), ensure_ascii=False)}]"
+
+
+def json_diff(old: Any, new: Any, path: str = "$") -> List[Dict[str, Any]]:
+    """Structural changes from old to new as [{path, op: added|removed|changed, ...}]."""
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes: List[Dict[str, Any]] = []
+        for key in old:
+            if key not in new:
+                changes.append({"path": json_path(path, key), "op": "removed", "from": old[key]})
+            else:
+                changes.extend(json_diff(old[key], new[key], json_path(path, key)))
+        changes.extend({"path": json_path(path, key), "op": "added", "to": new[key]} for key in new if key not in old)
+        return changes
+    if isinstance(old, list) and isinstance(new, list):
+        changes = []
+        for i in range(min(len(old), len(new))):
+            changes.extend(json_diff(old[i], new[i], json_path(path, i)))
+        changes.extend({"path": json_path(path, i), "op": "removed", "from": old[i]} for i in range(len(new), len(old)))
+        changes.extend({"path": json_path(path, i), "op": "added", "to": new[i]} for i in range(len(old), len(new)))
+        return changes
+    # bool 与 int 在 Python 中相等，按类型区分
+    if type(old) is not type(new) or old != new:
+        return [{"path": path, "op": "changed", "from": old, "to": new}]
+    return []
+
+
+def diff_versions(out_dir: Path, old_version: str, new_version: str) -> Dict[str, Any]:
+    """Compare two versions by their index digests; only changed .json files are read."""
+    version_root = Path(out_dir).resolve() / ".versions"
+    index_obj = load_index(version_root)
+    old_entry, new_entry = find_version(index_obj, old_version), find_version(index_obj, new_version)
+    old_files, new_files = version_files(version_root, old_entry), version_files(version_root, new_entry)
+    changed: List[Dict[str, Any]] = []
+    unchanged = 0
+    for name in sorted(set(old_files) & set(new_files)):
+        if old_files[name] == new_files[name]:
+            unchanged += 1
+            continue
+        item: Dict[str, Any] = {"file": name, "from_sha256": old_files[name], "to_sha256": new_files[name]}
+        if name.lower().endswith(".json"):
+            try:
+                old_obj = json.loads(read_version_file(version_root, old_entry, name))
+                new_obj = json.loads(read_version_file(version_root, new_entry, name))
+                item["changes"] = json_diff(old_obj, new_obj)
+            except (OSError, ValueError) as exc:
+                item["error"] = str(exc)
+        changed.append(item)
+    return {
+        "from": old_entry["version"],
+        "to": new_entry["version"],
+        "added": sorted(set(new_files) - set(old_files)),
+        "removed": sorted(set(old_files) - set(new_files)),
+        "changed": changed,
+        "unchanged": unchanged,
+    }
+
+
+def collect_garbage(version_root: Path, index_obj: Dict[str, Any]) -> Dict[str, int]:
+    """Delete blobs that no loose version references (archived versions carry their own copies)."""
+    referenced: Set[str] = set()
+    for entry in index_obj["versions"]:
+        if isinstance(entry, dict) and isinstance(entry.get("files"), dict) and not is_archived(entry):
+            referenced.update(str(d) for d in entry["files"].values())
+    removed = freed = 0
+    objects = version_root / OBJECTS_DIR
+    if objects.is_dir():
+        for blob in objects.glob("*/*"):
+            if blob.name.startswith(".") or blob.name in referenced:
+                continue
+            freed += blob.stat().st_size
+            blob.unlink()
+            removed += 1
+        for shard in objects.iterdir():
+            if shard.is_dir() and not any(shard.iterdir()):
+                shard.rmdir()
+    return {"blobs_removed": removed, "bytes_freed": freed}
+
+
+def append_changelog(changelog_path: Path, version_name: str, label: str) -> int:
+    """Append this version's entry to CHANGELOG.md; return the file's new length."""
+    fresh = not changelog_path.exists() or changelog_path.stat().st_size == 0
+    block = "\n".join(
         [
             f"- created_at: {datetime.now(timezone.utc).isoformat()}",
             f"- version: {version_name}",
@@ -85,10 +476,159 @@ def main() -> None:
             "",
         ]
     )
-    changelog_path.write_text("\n".join(lines), encoding="utf-8")
-    shutil.copy2(changelog_path, target / "CHANGELOG.md")
+    with changelog_path.open("a", encoding="utf-8") as fh:
+        if fresh:
+            fh.write("# Artifact Changelog\n\n")
+        fh.write(block + "\n")
+        fh.flush()
+        return fh.tell()
+
+
+def create_snapshot(
+    out_dir: Path, requested_label: str = "auto", policy: Optional[RetentionPolicy] = None, materialize: bool = False
+) -> str:
+    policy = policy or RetentionPolicy()
+    out_dir = out_dir.resolve()
+    version_root = out_dir / ".versions"
+    with locked(version_root):
+        index_obj = load_index(version_root)
+        known = [str(v["version"]) for v in sorted_versions(index_obj)] + [str(n) for n in index_obj.get("pruned") or []]
+        known += [d.name for d in version_root.iterdir() if d.is_dir()]
+        next_idx = max((n for n in map(version_number, known) if n is not None), default=0) + 1
+        label = pick_label(requested_label, next_idx)
+        version_name = f"v{next_idx}-{label}"
+        target = version_root / version_name
+        target.mkdir(parents=True, exist_ok=True)
+
+        files: Dict[str, str] = {}
+        stored_bytes = 0
+        changelog_path = out_dir / CHANGELOG_FILE
+        for p in sorted(out_dir.iterdir()):
+            if not p.is_file() or p.suffix.lower() not in SNAPSHOT_SUFFIXES or p == changelog_path:
+                continue
+            digest, added = store_blob(version_root, p)
+            link_blob(object_path(version_root, digest), target / p.name)
+            files[p.name] = digest
+            stored_bytes += added
+
+        entry = {
+            "version": version_name,
+            "label": label,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "artifact_count": len(files),
+            "files": files,
+            "stored_bytes": stored_bytes,
+            "storage": "loose",
+            "changelog_bytes": append_changelog(changelog_path, version_name, label),
+        }
+        index_obj["versions"].append(entry)
+        append_log(version_root, [{"op": "add", "entry": entry}])
+        maintain(version_root, index_obj, policy)
+        if materialize:
+            write_index(version_root, index_obj)
+    return version_name
+
+
+def maintain(version_root: Path, index_obj: Dict[str, Any], policy: RetentionPolicy) -> Dict[str, Any]:
+    """Prune, archive and log both, then collect blobs if anything left the loose set (callers hold the lock)."""
+    pruned = apply_retention(version_root, index_obj, policy.keep_history, policy.max_history)
+    archived = archive_versions(version_root, index_obj, policy)
+    records: List[Dict[str, Any]] = []
+    if pruned:
+        records.append({"op": "prune", "versions": pruned})
+    if archived:
+        entries = {v["version"]: v for v in sorted_versions(index_obj)}
+        records.append(
+            {
+                "op": "archive",
+                "archive": entries[archived[0]]["archive"],
+                "versions": archived,
+                "files": {name: entries[name]["files"] for name in archived},
+            }
+        )
+    if version_root.is_dir():
+        append_log(version_root, records)
+    gc = collect_garbage(version_root, index_obj) if pruned or archived else {"blobs_removed": 0, "bytes_freed": 0}
+    return {"pruned": pruned, "archived": archived, **gc}
+
+
+def add_retention_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--max-history", type=int, default=DEFAULT_MAX_HISTORY, help="保留的版本数（artifacts.max_history_count）")
+    parser.add_argument("--no-keep-history", action="store_true", help="只保留最新版本（artifacts.keep_history: false）")
+    parser.add_argument(
+        "--archive-keep-loose", type=int, default=DEFAULT_ARCHIVE_KEEP_LOOSE, help="保持展开的最新版本数，更早的归档（0 不按数量归档）"
+    )
+    parser.add_argument(
+        "--archive-after-days", type=float, default=DEFAULT_ARCHIVE_AFTER_DAYS, help="早于该天数的版本归档（0 不按时间归档）"
+    )
+    parser.add_argument("--compression", choices=COMPRESSIONS, default="gz", help="归档压缩格式")
 
-    print(version_name)
+
+def main() -> None:
+    argv = sys.argv[1:]
+    if not argv or argv[0] not in {"create", "gc", "index", "cat", "diff"}:
+        argv = ["create", *argv]
+    parser = argparse.ArgumentParser(description="Create, maintain and read artifact snapshot versions")
+    sub = parser.add_subparsers(dest="command", required=True)
+    create = sub.add_parser("create", help="创建快照（缺省子命令）")
+    create.add_argument("--out-dir", required=True)
+    create.add_argument("--label", default="auto")
+    create.add_argument("--write-index", action="store_true", help="快照后重建 index.json")
+    add_retention_arguments(create)
+    gc = sub.add_parser("gc", help="按保留策略裁剪、归档并回收无引用的 blob，压缩 index.jsonl 并重建 index.json")
+    gc.add_argument("--out-dir", required=True)
+    add_retention_arguments(gc)
+    index = sub.add_parser("index", help="由 index.jsonl 重建 index.json")
+    index.add_argument("--out-dir", required=True)
+    cat = sub.add_parser("cat", help="输出某个版本中的单个文件（归档版本按需解压）")
+    cat.add_argument("--out-dir", required=True)
+    cat.add_argument("--version", required=True)
+    cat.add_argument("--file", required=True)
+    diff = sub.add_parser("diff", help="按 index.json 中的摘要比较两个版本，JSON 产物给出结构化差异")
+    diff.add_argument("--out-dir", required=True)
+    diff.add_argument("--from", dest="from_version", required=True, help="旧版本（完整名称或 vN）")
+    diff.add_argument("--to", dest="to_version", required=True, help="新版本（完整名称或 vN）")
+    args = parser.parse_args(argv)
+
+    if args.command == "diff":
+        try:
+            report = diff_versions(Path(args.out_dir), args.from_version, args.to_version)
+        except (KeyError, FileNotFoundError) as exc:
+            print(f"Error: {exc.args[0] if exc.args else exc}", file=sys.stderr)
+            raise SystemExit(1)
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+
+    if args.command == "cat":
+        try:
+            data = read_artifact(Path(args.out_dir), args.version, args.file)
+        except (KeyError, FileNotFoundError) as exc:
+            print(f"Error: {exc.args[0] if exc.args else exc}", file=sys.stderr)
+            raise SystemExit(1)
+        sys.stdout.buffer.write(data)
+        return
+    version_root = Path(args.out_dir).resolve() / ".versions"
+    if args.command == "index":
+        if not version_root.is_dir():
+            print(f"Error: {version_root} not found", file=sys.stderr)
+            raise SystemExit(1)
+        with locked(version_root):
+            index_obj = materialize_index(version_root)
+        print(json.dumps({"index": str(version_root / INDEX_FILE), "versions": len(index_obj["versions"])}, ensure_ascii=False))
+        return
+    policy = RetentionPolicy.from_args(args)
+    if args.command == "gc":
+        if not version_root.is_dir():
+            print(json.dumps({"pruned": [], "archived": [], "blobs_removed": 0, "bytes_freed": 0}, ensure_ascii=False, indent=2))
+            return
+        with locked(version_root):
+            index_obj = load_index(version_root)
+            report = maintain(version_root, index_obj, policy)
+            compact_log(version_root, index_obj)
+            write_index(version_root, index_obj)
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+    print(create_snapshot(Path(args.out_dir), args.label, policy, args.write_index))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""Cold-start latency benchmark: run_fullflow_pipeline.sh vs fullflow_driver.py.
+
+Each run is a fresh process writing to its own out-dir. The driver is timed
+twice: cold (--no-cache) and with a step cache shared across runs (warm after
+the first run). After timing, each driver artifact tree is compared
+byte-for-byte with the shell's once volatile values (timestamps, durations,
+workflow ids, out-dir paths, memory/disk samples) are masked.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+
+TIMESTAMP_RE = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:\d{2})?")
+ID_RE = re.compile(r"\b(rui-flow|gate-val)-\d{8}-\d{6}\b")
+# engine-dependent values: resource samples and scheduler layout (--jobs, critical path)
+VOLATILE_KEYS = {"resource_usage", "jobs", "critical_path", "parallel_speedup", "step_cache", "stored_bytes"}
+DURATION_TABLES = {"breakdown", "skill_breakdown", "timeline"}
+RESUME_DIR = ".resume"
+# snapshot blobs are named by the sha256 of artifacts that embed timestamps; version dirs link the same contents
+OBJECTS_DIR = "objects"
+DIGEST_RE = re.compile(r"\b[0-9a-f]{64}\b")
+# span traces and streamed-output progress events record wall-clock timing and differ in shape between engines
+TRACE_FILES = {"flow.trace.json", "flow.trace.jsonl", "progress.jsonl"}
+
+DEFAULT_ARGS = [
+    "--brief", "集成测试：验证全流程状态机与门禁实测",
+    "--framework", "react",
+    "--project-type", "saas-modern",
+    "--style-target", "hero 区域",
+    "--scope-file", "src/pages/home.tsx",
+    "--priority", "performance",
+    "--auto-complete",
+]
+
+
+def mask_json(value: Any) -> Any:
+    if isinstance(value, dict):
+        masked = {}
+        for k, v in value.items():
+            if k.endswith("_ms") or k in VOLATILE_KEYS:
+                masked[k] = 0
+            elif k in DURATION_TABLES and isinstance(v, dict):
+                masked[k] = {name: 0 for name in v}
+            else:
+                masked[k] = mask_json(v)
+        return masked
+    if isinstance(value, list):
+        return [mask_json(v) for v in value]
+    return value
+
+
+def normalize(path: Path, out_dir: Path) -> bytes:
+    raw = path.read_bytes()
+    try:
+        text = raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return raw
+    if path.suffix == ".json":
+        try:
+            text = json.dumps(mask_json(json.loads(text)), ensure_ascii=False, indent=2)
+        except ValueError:
+            pass
+    elif path.suffix == ".jsonl":
+        # append-only logs (.versions/index.jsonl): one record per line
+        try:
+            text = "".join(json.dumps(mask_json(json.loads(line)), ensure_ascii=False) + "\n" for line in text.splitlines() if line)
+        except ValueError:
+            pass
+    text = text.replace(str(out_dir), "<out-dir>")
+    text = TIMESTAMP_RE.sub("<ts>", text)
+    text = ID_RE.sub(r"\1-<id>", text)
+    if ".versions" in path.relative_to(out_dir).parts:
+        text = DIGEST_RE.sub("<sha256>", text)
+    return text.encode("utf-8")
+
+
+def snapshot_tree(out_dir: Path) -> Dict[str, bytes]:
+    return {
+        str(p.relative_to(out_dir)): normalize(p, out_dir)
+        for p in sorted(out_dir.rglob("*"))
+        # .resume/ holds the driver's resume journal, which the shell never writes
+        if p.is_file()
+        and RESUME_DIR not in p.relative_to(out_dir).parts
+        and p.relative_to(out_dir).parts[:2] != (".versions", OBJECTS_DIR)
+        and p.name not in TRACE_FILES
+    }
+
+
+def run_engine(cmd: List[str], out_dir: Path) -> float:
+    start = time.perf_counter()
+    proc = subprocess.run([*cmd, "--out-dir", str(out_dir)], capture_output=True, text=True)
+    elapsed_ms = (time.perf_counter() - start) * 1000.0
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f"engine failed ({proc.returncode}): {' '.join(cmd[:2])}")
+    return elapsed_ms
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    return {
+        "runs": len(samples),
+        "min_ms": round(min(samples), 1),
+        "median_ms": round(statistics.median(samples), 1),
+        "max_ms": round(max(samples), 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark shell pipeline vs in-process driver")
+    parser.add_argument("--bundle", default="RUI-codex-cn")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--workspace-root", default=str(ROOT_DIR.parent))
+    parser.add_argument("--shell-script", default="", help="Override the 'before' engine (e.g. an older checkout)")
+    parser.add_argument("--keep", action="store_true", help="Keep benchmark out-dirs")
+    parser.add_argument("pipeline_args", nargs="*", help="Pipeline args (after --); defaults to the smoke brief")
+    args = parser.parse_args()
+
+    scripts = ROOT_DIR / args.bundle / "skills" / "ui-fullflow-orchestrator" / "scripts"
+    shell_script = args.shell_script or str(scripts / "run_fullflow_pipeline.sh")
+    pipeline_args = (args.pipeline_args or DEFAULT_ARGS) + ["--workspace-root", args.workspace_root]
+    tmp_root = Path(tempfile.mkdtemp(prefix="rui-bench-"))
+    driver = [sys.executable, str(scripts / "fullflow_driver.py"), *pipeline_args]
+    engines = {
+        "shell": ["bash", shell_script, *pipeline_args],
+        "driver": [*driver, "--no-cache"],
+        "driver_cached": [*driver, "--cache-dir", str(tmp_root / "step-cache")],
+    }
+
+    samples: Dict[str, List[float]] = {name: [] for name in engines}
+    last_out: Dict[str, Path] = {}
+    try:
+        for idx in range(args.runs):
+            for name, cmd in engines.items():
+                out_dir = tmp_root / f"{name}-{idx}"
+                samples[name].append(run_engine(cmd, out_dir))
+                last_out[name] = out_dir
+
+        before = snapshot_tree(last_out["shell"])
+        diffs: List[str] = []
+        for name in ("driver", "driver_cached"):
+            after = snapshot_tree(last_out[name])
+            diffs += sorted(
+                f"{name}:{rel}" for rel in set(before) | set(after) if before.get(rel) != after.get(rel)
+            )
+        stats = {name: summarize(values) for name, values in samples.items()}
+        result = {
+            "bundle": args.bundle,
+            **stats,
+            "speedup": round(stats["shell"]["median_ms"] / max(stats["driver"]["median_ms"], 0.001), 2),
+            "cached_speedup": round(stats["shell"]["median_ms"] / max(stats["driver_cached"]["median_ms"], 0.001), 2),
+            "artifacts_compared": len(before),
+            "artifacts_identical": not diffs,
+            "artifact_diffs": diffs,
+        }
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        if diffs:
+            raise SystemExit(1)
+    finally:
+        if args.keep:
+            print(f"out-dirs kept: {tmp_root}", file=sys.stderr)
+        else:
+            shutil.rmtree(tmp_root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Phase 4 scan benchmark: serial vs --workers process-pool analysis.
+
+Builds a synthetic workspace of component files (long JSX bodies, repeated
+class names, forwarded props) and times build_refactor_report with workers=1
+and workers=N. The reports must match once the timestamp and the `parallel`
+block (timings) are dropped; the parallel report's own speedup estimate is
+printed next to the measured one.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+
+
+def make_tree(root: Path, files: int, lines_per_file: int) -> None:
+    for i in range(files):
+        d = root / "src" / f"feature{i % 40}"
+        d.mkdir(parents=True, exist_ok=True)
+        body = [f"export function Card{i}({{ title, onSelect }}: Props) {{", "  return ("]
+        for j in range(lines_per_file):
+            if j % 7 == 0:
+                body.append(f"    <Row title={{title}} onSelect={{onSelect}} {{...rest}} />")
+            else:
+                body.append(f"    <div className=\"card-row card-row--{j % 5}\">{{items[{j}] && items[{j}].label}}</div>")
+        body += ["  );", "}"]
+        (d / f"Card{i}.tsx").write_text("\n".join(body) + "\n", encoding="utf-8")
+
+
+def comparable(report: Dict[str, Any]) -> Dict[str, Any]:
+    summary = {k: v for k, v in report["summary"].items() if k not in {"timestamp", "parallel"}}
+    return {**report, "summary": summary}
+
+
+def timed(fn: Callable[[], Any], runs: int) -> Dict[str, Any]:
+    samples: List[float] = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return {"median_ms": round(statistics.median(samples), 1), "min_ms": round(min(samples), 1), "result": result}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark serial vs parallel Phase 4 analysis")
+    parser.add_argument("--bundle", default="RUI-codex-cn")
+    parser.add_argument("--files", type=int, default=1200)
+    parser.add_argument("--lines-per-file", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=0, help="并行进程数（0 为 CPU 核数）")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--keep", action="store_true", help="Keep the synthetic tree")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(ROOT_DIR / args.bundle / "skills" / "ui-fullflow-orchestrator" / "scripts"))
+    import phase4_refactor
+
+    workers = args.workers or os.cpu_count() or 1
+    tmp_root = Path(tempfile.mkdtemp(prefix="rui-phase4-bench-"))
+    try:
+        make_tree(tmp_root, args.files, args.lines_per_file)
+        serial = timed(lambda: phase4_refactor.build_refactor_report(tmp_root, workers=1), args.runs)
+        parallel = timed(lambda: phase4_refactor.build_refactor_report(tmp_root, workers=workers), args.runs)
+        identical = comparable(serial["result"]) == comparable(parallel["result"])
+        result = {
+            "tree": {"files": args.files, "lines_per_file": args.lines_per_file},
+            "cpu_count": os.cpu_count(),
+            "serial": {k: v for k, v in serial.items() if k != "result"},
+            "parallel": {k: v for k, v in parallel.items() if k != "result"},
+            "measured_speedup": round(serial["median_ms"] / max(parallel["median_ms"], 0.001), 2),
+            "reported": parallel["result"]["summary"].get("parallel"),
+            "findings": serial["result"]["summary"]["findings_count"],
+            "reports_identical": identical,
+        }
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        if not identical:
+            raise SystemExit(1)
+    finally:
+        if args.keep:
+            print(f"synthetic tree kept: {tmp_root}", file=sys.stderr)
+        else:
+            shutil.rmtree(tmp_root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
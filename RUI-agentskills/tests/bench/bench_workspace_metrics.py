@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Per-file metrics benchmark: one pass per metric vs the single-pass analyzer.
+
+Reuses the synthetic component tree of bench_phase4_parallel.py and times
+  per_metric   each registered visitor on its own: the file is read, decoded
+               and split again for every metric (how the Phase 4 checks and
+               the gate validator used to scan)
+  single_pass  workspace_metrics.ANALYZER: one read/decode/split per file,
+               all visitors fed from the shared line loop
+and checks that both produce the same per-file metrics.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from bench_phase4_parallel import make_tree  # noqa: E402
+
+
+def timed(fn: Callable[[], Any], runs: int) -> Dict[str, Any]:
+    samples: List[float] = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return {"median_ms": round(statistics.median(samples), 1), "min_ms": round(min(samples), 1), "result": result}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark per-metric passes vs the single-pass analyzer")
+    parser.add_argument("--bundle", default="RUI-codex-cn")
+    parser.add_argument("--files", type=int, default=600)
+    parser.add_argument("--lines-per-file", type=int, default=300)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(ROOT_DIR / args.bundle / "skills" / "skill-structure-governor" / "scripts"))
+    from workspace_index import WorkspaceIndex
+    from workspace_metrics import ANALYZER, FileContext
+
+    tmp_root = Path(tempfile.mkdtemp(prefix="rui-metrics-bench-"))
+    try:
+        make_tree(tmp_root, args.files, args.lines_per_file)
+        entries = WorkspaceIndex.build(tmp_root).files()
+
+        def per_metric() -> Dict[str, Dict[str, Any]]:
+            out: Dict[str, Dict[str, Any]] = {e.rel: {} for e in entries}
+            for visitor in ANALYZER.visitors:
+                single = type(ANALYZER)(visitor.name)
+                single.visitors = [visitor]
+                for e in entries:
+                    text = e.path.read_text(encoding="utf-8", errors="ignore")
+                    out[e.rel].update(single.analyze(FileContext(e.rel, e.suffix, text)))
+            return out
+
+        def single_pass() -> Dict[str, Dict[str, Any]]:
+            return {
+                e.rel: ANALYZER.analyze(FileContext(e.rel, e.suffix, e.path.read_text(encoding="utf-8", errors="ignore")))
+                for e in entries
+            }
+
+        separate = timed(per_metric, args.runs)
+        combined = timed(single_pass, args.runs)
+        result = {
+            "tree": {"files": len(entries), "lines_per_file": args.lines_per_file},
+            "metrics": [v.name for v in ANALYZER.visitors],
+            "per_metric": {k: v for k, v in separate.items() if k != "result"},
+            "single_pass": {k: v for k, v in combined.items() if k != "result"},
+            "speedup": round(separate["median_ms"] / max(combined["median_ms"], 0.001), 2),
+            "results_consistent": separate["result"] == combined["result"],
+        }
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        if not result["results_consistent"]:
+            raise SystemExit(1)
+    finally:
+        shutil.rmtree(tmp_root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Workspace walk benchmark: rglob-then-filter vs the pruning os.scandir walker.
+
+Builds a synthetic workspace with a small source tree and a large
+node_modules (plus dist/ and a .gitignore'd generated/ directory), then times
+  rglob   the previous collect_source_files: Path.rglob("*") over everything,
+          dropping paths whose parts contain a skip dir afterwards
+  walker  workspace_walk.Walker: skip dirs and ignore rules pruned before descending
+  index   WorkspaceIndex.build (walker + one stat per kept file)
+and checks that the walker returns the rglob result minus the .gitignore'd paths.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Set
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+LEGACY_SKIP_DIRS = {".git", "node_modules", "dist", "build", ".next", "coverage", "Ruiagents"}
+
+
+def make_tree(root: Path, packages: int, files_per_package: int, sources: int) -> Dict[str, int]:
+    for i in range(sources):
+        d = root / "src" / f"feature{i % 20}"
+        d.mkdir(parents=True, exist_ok=True)
+        (d / f"Component{i}.tsx").write_text(f"export const C{i} = () => <div className=\"c{i}\" />;\n", encoding="utf-8")
+    for i in range(sources // 4):
+        d = root / "src" / "generated"
+        d.mkdir(parents=True, exist_ok=True)
+        (d / f"api{i}.ts").write_text(f"export const api{i} = {i};\n", encoding="utf-8")
+    for i in range(packages):
+        d = root / "node_modules" / f"pkg{i}" / "lib"
+        d.mkdir(parents=True, exist_ok=True)
+        for j in range(files_per_package):
+            (d / f"m{j}.js").write_text("module.exports = 1;\n", encoding="utf-8")
+    (root / "dist").mkdir()
+    for i in range(sources // 2):
+        (root / "dist" / f"chunk{i}.js").write_text("x\n", encoding="utf-8")
+    (root / ".gitignore").write_text("node_modules/\ndist/\nsrc/generated/\n*.log\n", encoding="utf-8")
+    (root / "debug.log").write_text("log\n", encoding="utf-8")
+    return {
+        "source_files": sources,
+        "ignored_by_rules": sources // 4 + 1,
+        "node_modules_files": packages * files_per_package,
+    }
+
+
+def legacy_walk(root: Path) -> Set[str]:
+    out = set()
+    for p in root.rglob("*"):
+        if not p.is_file():
+            continue
+        if any(part in LEGACY_SKIP_DIRS for part in p.parts):
+            continue
+        out.add(p.relative_to(root).as_posix())
+    return out
+
+
+def timed(fn: Callable[[], object], runs: int) -> Dict[str, float]:
+    samples: List[float] = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return {"runs": runs, "min_ms": round(min(samples), 1), "median_ms": round(statistics.median(samples), 1)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark rglob vs pruning scandir walker on a synthetic workspace")
+    parser.add_argument("--bundle", default="RUI-codex-cn")
+    parser.add_argument("--packages", type=int, default=2000, help="node_modules 下的包数")
+    parser.add_argument("--files-per-package", type=int, default=25)
+    parser.add_argument("--sources", type=int, default=400)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--keep", action="store_true", help="Keep the synthetic tree")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(ROOT_DIR / args.bundle / "skills" / "skill-structure-governor" / "scripts"))
+    from workspace_index import WorkspaceIndex
+    from workspace_walk import Walker
+
+    tmp_root = Path(tempfile.mkdtemp(prefix="rui-walk-bench-"))
+    try:
+        shape = make_tree(tmp_root, args.packages, args.files_per_package, args.sources)
+        legacy = legacy_walk(tmp_root)
+        walker = Walker(tmp_root)
+        walked = {rel for rel, _entry in walker.files()}
+        expected = {rel for rel in legacy if not rel.startswith("src/generated/") and not rel.endswith(".log")}
+        stats = {
+            "rglob": timed(lambda: legacy_walk(tmp_root), args.runs),
+            "walker": timed(lambda: list(Walker(tmp_root).files()), args.runs),
+            "index": timed(lambda: WorkspaceIndex.build(tmp_root), args.runs),
+        }
+        result = {
+            "tree": shape,
+            **stats,
+            "speedup": round(stats["rglob"]["median_ms"] / max(stats["walker"]["median_ms"], 0.001), 2),
+            "files_rglob": len(legacy),
+            "files_walker": len(walked),
+            "pruned_dirs": walker.pruned_dirs,
+            "ignore_files": walker.ignore_sources,
+            "results_consistent": walked == expected,
+        }
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        if walked != expected:
+            raise SystemExit(1)
+    finally:
+        if args.keep:
+            print(f"synthetic tree kept: {tmp_root}", file=sys.stderr)
+        else:
+            shutil.rmtree(tmp_root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -39,8 +39,19 @@ def main() -> None:
     ru = (flow_metrics.get("metrics") or {}).get("resource_usage") or {}
     must("skill_breakdown" in pe, "flow.metrics missing skill_breakdown")
     must("timeline" in pe, "flow.metrics missing timeline")
+    schedule = pe.get("schedule") or {}
+    must(schedule.get("steps"), "flow.metrics missing schedule.steps")
+    for name, span in (schedule.get("steps") or {}).items():
+        must(span.get("end_offset_ms", -1) >= span.get("start_offset_ms", 0) >= 0, f"schedule span invalid: {name}")
+    must(schedule.get("critical_path"), "flow.metrics missing schedule.critical_path")
     must(ru.get("peak_memory_mb") is not None, "flow.metrics peak_memory_mb should not be None")
     must(ru.get("disk_io_mb") is not None, "flow.metrics disk_io_mb should not be None")
+    must(ru.get("measured_steps", 0) > 0, "flow.metrics resource_usage has no measured steps")
+    for name, usage in (ru.get("steps") or {}).items():
+        must(usage.get("max_rss_kb", 0) > 0, f"resource_usage max_rss_kb missing: {name}")
+        must("cpu_user_ms" in usage and "write_bytes" in usage, f"resource_usage fields missing: {name}")
+    must("requirements-elicitation-engine" in (ru.get("per_skill") or {}), "resource_usage missing per_skill")
+    must("phase1_requirements" in (ru.get("per_phase") or {}), "resource_usage missing per_phase")
 
     must("overall_valid" in state_machine_validation, "state-machine.validation missing overall_valid")
     must(adapter_manifest.get("adapter"), "framework.adapter.manifest missing adapter")
@@ -48,10 +59,31 @@ def main() -> None:
     summary = gate_report.get("summary") or {}
     must("overall_passed" in summary, "gate-validation-report missing summary.overall_passed")
 
+    workspace_index = load(out_dir / "workspace.index.json")
+    indexed = workspace_index.get("files") or []
+    must(workspace_index.get("file_count") == len(indexed) > 0, "workspace.index.json file list invalid")
+    must([row["path"] for row in indexed] == sorted(row["path"] for row in indexed), "workspace.index.json not sorted by path")
+    must(not any(out_dir.name in row["path"] for row in indexed), "workspace.index.json should exclude the out-dir")
+    phase4 = load(out_dir / "phase4.refactor.report.json").get("summary") or {}
+    if "total_source_files" in phase4:
+        source_ext = {".ts", ".tsx", ".js", ".jsx", ".css", ".scss", ".vue", ".svelte"}
+        must(
+            phase4["total_source_files"] == len([row for row in indexed if row["suffix"] in source_ext]),
+            "phase4 total_source_files disagrees with workspace.index.json",
+        )
+
     version_index = out_dir / ".versions" / "index.json"
     must(version_index.exists(), ".versions/index.json missing")
     index_obj = load(version_index)
     must(isinstance(index_obj.get("versions"), list) and len(index_obj.get("versions")) >= 1, "version index is empty")
+    for entry in index_obj["versions"]:
+        if entry.get("storage") == "archive":
+            must((out_dir / ".versions" / entry.get("archive", "")).is_file(), f"{entry['version']}: archive missing")
+            continue
+        for name, digest in (entry.get("files") or {}).items():
+            blob = out_dir / ".versions" / "objects" / digest[:2] / digest
+            must(blob.is_file(), f"{entry['version']}/{name}: blob {digest} missing")
+            must((out_dir / ".versions" / entry["version"] / name).read_bytes() == blob.read_bytes(), f"{entry['version']}/{name} differs from its blob")
 
     print("assertions passed")
 
@@ -21,9 +21,29 @@ for b in "${BUNDLES[@]}"; do
   python3 -m py_compile \
     "$ROOT_DIR/$b/skills/ui-fullflow-orchestrator/scripts/run_plugin_hooks.py" \
     "$ROOT_DIR/$b/skills/ui-fullflow-orchestrator/scripts/validate_state_machine.py" \
+    "$ROOT_DIR/$b/skills/ui-fullflow-orchestrator/scripts/fullflow_artifacts.py" \
+    "$ROOT_DIR/$b/skills/ui-fullflow-orchestrator/scripts/fullflow_driver.py" \
+    "$ROOT_DIR/$b/skills/ui-fullflow-orchestrator/scripts/flow_scheduler.py" \
+    "$ROOT_DIR/$b/skills/ui-fullflow-orchestrator/scripts/flow_trace.py" \
+    "$ROOT_DIR/$b/skills/ui-fullflow-orchestrator/scripts/resource_usage.py" \
+    "$ROOT_DIR/$b/skills/ui-fullflow-orchestrator/scripts/step_cache.py" \
+    "$ROOT_DIR/$b/skills/ui-fullflow-orchestrator/scripts/fullflow_batch.py" \
+    "$ROOT_DIR/$b/skills/ui-fullflow-orchestrator/scripts/fullflow_daemon.py" \
+    "$ROOT_DIR/$b/skills/ui-fullflow-orchestrator/scripts/fullflow_client.py" \
+    "$ROOT_DIR/$b/skills/ui-fullflow-orchestrator/scripts/flow_registry.py" \
+    "$ROOT_DIR/$b/skills/ui-fullflow-orchestrator/scripts/phase4_refactor.py" \
+    "$ROOT_DIR/$b/skills/ui-fullflow-orchestrator/scripts/phase5_acceptance.py" \
     "$ROOT_DIR/$b/skills/framework-adapters/scripts/select_adapter.py" \
     "$ROOT_DIR/$b/skills/quality-gate-validator/scripts/validate_gates.py" \
-    "$ROOT_DIR/$b/skills/style-scope-guard/scripts/validate_scope_change.py"
+    "$ROOT_DIR/$b/skills/style-scope-guard/scripts/validate_scope_change.py" \
+    "$ROOT_DIR/$b/skills/skill-structure-governor/scripts/workspace_index.py" \
+    "$ROOT_DIR/$b/skills/skill-structure-governor/scripts/workspace_walk.py" \
+    "$ROOT_DIR/$b/skills/skill-structure-governor/scripts/analysis_cache.py" \
+    "$ROOT_DIR/$b/skills/skill-structure-governor/scripts/changed_files.py" \
+    "$ROOT_DIR/$b/skills/skill-structure-governor/scripts/workspace_metrics.py" \
+    "$ROOT_DIR/$b/skills/skill-structure-governor/scripts/tool_checks.py" \
+    "$ROOT_DIR/$b/skills/skill-structure-governor/scripts/tool_cache.py" \
+    "$ROOT_DIR/$b/skills/skill-structure-governor/scripts/output_stream.py"
 done
 
 OUT_DIR="$WORKSPACE_ROOT/Ruiagents/integration-smoke-$(date +%Y%m%d-%H%M%S)"
@@ -45,4 +65,577 @@ bash "$ROOT_DIR/RUI-codex-cn/skills/ui-fullflow-orchestrator/scripts/flow_status
 bash "$ROOT_DIR/RUI-codex-cn/skills/ui-fullflow-orchestrator/scripts/flow_status.sh" \
   --workflow-dir "$OUT_DIR" --format markdown >/dev/null
 
+STEP_CACHE_DIR="$OUT_DIR-step-cache"
+for run in driver driver-cached; do
+  python3 "$ROOT_DIR/RUI-codex-cn/skills/ui-fullflow-orchestrator/scripts/fullflow_driver.py" \
+    --brief "集成测试：验证全流程状态机与门禁实测" \
+    --framework react \
+    --project-type saas-modern \
+    --style-target "hero 区域" \
+    --scope-file "src/pages/home.tsx" \
+    --priority performance \
+    --auto-complete \
+    --cache-dir "$STEP_CACHE_DIR" \
+    --workspace-root "$WORKSPACE_ROOT" \
+    --out-dir "$OUT_DIR-$run" >/dev/null
+  python3 "$ROOT_DIR/tests/integration/assert_fullflow_artifacts.py" "$OUT_DIR-$run"
+done
+
+python3 - "$OUT_DIR-driver-cached/flow.metrics.json" <<'PY'
+import json
+import sys
+
+cache = json.load(open(sys.argv[1], encoding="utf-8"))["metrics"]["step_cache"]
+if not cache["enabled"] or cache["misses"] or not cache["hits"]:
+    raise SystemExit(f"step cache not reused on rerun: {cache}")
+PY
+
+# 长驻进程中的源文件修改：步骤缓存键随源目录内容变化，skill() 与插件 python 入口在 mtime 变化后重新导入
+python3 - "$ROOT_DIR/RUI-codex-cn/skills/ui-fullflow-orchestrator/scripts" "$OUT_DIR" <<'PY'
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, sys.argv[1])
+import fullflow_driver as driver
+
+src = Path(tempfile.mkdtemp(prefix="rui-step-src-"))
+(src / "engine.js").write_text("export const v = 1;\n", encoding="utf-8")
+driver.STEP_SOURCES["smoke_source_edit"] = ((str(src),), ())
+ctx = {"OUT_DIR": sys.argv[2], "CONFIG_DIGEST": "smoke"}
+first = driver.step_key(ctx, "smoke_source_edit", ())
+if driver.step_key(ctx, "smoke_source_edit", ()) != first:
+    raise SystemExit("step key unstable without edits")
+(src / "engine.js").write_text("export const v = 22;\n", encoding="utf-8")
+if driver.step_key(ctx, "smoke_source_edit", ()) == first:
+    raise SystemExit("step key unchanged after a source edit in the same process")
+
+script = src / "smoke_skill.py"
+script.write_text("VALUE = 1\n", encoding="utf-8")
+driver.SKILL_SCRIPTS["smoke_skill"] = str(script)
+if driver.skill("smoke_skill").VALUE != 1:
+    raise SystemExit("skill not loaded")
+script.write_text("VALUE = 2\n", encoding="utf-8")
+st = script.stat()
+os.utime(script, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+if driver.skill("smoke_skill").VALUE != 2:
+    raise SystemExit("skill() kept the module imported before the edit")
+
+import re
+
+engine = (driver.REPO_ROOT / driver.SELECTOR_SOURCES[0]).read_text(encoding="utf-8")
+engine_sources = re.findall(r"const (?:DATA|SEED)_FILE = path\.join\(REPO_ROOT, '([^']+)'\)", engine)
+if sorted(engine_sources) != sorted(driver.SELECTOR_SOURCES[1:]):
+    raise SystemExit(f"SELECTOR_SOURCES out of sync with the engine's data files: {engine_sources}")
+
+import run_plugin_hooks as hooks
+
+entry = src / "smoke_entry.py"
+entry.write_text("def run(ctx):\n    return 1\n", encoding="utf-8")
+func, cached = hooks.load_entry_point("smoke", src, "smoke_entry:run")
+if func(None) != 1 or cached or not hooks.load_entry_point("smoke", src, "smoke_entry:run")[1]:
+    raise SystemExit("python entry point not cached")
+entry.write_text("def run(ctx):\n    return 2\n", encoding="utf-8")
+st = entry.stat()
+os.utime(entry, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+func, cached = hooks.load_entry_point("smoke", src, "smoke_entry:run")
+if func(None) != 2 or cached:
+    raise SystemExit("python entry point kept the module imported before the edit")
+PY
+
+# 追踪：shell 与 driver 都导出 Chrome trace + JSONL，span 的父子关系完整
+python3 - "$OUT_DIR" "$OUT_DIR-driver" <<'PY'
+import json
+import sys
+from pathlib import Path
+
+for out_dir in map(Path, sys.argv[1:]):
+    chrome = json.loads((out_dir / "flow.trace.json").read_text(encoding="utf-8"))
+    if not any(e.get("ph") == "X" for e in chrome.get("traceEvents", [])):
+        raise SystemExit(f"{out_dir}: flow.trace.json has no complete events")
+    spans = [json.loads(line) for line in (out_dir / "flow.trace.jsonl").read_text(encoding="utf-8").splitlines()]
+    ids = {s["span_id"] for s in spans}
+    cats = {s["cat"] for s in spans}
+    if not {"pipeline", "phase", "step"} <= cats:
+        raise SystemExit(f"{out_dir}: missing span categories: {sorted(cats)}")
+    orphans = [s["name"] for s in spans if s["parent_id"] is not None and s["parent_id"] not in ids]
+    if orphans or len([s for s in spans if s["parent_id"] is None]) != 1:
+        raise SystemExit(f"{out_dir}: broken span tree: {orphans}")
+    if out_dir.name.endswith("-driver") and "hook" not in cats:
+        raise SystemExit(f"{out_dir}: plugin hooks not traced")
+PY
+
+# 续跑：输入未变的步骤全部复用，状态机与 transition_log 保持有效
+bash "$ROOT_DIR/RUI-codex-cn/skills/ui-fullflow-orchestrator/scripts/run_fullflow_pipeline.sh" \
+  --resume "$OUT_DIR-driver" --no-cache >/dev/null
+python3 "$ROOT_DIR/tests/integration/assert_fullflow_artifacts.py" "$OUT_DIR-driver"
+python3 - "$OUT_DIR-driver" <<'PY'
+import json
+import sys
+from pathlib import Path
+
+out_dir = Path(sys.argv[1])
+resume = json.loads((out_dir / "flow.metrics.json").read_text(encoding="utf-8"))["metrics"]["resume"]
+if not resume["resumed"] or "requirements_elicitation" not in resume["reused_steps"]:
+    raise SystemExit(f"resume did not reuse completed steps: {resume}")
+if set(resume["reused_steps"]) & set(resume["rerun_steps"]):
+    raise SystemExit(f"step both reused and rerun: {resume}")
+state = json.loads((out_dir / "flow.state.json").read_text(encoding="utf-8"))
+if len(state.get("resume_log", [])) != 1:
+    raise SystemExit("resume_log not appended")
+validation = json.loads((out_dir / "state-machine.validation.json").read_text(encoding="utf-8"))
+if not validation.get("overall_valid"):
+    raise SystemExit(f"state machine invalid after resume: {validation.get('issues')}")
+PY
+
+# 批量：两条记录在 2 个 worker 上运行，各自产出完整产物并汇总
+cat > "$OUT_DIR-batch.jsonl" <<'JSONL'
+{"id": "hero", "brief": "集成测试：验证全流程状态机与门禁实测", "framework": "react", "project_type": "saas-modern", "style_target": "hero 区域", "priorities": ["performance"], "auto_complete": true}
+{"id": "dashboard", "brief": "SaaS数据看板，强调可读性和主CTA", "framework": "vue", "project_type": "saas-modern", "style_target": "dashboard", "auto_complete": true}
+JSONL
+python3 "$ROOT_DIR/RUI-codex-cn/skills/ui-fullflow-orchestrator/scripts/fullflow_batch.py" \
+  --input "$OUT_DIR-batch.jsonl" \
+  --out-dir "$OUT_DIR-batch" \
+  --workers 2 \
+  --cache-dir "$STEP_CACHE_DIR" \
+  --workspace-root "$WORKSPACE_ROOT" >/dev/null 2>&1
+for run in hero dashboard; do
+  python3 "$ROOT_DIR/tests/integration/assert_fullflow_artifacts.py" "$OUT_DIR-batch/$run"
+done
+python3 - "$OUT_DIR-batch/batch.summary.json" <<'PY'
+import json
+import sys
+
+summary = json.load(open(sys.argv[1], encoding="utf-8"))
+if summary["total"] != 2 or summary["completed"] != 2:
+    raise SystemExit(f"batch runs incomplete: {summary.get('failures')}")
+for key in ("requirement_completeness", "gates", "latency_ms"):
+    if not summary.get(key):
+        raise SystemExit(f"batch summary missing {key}")
+if "requirements_elicitation" not in summary["latency_ms"]["steps"]:
+    raise SystemExit("batch summary missing per-step latency")
+PY
+
+# 运行登记表：每次运行登记到 Ruiagents/registry.sqlite，flow_status.sh 按 workflow_id 索引查找、list 筛选排序，reindex 从磁盘重建
+FLOW_STATUS_SH="$ROOT_DIR/RUI-codex-cn/skills/ui-fullflow-orchestrator/scripts/flow_status.sh"
+WORKFLOW_ID="$(python3 -c 'import json, sys; print(json.load(open(sys.argv[1]))["workflow_id"])' "$OUT_DIR/flow.state.json")"
+(cd "$WORKSPACE_ROOT" && bash "$FLOW_STATUS_SH" --workflow-id "$WORKFLOW_ID" --format json) > "$OUT_DIR-status.json"
+(cd "$WORKSPACE_ROOT" && bash "$FLOW_STATUS_SH" list --sort duration --asc --limit 0 --format json) > "$OUT_DIR-list.json"
+(cd "$WORKSPACE_ROOT" && bash "$FLOW_STATUS_SH" list --status completed --limit 2 --format table) >/dev/null
+(cd "$WORKSPACE_ROOT" && bash "$FLOW_STATUS_SH" reindex --registry "$OUT_DIR-registry.sqlite") >/dev/null
+python3 - "$OUT_DIR" "$WORKFLOW_ID" "$WORKSPACE_ROOT/Ruiagents/registry.sqlite" <<'PY'
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+out_dir, workflow_id, registry = Path(sys.argv[1]), sys.argv[2], sys.argv[3]
+if json.loads(Path(f"{out_dir}-status.json").read_text(encoding="utf-8"))["workflow_id"] != workflow_id:
+    raise SystemExit("flow_status --workflow-id did not resolve through the registry")
+runs = [str(out_dir), f"{out_dir}-driver", f"{out_dir}-batch/hero", f"{out_dir}-batch/dashboard"]
+rows = {r["out_dir"]: r for r in json.loads(Path(f"{out_dir}-list.json").read_text(encoding="utf-8"))}
+missing = [r for r in runs if r not in rows]
+if missing:
+    raise SystemExit(f"runs not registered: {missing}")
+if rows[f"{out_dir}-driver"]["workflow_id"] != json.loads(Path(f"{out_dir}-driver/flow.state.json").read_text(encoding="utf-8"))["workflow_id"]:
+    raise SystemExit("registry row out of date after resume")
+if any(rows[r]["gates_total"] is None or rows[r]["duration_ms"] is None for r in runs):
+    raise SystemExit("gate summary / duration not registered")
+durations = [r["duration_ms"] for r in rows.values() if r["duration_ms"] is not None]
+if durations != sorted(durations):
+    raise SystemExit("list --sort duration --asc not sorted")
+rebuilt = {r[0] for r in sqlite3.connect(f"{out_dir}-registry.sqlite").execute("SELECT out_dir FROM workflows")}
+live = {r[0] for r in sqlite3.connect(registry).execute("SELECT out_dir FROM workflows")}
+if not set(runs) <= rebuilt or not live <= rebuilt or any("/." in r for r in rebuilt):
+    raise SystemExit("reindex did not rebuild the registry from disk")
+PY
+
+# 升级前已有的运行：登记表只由新运行的开始登记建立时，首次查询补录磁盘上的旧运行；
+# 登记表之后才拷入的运行按 workflow_id 查不到时先重建再查；失败的运行登记为 failed
+LEGACY_WS="$OUT_DIR-legacy"
+mkdir -p "$LEGACY_WS/Ruiagents"
+for run in old copied; do
+  cp -R "$OUT_DIR" "$LEGACY_WS/Ruiagents/$run"
+  python3 - "$LEGACY_WS/Ruiagents/$run/flow.state.json" "legacy-$run" <<'PY'
+import json
+import sys
+from pathlib import Path
+
+path = Path(sys.argv[1])
+state = json.loads(path.read_text(encoding="utf-8"))
+state["workflow_id"] = sys.argv[2]
+path.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding="utf-8")
+PY
+done
+mv "$LEGACY_WS/Ruiagents/copied" "$LEGACY_WS/copied"
+LEGACY_REGISTRY_PY="$ROOT_DIR/RUI-codex-cn/skills/ui-fullflow-orchestrator/scripts/flow_registry.py"
+python3 "$LEGACY_REGISTRY_PY" register --root "$LEGACY_WS/Ruiagents" --out-dir "$LEGACY_WS/Ruiagents/new" \
+  --workflow-id legacy-new --status in_progress
+python3 "$LEGACY_REGISTRY_PY" register --root "$LEGACY_WS/Ruiagents" --out-dir "$LEGACY_WS/Ruiagents/broken" \
+  --workflow-id legacy-broken --status failed
+mkdir -p "$LEGACY_WS/Ruiagents/new" "$LEGACY_WS/Ruiagents/broken"
+(cd "$LEGACY_WS" && bash "$FLOW_STATUS_SH" --workflow-id legacy-old --format json) > "$LEGACY_WS/status-old.json"
+(cd "$LEGACY_WS" && bash "$FLOW_STATUS_SH" list --limit 0 --format json) > "$LEGACY_WS/list.json"
+mv "$LEGACY_WS/copied" "$LEGACY_WS/Ruiagents/copied"
+(cd "$LEGACY_WS" && bash "$FLOW_STATUS_SH" --workflow-id legacy-copied --format json) > "$LEGACY_WS/status-copied.json"
+python3 - "$LEGACY_WS" <<'PY'
+import json
+import sys
+from pathlib import Path
+
+ws = Path(sys.argv[1])
+for run in ("old", "copied"):
+    if json.loads((ws / f"status-{run}.json").read_text(encoding="utf-8"))["workflow_id"] != f"legacy-{run}":
+        raise SystemExit(f"flow_status did not find the unregistered run legacy-{run}")
+rows = {r["workflow_id"]: r["status"] for r in json.loads((ws / "list.json").read_text(encoding="utf-8"))}
+if rows.pop("legacy-old", "") not in ("completed", "blocked") or rows != {"legacy-new": "in_progress", "legacy-broken": "failed"}:
+    raise SystemExit(f"pre-existing / in-progress / failed runs not listed: {rows}")
+PY
+
+# 工具链检查：Phase 5 并发运行各脚本并写出 tool-checks.json，门禁校验 --tool-checks on 直接复用；
+# 工作区未变时再次验收命中结果缓存（cached: true），改动任一文件后重新运行；
+# 输出流式写入 <out-dir>/logs/tool-checks/，报告只保留末尾，progress.jsonl 记录运行进度
+TOOL_WS="$OUT_DIR-toolchain/ws"
+mkdir -p "$TOOL_WS/src"
+echo "export const a = 1;" > "$TOOL_WS/src/a.ts"
+cat > "$TOOL_WS/package.json" <<'JSON'
+{
+  "name": "tool-check-smoke",
+  "private": true,
+  "scripts": {
+    "lint": "echo lint-start $(date +%s%N) >> ../runs.log && sleep 1 && echo lint-end $(date +%s%N) >> ../runs.log && seq 1 20000",
+    "typecheck": "echo typecheck-start $(date +%s%N) >> ../runs.log && sleep 1 && echo typecheck-end $(date +%s%N) >> ../runs.log",
+    "test": "echo test-start $(date +%s%N) >> ../runs.log && sleep 1 && echo test-end $(date +%s%N) >> ../runs.log && exit 1"
+  }
+}
+JSON
+if command -v npm >/dev/null 2>&1; then
+  PHASE5_SH="$ROOT_DIR/RUI-codex-cn/skills/ui-fullflow-orchestrator/scripts/run_phase5_acceptance.sh"
+  bash "$PHASE5_SH" --out-dir "$TOOL_WS/../out1" --workspace-root "$TOOL_WS" --tool-parallelism 3 >/dev/null
+  python3 "$ROOT_DIR/RUI-codex-cn/skills/quality-gate-validator/scripts/validate_gates.py" \
+    --out-dir "$TOOL_WS/../out1" --workspace-root "$TOOL_WS" --tool-checks on --report "$TOOL_WS/../out1/gates.json" >/dev/null
+  bash "$PHASE5_SH" --out-dir "$TOOL_WS/../out2" --workspace-root "$TOOL_WS" >/dev/null
+  echo "export const b = 2;" > "$TOOL_WS/src/b.ts"
+  bash "$PHASE5_SH" --out-dir "$TOOL_WS/../out3" --workspace-root "$TOOL_WS" >/dev/null
+  bash "$PHASE5_SH" --out-dir "$TOOL_WS/../out4" --workspace-root "$TOOL_WS" --no-tool-cache >/dev/null
+  python3 - "$TOOL_WS/.." "$OUT_DIR" <<'PY'
+import json
+import sys
+from pathlib import Path
+
+root = Path(sys.argv[1])
+pipeline_out = Path(sys.argv[2])
+events = [line.split() for line in (root / "runs.log").read_text(encoding="utf-8").splitlines()]
+starts = [name for name, _ in events if name.endswith("-start")]
+# out1 运行一次；门禁复用 out1；out2 全部命中缓存；out3（新增文件）与 out4（--no-tool-cache）各运行一次
+if sorted(starts) != sorted(f"{n}-start" for n in ("lint", "typecheck", "test") for _ in range(3)):
+    raise SystemExit(f"unexpected tool-check runs: {starts}")
+first = dict(events[:6])
+if max(int(v) for k, v in first.items() if k.endswith("-start")) >= min(int(v) for k, v in first.items() if k.endswith("-end")):
+    raise SystemExit("tool checks did not run concurrently")
+gates = {row["gate"]: row["actual"] for row in json.loads((root / "out1" / "gates.json").read_text(encoding="utf-8"))["details"]}
+if gates["lint_gate"] is not True or gates["test_gate"] is not False:
+    raise SystemExit(f"gate flags not derived from shared tool checks: {gates}")
+for out, cached in (("out1", False), ("out2", True), ("out3", False), ("out4", False)):
+    rows = [r for r in json.loads((root / out / "tool-checks.json").read_text(encoding="utf-8"))["checks"] if "exit_code" in r]
+    if len(rows) != 3 or any(bool(r.get("cached")) != cached for r in rows):
+        raise SystemExit(f"{out}: expected cached={cached}: {rows}")
+    if [r["status"] for r in rows] != ["passed", "passed", "failed"]:
+        raise SystemExit(f"{out}: cached outcomes differ: {rows}")
+    if any(("stdout_log" in r) == cached for r in rows):
+        raise SystemExit(f"{out}: log paths must only be set on fresh runs: {rows}")
+lint = json.loads((root / "out1" / "tool-checks.json").read_text(encoding="utf-8"))["checks"][0]
+log = root / "out1" / lint["stdout_log"]
+if not log.read_text(encoding="utf-8").endswith("19999\n20000\n") or log.stat().st_size < 100_000:
+    raise SystemExit(f"lint output not streamed to {log}")
+if len(lint["stdout_tail"]) != 500 or not lint["stdout_tail"].endswith("20000\n"):
+    raise SystemExit(f"lint tail not bounded: {lint['stdout_tail'][-40:]!r}")
+progress = [json.loads(line) for line in (root / "out1" / "logs" / "progress.jsonl").read_text(encoding="utf-8").splitlines()]
+finished = {e["label"]: e for e in progress if e["event"] == "finished"}
+if sorted(finished) != ["lint", "test", "typecheck"] or finished["lint"]["stdout_lines"] < 20000:
+    raise SystemExit(f"missing progress events: {finished}")
+hooks = json.loads((pipeline_out / "plugin.hooks.phase5.after.json").read_text(encoding="utf-8"))["hooks"]
+for row in hooks:
+    if "exit_code" in row and not (pipeline_out / row["stdout_log"]).is_file():
+        raise SystemExit(f"hook output not streamed: {row}")
+PY
+  # 超时的检查脚本若派生了后台子进程，必须连同进程组一起结束，不能等到孙进程退出
+  FORK_WS="$OUT_DIR-toolchain/fork"
+  mkdir -p "$FORK_WS"
+  cat > "$FORK_WS/package.json" <<'JSON'
+{
+  "name": "tool-check-fork",
+  "private": true,
+  "scripts": {
+    "test": "sleep 30 & sleep 30"
+  }
+}
+JSON
+  python3 "$ROOT_DIR/RUI-codex-cn/skills/skill-structure-governor/scripts/tool_checks.py" \
+    --workspace-root "$FORK_WS" --out-dir "$FORK_WS" --timeout 1 >/dev/null
+  python3 - "$FORK_WS/tool-checks.json" <<'PY'
+import json
+import sys
+from pathlib import Path
+
+row = next(r for r in json.loads(Path(sys.argv[1]).read_text(encoding="utf-8"))["checks"] if r["name"] == "test")
+if row["status"] != "failed" or "timed out" not in row.get("error", ""):
+    raise SystemExit(f"forked check did not time out: {row}")
+if row["duration_ms"] > 10_000:
+    raise SystemExit(f"timeout waited for the forked grandchild: {row['duration_ms']}ms")
+PY
+fi
+
+# 快照存储：内容寻址去重（版本目录硬链接到 .versions/objects/），按 max_history 裁剪旧版本并回收无引用的 blob
+SNAP_OUT="$OUT_DIR-snapshots"
+SNAPSHOT_PY="$ROOT_DIR/RUI-codex-cn/skills/ui-fullflow-orchestrator/scripts/snapshot_artifacts.py"
+mkdir -p "$SNAP_OUT"
+echo '{"stable": true}' > "$SNAP_OUT/stable.json"
+for i in 1 2 3 4; do
+  echo "{\"iteration\": $i}" > "$SNAP_OUT/changing.json"
+  python3 "$SNAPSHOT_PY" --out-dir "$SNAP_OUT" --max-history 2 >/dev/null
+done
+python3 "$SNAPSHOT_PY" index --out-dir "$SNAP_OUT" >/dev/null
+python3 - "$SNAP_OUT" <<'PY'
+import json
+import sys
+from pathlib import Path
+
+root = Path(sys.argv[1]) / ".versions"
+index = json.loads((root / "index.json").read_text(encoding="utf-8"))
+names = [v["version"] for v in index["versions"]]
+if names != ["v3-final", "v4-iteration-4"] or index.get("pruned") != ["v1-initial", "v2-after-feedback"]:
+    raise SystemExit(f"retention not applied: {names} pruned={index.get('pruned')}")
+if sorted(p.name for p in root.iterdir() if p.is_dir()) != ["objects", "v3-final", "v4-iteration-4"]:
+    raise SystemExit("pruned version dirs left on disk")
+v3, v4 = (root / n / "stable.json" for n in names)
+if not v3.samefile(v4) or v3.stat().st_nlink != 3:
+    raise SystemExit("unchanged artifact not deduplicated into one blob")
+blobs = {p.name for p in (root / "objects").glob("*/*")}
+referenced = {d for v in index["versions"] for d in v["files"].values()}
+if blobs != referenced:
+    raise SystemExit(f"unreferenced blobs not collected: {len(blobs - referenced)} extra, {len(referenced - blobs)} missing")
+PY
+
+# 快照归档：超出 archive_keep_loose 的旧版本打包为一个压缩 tar，cat 按需解压单个文件并回填 blob，裁剪后归档随之删除
+ARCHIVE_OUT="$OUT_DIR-archive"
+mkdir -p "$ARCHIVE_OUT"
+echo '{"stable": true}' > "$ARCHIVE_OUT/stable.json"
+for i in 1 2 3 4 5; do
+  echo "{\"iteration\": $i}" > "$ARCHIVE_OUT/changing.json"
+  python3 "$SNAPSHOT_PY" --out-dir "$ARCHIVE_OUT" --archive-keep-loose 0 --archive-after-days 0 >/dev/null
+done
+python3 "$SNAPSHOT_PY" gc --out-dir "$ARCHIVE_OUT" --archive-keep-loose 2 --archive-after-days 0 --compression xz > "$ARCHIVE_OUT/gc.json"
+FIRST_VERSION="$(python3 -c 'import json, sys; print(json.load(open(sys.argv[1]))["versions"][0]["version"])' "$ARCHIVE_OUT/.versions/index.json")"
+python3 "$SNAPSHOT_PY" cat --out-dir "$ARCHIVE_OUT" --version "$FIRST_VERSION" --file changing.json > "$ARCHIVE_OUT/restored.json"
+python3 - "$ARCHIVE_OUT" <<'PY'
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+out = Path(sys.argv[1])
+root = out / ".versions"
+index = json.loads((root / "index.json").read_text(encoding="utf-8"))
+storage = [(v["version"], v["storage"], v.get("archive")) for v in index["versions"]]
+archived = [s for s in storage if s[1] == "archive"]
+if [s[1] for s in storage] != ["archive"] * 3 + ["loose"] * 2 or len({s[2] for s in archived}) != 1:
+    raise SystemExit(f"versions not archived into one batch: {storage}")
+if not archived[0][2].endswith(".tar.xz") or not (root / archived[0][2]).is_file():
+    raise SystemExit(f"archive missing: {archived[0][2]}")
+if any((root / s[0]).exists() for s in archived):
+    raise SystemExit("archived version dirs left on disk")
+if json.loads((out / "gc.json").read_text(encoding="utf-8"))["archived"] != [s[0] for s in archived]:
+    raise SystemExit("gc report does not list the archived versions")
+restored = (out / "restored.json").read_bytes()
+if json.loads(restored) != {"iteration": 1}:
+    raise SystemExit(f"lazy restore returned wrong content: {restored!r}")
+digest = hashlib.sha256(restored).hexdigest()
+if digest != index["versions"][0]["files"]["changing.json"] or not (root / "objects" / digest[:2] / digest).is_file():
+    raise SystemExit("restored file not written back to the blob store")
+PY
+# 快照 diff：按摘要比较（归档版本 v1 与展开版本 v5），JSON 产物给出 JSON 路径级差异
+python3 "$SNAPSHOT_PY" diff --out-dir "$ARCHIVE_OUT" --from v1 --to v5 > "$ARCHIVE_OUT/diff.json"
+python3 - "$ARCHIVE_OUT/diff.json" <<'PY'
+import json
+import sys
+
+report = json.load(open(sys.argv[1], encoding="utf-8"))
+changed = {c["file"]: c for c in report["changed"]}
+if report["unchanged"] != 1 or report["added"] or report["removed"] or set(changed) != {"changing.json"}:
+    raise SystemExit(f"unexpected diff summary: {report}")
+if changed["changing.json"]["changes"] != [{"path": "$.iteration", "op": "changed", "from": 1, "to": 5}]:
+    raise SystemExit(f"unexpected JSON diff: {changed['changing.json']}")
+PY
+python3 "$SNAPSHOT_PY" gc --out-dir "$ARCHIVE_OUT" --max-history 2 --archive-keep-loose 2 >/dev/null
+if [ -n "$(ls -A "$ARCHIVE_OUT/.versions/archives")" ]; then
+  echo "archive of pruned versions not deleted" >&2
+  exit 1
+fi
+
+# 追加写索引：并发快照在 .versions/.lock 下串行，index.jsonl 每次快照只追加记录，CHANGELOG.md 只追加不复制
+LOG_OUT="$OUT_DIR-snapshot-log"
+mkdir -p "$LOG_OUT"
+echo '{"stable": true}' > "$LOG_OUT/stable.json"
+for i in 1 2 3 4 5 6; do
+  python3 "$SNAPSHOT_PY" --out-dir "$LOG_OUT" --label "run-$i" --max-history 20 --archive-keep-loose 0 --archive-after-days 0 >/dev/null &
+done
+wait
+python3 "$SNAPSHOT_PY" cat --out-dir "$LOG_OUT" --version v3 --file CHANGELOG.md > "$LOG_OUT/changelog.v3.md"
+python3 - "$LOG_OUT" <<'PY'
+import json
+import sys
+from pathlib import Path
+
+out = Path(sys.argv[1])
+root = out / ".versions"
+records = [json.loads(line) for line in (root / "index.jsonl").read_text(encoding="utf-8").splitlines()]
+names = [r["entry"]["version"] for r in records if r["op"] == "add"]
+if len(records) != 6 or [n.split("-", 1)[0] for n in names] != [f"v{i}" for i in range(1, 7)]:
+    raise SystemExit(f"concurrent snapshots not serialized: {names}")
+if (root / "index.json").exists():
+    raise SystemExit("index.json rewritten on every snapshot")
+if any((root / n / "CHANGELOG.md").exists() for n in names):
+    raise SystemExit("changelog copied into version dirs")
+changelog = (out / "CHANGELOG.md").read_text(encoding="utf-8")
+if [line.split(": ", 1)[1] for line in changelog.splitlines() if line.startswith("- version: ")] != names:
+    raise SystemExit("changelog entries missing or out of order")
+v3 = (out / "changelog.v3.md").read_text(encoding="utf-8")
+if not changelog.startswith(v3) or f"- version: {names[2]}" not in v3 or names[3] in v3:
+    raise SystemExit("changelog as of v3 not recovered from changelog_bytes")
+PY
+python3 "$SNAPSHOT_PY" gc --out-dir "$LOG_OUT" --max-history 4 --archive-keep-loose 0 --archive-after-days 0 >/dev/null
+python3 - "$LOG_OUT/.versions" <<'PY'
+import json
+import sys
+from pathlib import Path
+
+root = Path(sys.argv[1])
+log = (root / "index.jsonl").read_text(encoding="utf-8").splitlines()
+index = json.loads((root / "index.json").read_text(encoding="utf-8"))
+if len(log) != 1 or json.loads(log[0]) != {"op": "base", "index": index}:
+    raise SystemExit("gc did not compact the log into the materialized index")
+if len(index["versions"]) != 4 or len(index["pruned"]) != 2:
+    raise SystemExit(f"gc retention not reflected in index.json: {index}")
+PY
+
+# 插件 hook 并发：无先后约束的 hook 同时运行，dependencies 中的插件名与 after: 决定顺序，成环的 hook 跳过
+HOOK_REPO="$OUT_DIR-hooks/repo"
+for p in alpha beta gamma loop-a loop-b; do
+  mkdir -p "$HOOK_REPO/skills/plugins/$p/scripts"
+  printf 'echo %s-start $(date +%%s%%N) >> "$RUI_OUT_DIR/hooks.log"\nsleep 1\necho %s-end $(date +%%s%%N) >> "$RUI_OUT_DIR/hooks.log"\n' "$p" "$p" \
+    > "$HOOK_REPO/skills/plugins/$p/scripts/hook.sh"
+done
+printf '{"name": "alpha", "hooks": [{"phase": "phase5_acceptance", "when": "after", "action": "scripts/hook.sh"}]}\n' > "$HOOK_REPO/skills/plugins/alpha/plugin.yaml"
+printf '{"name": "beta", "hooks": [{"phase": "phase5_acceptance", "when": "after", "action": "scripts/hook.sh"}]}\n' > "$HOOK_REPO/skills/plugins/beta/plugin.yaml"
+printf '{"name": "gamma", "dependencies": ["alpha"], "after": "beta", "hooks": [{"phase": "phase5_acceptance", "when": "after", "action": "scripts/hook.sh"}]}\n' > "$HOOK_REPO/skills/plugins/gamma/plugin.yaml"
+printf '{"name": "loop-a", "after": ["loop-b"], "hooks": [{"phase": "phase5_acceptance", "when": "after", "action": "scripts/hook.sh"}]}\n' > "$HOOK_REPO/skills/plugins/loop-a/plugin.yaml"
+printf '{"name": "loop-b", "hooks": [{"phase": "phase5_acceptance", "when": "after", "action": "scripts/hook.sh", "after": ["loop-a"]}]}\n' > "$HOOK_REPO/skills/plugins/loop-b/plugin.yaml"
+# 进程内 python 入口：与进程 hook 同样参与排序，报告分别记录导入与执行耗时
+mkdir -p "$HOOK_REPO/skills/plugins/inproc/checks"
+cat > "$HOOK_REPO/skills/plugins/inproc/checks/probe.py" <<'PY'
+def run(out_dir, workspace_root, phase, when, flow_state):
+    (out_dir / "inproc.txt").write_text(f"{phase}:{when}:{workspace_root.name}", encoding="utf-8")
+    return {"seen": sorted((out_dir / "hooks.log").read_text(encoding="utf-8").split()[::2])}
+
+
+def broken(**_):
+    raise RuntimeError("boom")
+PY
+printf '{"name": "inproc", "after": ["alpha"], "artifacts": ["inproc.txt"], "hooks": [{"phase": "phase5_acceptance", "when": "after", "python": "checks.probe:run"}, {"phase": "phase5_acceptance", "when": "after", "python": "checks.probe:broken"}, {"phase": "phase5_acceptance", "when": "after", "python": "checks.missing:run"}]}\n' > "$HOOK_REPO/skills/plugins/inproc/plugin.yaml"
+# limits：setrlimit 限制 CPU 秒数、地址空间与打开文件数，timeout_s 覆盖墙钟超时，报告记录触发的限制
+for p in hog-cpu hog-mem hog-files slow; do mkdir -p "$HOOK_REPO/skills/plugins/$p/scripts"; done
+echo 'exec python3 -c "while True: pass"' > "$HOOK_REPO/skills/plugins/hog-cpu/scripts/hook.sh"
+echo 'exec python3 -c "x = bytearray(1024 * 1024 * 1024)"' > "$HOOK_REPO/skills/plugins/hog-mem/scripts/hook.sh"
+echo 'exec python3 -c "fs = [open(\"/dev/null\") for _ in range(200)]"' > "$HOOK_REPO/skills/plugins/hog-files/scripts/hook.sh"
+echo 'sleep 5' > "$HOOK_REPO/skills/plugins/slow/scripts/hook.sh"
+for spec in "hog-cpu:cpu_s:1" "hog-mem:memory_mb:256" "hog-files:open_files:32" "slow:timeout_s:1"; do
+  IFS=: read -r p key value <<< "$spec"
+  printf '{"name": "%s", "limits": {"%s": %s}, "hooks": [{"phase": "phase4_self_review", "when": "before", "action": "scripts/hook.sh"}]}\n' "$p" "$key" "$value" \
+    > "$HOOK_REPO/skills/plugins/$p/plugin.yaml"
+done
+mkdir -p "$OUT_DIR-hooks/out"
+python3 "$ROOT_DIR/RUI-codex-cn/skills/ui-fullflow-orchestrator/scripts/run_plugin_hooks.py" \
+  --repo-root "$HOOK_REPO" --phase phase5_acceptance --when after --workspace-root "$HOOK_REPO" \
+  --out-dir "$OUT_DIR-hooks/out" --report "$OUT_DIR-hooks/report.json" --parallelism 4 >/dev/null
+python3 - "$OUT_DIR-hooks" <<'PY'
+import json
+import sys
+from pathlib import Path
+
+root = Path(sys.argv[1])
+stamps = dict(line.split() for line in (root / "out" / "hooks.log").read_text(encoding="utf-8").splitlines())
+if set(stamps) != {f"{p}-{e}" for p in ("alpha", "beta", "gamma") for e in ("start", "end")}:
+    raise SystemExit(f"unexpected hook runs: {sorted(stamps)}")
+t = {k: int(v) for k, v in stamps.items()}
+if not (t["alpha-start"] < t["beta-end"] and t["beta-start"] < t["alpha-end"]):
+    raise SystemExit("independent hooks did not run concurrently")
+if t["gamma-start"] < max(t["alpha-end"], t["beta-end"]):
+    raise SystemExit("gamma started before the plugins it depends on / runs after")
+rows = {r["plugin"]: r for r in json.loads((root / "report.json").read_text(encoding="utf-8"))["hooks"]}
+if [rows[p]["status"] for p in ("alpha", "beta", "gamma")] != ["completed"] * 3:
+    raise SystemExit(f"hooks did not complete: {rows}")
+if any(rows[p].get("reason") != "ordering_cycle" for p in ("loop-a", "loop-b")):
+    raise SystemExit(f"cyclic hooks not skipped: {rows}")
+if sorted(rows["gamma"]["waited_for"]) != ["alpha:scripts/hook.sh", "beta:scripts/hook.sh"] or "duration_ms" not in rows["gamma"]:
+    raise SystemExit(f"hook ordering/timing not recorded: {rows['gamma']}")
+inproc = {r["python"]: r for r in json.loads((root / "report.json").read_text(encoding="utf-8"))["hooks"] if "python" in r}
+probe = inproc["checks.probe:run"]
+if probe["status"] != "completed" or not probe.get("artifacts_ok") or "alpha-end" not in probe["result"]["seen"]:
+    raise SystemExit(f"in-process hook did not run after alpha: {probe}")
+if (root / "out" / "inproc.txt").read_text(encoding="utf-8") != "phase5_acceptance:after:repo":
+    raise SystemExit("in-process hook got wrong arguments")
+# run 与 broken 同属 checks.probe 且同时就绪：谁先拿到锁不确定，但只能导入一次
+if not {"import_ms", "exec_ms"} <= set(probe) or sorted(inproc[e]["import_cached"] for e in ("checks.probe:run", "checks.probe:broken")) != [False, True]:
+    raise SystemExit(f"import/exec latency not reported or module imported twice: {inproc}")
+if "RuntimeError: boom" not in inproc["checks.probe:broken"].get("error", "") or inproc["checks.missing:run"].get("reason") != "entry_point_not_loadable":
+    raise SystemExit(f"in-process failures not reported: {inproc}")
+PY
+python3 "$ROOT_DIR/RUI-codex-cn/skills/ui-fullflow-orchestrator/scripts/run_plugin_hooks.py" \
+  --repo-root "$HOOK_REPO" --phase phase4_self_review --when before --workspace-root "$HOOK_REPO" \
+  --out-dir "$OUT_DIR-hooks/out" --report "$OUT_DIR-hooks/limits.json" --parallelism 4 >/dev/null
+python3 - "$OUT_DIR-hooks/limits.json" <<'PY'
+import json
+import sys
+
+report = json.load(open(sys.argv[1], encoding="utf-8"))
+hit = {r["plugin"]: r.get("limit_hit") for r in report["hooks"]}
+if hit != {"hog-cpu": "cpu_s", "hog-files": "open_files", "hog-mem": "memory_mb", "slow": "timeout_s"}:
+    raise SystemExit(f"unexpected limit hits: {hit}")
+if report["summary"]["failed"] != 4 or report["wall_ms"] > 4000:
+    raise SystemExit(f"limited hooks not contained: {report['summary']} {report['wall_ms']}")
+cpu = next(r for r in report["hooks"] if r["plugin"] == "hog-cpu")
+if cpu["limits"] != {"cpu_s": 1} or cpu["resource_usage"]["cpu_user_ms"] < 500:
+    raise SystemExit(f"peak usage not recorded: {cpu}")
+PY
+
+# 常驻进程：经 Unix socket 运行流水线与单脚本，结果与直接执行一致
+SCRIPTS_DIR="$ROOT_DIR/RUI-codex-cn/skills/ui-fullflow-orchestrator/scripts"
+export RUI_DAEMON_SOCKET="$OUT_DIR-daemon.sock"
+python3 "$SCRIPTS_DIR/fullflow_daemon.py" serve >/dev/null 2>&1 &
+DAEMON_PID=$!
+trap 'python3 "$SCRIPTS_DIR/fullflow_daemon.py" stop >/dev/null 2>&1 || kill "$DAEMON_PID" 2>/dev/null || true' EXIT
+for _ in $(seq 1 50); do
+  [[ -S "$RUI_DAEMON_SOCKET" ]] && break
+  sleep 0.1
+done
+python3 "$SCRIPTS_DIR/fullflow_daemon.py" status >/dev/null
+python3 "$SCRIPTS_DIR/fullflow_client.py" "$SCRIPTS_DIR/run_fullflow_pipeline.sh" \
+  --brief "集成测试：验证全流程状态机与门禁实测" \
+  --framework react \
+  --project-type saas-modern \
+  --style-target "hero 区域" \
+  --auto-complete \
+  --no-cache \
+  --workspace-root "$WORKSPACE_ROOT" \
+  --out-dir "$OUT_DIR-daemon" >/dev/null
+python3 "$ROOT_DIR/tests/integration/assert_fullflow_artifacts.py" "$OUT_DIR-daemon"
+SCORE_SCRIPT="$ROOT_DIR/RUI-codex-cn/skills/ui-aesthetic-coach/scripts/score_ui_brief.py"
+diff <(python3 "$SCORE_SCRIPT" --text "SaaS数据看板，强调可读性和主CTA" --json) \
+  <(python3 "$SCRIPTS_DIR/fullflow_client.py" "$SCORE_SCRIPT" --text "SaaS数据看板，强调可读性和主CTA" --json)
+DAEMON_STATUS="$(python3 "$SCRIPTS_DIR/fullflow_daemon.py" status)"
+[[ "$DAEMON_STATUS" == *'"pipelines": 1'* ]] || { echo "daemon did not serve the pipeline: $DAEMON_STATUS" >&2; exit 1; }
+[[ "$DAEMON_STATUS" == *'"stale_modules": []'* ]] || { echo "daemon reports stale modules without edits: $DAEMON_STATUS" >&2; exit 1; }
+
 echo "smoke suite passed: $OUT_DIR"